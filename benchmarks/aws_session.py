@@ -0,0 +1,55 @@
+"""benchmark the per call overhead of building boto3 resources.
+
+Compares creating a new `boto3.resource` per call (the old behaviour of
+`AWS.get_blob`) with the cached per adapter resource. No network access is
+needed, the resources are built but never used for a request.
+
+Usage:
+    python benchmarks/aws_session.py [iterations]
+"""
+
+import sys
+import timeit
+
+import boto3
+from botocore.config import Config
+
+from bucket_adapter.aws.adapter import AWS
+
+OPTIONS = {
+    'BUCKET_NAME': 'benchmark',
+    'ACCESS_KEY': 'AKIAEXAMPLE',
+    'SECRET_KEY': 'secret',
+    'CREDENTIALS': {'region_name': 'us-east-1'},
+}
+
+
+def new_resource_per_call():
+    """build a fresh resource the way get_blob used to."""
+    resource = boto3.resource('s3',
+                              aws_access_key_id=OPTIONS['ACCESS_KEY'],
+                              aws_secret_access_key=OPTIONS['SECRET_KEY'],
+                              region_name='us-east-1',
+                              config=Config(signature_version='s3v4'))
+    return resource.Object(OPTIONS['BUCKET_NAME'], 'key')
+
+
+def cached_resource(adaptee):
+    """reuse the adapter resource."""
+    return adaptee._get_resource(OPTIONS).Object(OPTIONS['BUCKET_NAME'], 'key')
+
+
+def main(iterations=200):
+    """run both variants and print the mean per call time."""
+    adaptee = AWS()
+    cached_resource(adaptee)
+    results = {
+        'new resource per call': timeit.timeit(new_resource_per_call, number=iterations),
+        'cached resource': timeit.timeit(lambda: cached_resource(adaptee), number=iterations),
+    }
+    for name, total in results.items():
+        print('{:<24} {:>10.1f} us/call'.format(name, total / iterations * 1e6))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,99 @@
+"""benchmark the construction cost and memory of CustomBlob.
+
+Compares the old dict based implementation (type dispatch on `str(type())`
+and a print per blob) with the slots based one, both lazy (fields never
+read, as when only a few listed blobs are looked at) and materialised. A
+stand-in for the gcp Blob class is used, so no SDK or network is needed.
+
+Usage:
+    python benchmarks/custom_blob.py [iterations]
+"""
+
+import contextlib
+import datetime
+import io
+import sys
+import timeit
+import tracemalloc
+
+from bucket_adapter.custom_blob import CustomBlob
+
+
+class Blob(object):
+    """stand-in for google.cloud.storage.blob.Blob."""
+
+    def __init__(self, name):
+        """__init__ function."""
+        self.name = name
+        self.time_created = datetime.datetime(2021, 1, 1)
+        self.bucket = 'benchmark'
+        self.content_encoding = None
+        self.content_language = None
+        self.content_type = 'application/octet-stream'
+        self.size = 1024
+        self.etag = 'CJ2s7Yqk2fMCEAE='
+        self.generation = 1617000000000000
+
+
+Blob.__module__ = 'google.cloud.storage.blob'
+
+OPTIONS = {'BUCKET_NAME': 'benchmark'}
+
+
+class OldCustomBlob(object):
+    """the previous implementation, kept for comparison."""
+
+    def __init__(self, blob, options, filename=None):
+        """__init__ function."""
+        print("TYPE:", type(blob))
+        if str(type(blob)) == "<class 'google.cloud.storage.blob.Blob'>":
+            self.name = blob.name
+            self.time_created = blob.time_created
+            self.bucket = blob.bucket
+            self.content_encoding = blob.content_encoding
+            self.content_language = blob.content_language
+            self.content_type = blob.content_type
+            self.size = blob.size
+            self.etag = blob.etag
+            self.generation = blob.generation
+
+
+def materialised(blob):
+    """build a blob and read a field, converting it."""
+    custom_blob = CustomBlob(blob, OPTIONS)
+    custom_blob.size
+    return custom_blob
+
+
+def bytes_per_instance(factory, blobs):
+    """traced memory of the instances built by factory, per instance."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    instances = [factory(blob) for blob in blobs]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del instances
+    return size / len(blobs)
+
+
+def main(iterations=100000):
+    """run the variants and print the mean time and memory per blob."""
+    blob = Blob('key')
+    blobs = [Blob('key-{}'.format(i)) for i in range(iterations)]
+    variants = {
+        'old (dict, print)': lambda blob: OldCustomBlob(blob, OPTIONS),
+        'slots, lazy': lambda blob: CustomBlob(blob, OPTIONS),
+        'slots, materialised': materialised,
+    }
+    # the old implementation prints on every call, keep it off the terminal.
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = [(name, timeit.timeit(lambda: factory(blob), number=iterations),
+                    bytes_per_instance(factory, blobs))
+                   for name, factory in variants.items()]
+    for name, total, size in results:
+        print('{:<22} {:>8.2f} us/blob {:>8.0f} bytes/blob'.format(
+            name, total / iterations * 1e6, size))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
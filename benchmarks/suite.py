@@ -0,0 +1,198 @@
+"""benchmark the adapter operations offline, against the in-process backends.
+
+Measures throughput and p50/p99 latency of upload, download, signing,
+metadata and listing for several object sizes and concurrency levels,
+through `Adapter` with the `Memory` (or `LocalFS`) adaptee and injected
+`LATENCY`/`BANDWIDTH`, so the results only move when the adapter code does.
+The results are written as JSON; given a baseline file the run fails when
+an operation got slower than the tolerance allows.
+
+Usage:
+    python benchmarks/suite.py [--output results.json] [--baseline old.json] [--tolerance 0.2]
+                               [--backend memory|localfs] [--latency 0.002] [--bandwidth 1e9]
+                               [--sizes 1024,1048576] [--concurrency 1,8,32] [--operations 200]
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from bucket_adapter.adapter import Adapter
+
+BACKENDS = {
+    'memory': 'bucket_adapter.local.adapter.Memory',
+    'localfs': 'bucket_adapter.local.adapter.LocalFS',
+}
+# Objects listed by the listing benchmark.
+LISTED_OBJECTS = 5000
+
+
+def percentile(values, q):
+    """nearest rank percentile.
+
+    Args:
+        values ([list]): [sorted values]
+        q ([float]): [percentile between 0 and 100]
+
+    Returns:
+        [float]: [the percentile]
+    """
+    index = max(0, min(len(values) - 1, int(round(q / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def measure(func, items, concurrency, size=0):
+    """call func for every item from `concurrency` threads.
+
+    Args:
+        func ([callable]): [operation]
+        items ([list]): [one argument per call]
+        concurrency ([int]): [number of threads]
+        size (int, optional): [bytes transferred by a call]. Defaults to 0.
+
+    Returns:
+        [dict]: [operations, ops_per_second, bytes_per_second and p50/p99/mean latency in ms]
+    """
+    def timed(item):
+        started = time.perf_counter()
+        func(item)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = sorted(executor.map(timed, items))
+    elapsed = time.perf_counter() - started
+    return {
+        'operations': len(latencies),
+        'ops_per_second': len(latencies) / elapsed,
+        'bytes_per_second': len(latencies) * size / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': statistics.mean(latencies) * 1000,
+    }
+
+
+def run(adapter, sizes, concurrency_levels, operations):
+    """run every benchmark.
+
+    Args:
+        adapter ([Adapter]): [adapter over an in-process backend]
+        sizes ([list]): [object sizes in bytes]
+        concurrency_levels ([list]): [numbers of threads]
+        operations ([int]): [calls per benchmark]
+
+    Returns:
+        [dict]: [measures by benchmark name]
+    """
+    results = {}
+    for size in sizes:
+        payload = os.urandom(size)
+        for concurrency in concurrency_levels:
+            suffix = '{}B/c{}'.format(size, concurrency)
+            names = ['bench/{}/{}'.format(uuid.uuid4().hex, i) for i in range(operations)]
+
+            def upload(name):
+                adapter.upload_stream(payload, name)
+
+            def download(name):
+                adapter.download_to_file_pointer(name, io.BytesIO())
+
+            results['upload/' + suffix] = measure(upload, names, concurrency, size)
+            results['download/' + suffix] = measure(download, names, concurrency, size)
+            for _ in adapter.delete_many(names):
+                pass
+    name = 'bench/signed'
+    adapter.upload_stream(b'x', name)
+    for concurrency in concurrency_levels:
+        suffix = 'c{}'.format(concurrency)
+        items = [name] * operations
+        results['sign/' + suffix] = measure(adapter.generate_signed_url, items, concurrency)
+        results['head/' + suffix] = measure(adapter.get_head_object, items, concurrency)
+        results['get_blob/' + suffix] = measure(adapter.get_blob, items, concurrency)
+    prefix = 'bench/list/{}/'.format(uuid.uuid4().hex)
+    measure(lambda name: adapter.upload_stream(b'', name),
+            ['{}{:06d}'.format(prefix, i) for i in range(LISTED_OBJECTS)], max(concurrency_levels))
+
+    def list_all(_):
+        for _ in adapter.list_blobs(prefix=prefix):
+            pass
+
+    results['list/{}'.format(LISTED_OBJECTS)] = measure(list_all, range(5), 1)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """find the benchmarks slower than their baseline.
+
+    Args:
+        results ([dict]): [measures by benchmark name]
+        baseline ([dict]): [earlier measures by benchmark name]
+        tolerance ([float]): [allowed slowdown, 0.2 for 20%]
+
+    Returns:
+        [list]: [description of every regression]
+    """
+    regressions = []
+    for name, measures in sorted(results.items()):
+        old = baseline.get(name)
+        if old is None:
+            continue
+        if measures['p50_ms'] > old['p50_ms'] * (1 + tolerance):
+            regressions.append('{}: p50 {:.3f} ms, was {:.3f} ms'.format(
+                name, measures['p50_ms'], old['p50_ms']))
+        if measures['ops_per_second'] < old['ops_per_second'] / (1 + tolerance):
+            regressions.append('{}: {:.0f} ops/s, was {:.0f} ops/s'.format(
+                name, measures['ops_per_second'], old['ops_per_second']))
+    return regressions
+
+
+def main(argv=None):
+    """run the suite, print and save the results, exit with 1 on a regression."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='memory')
+    parser.add_argument('--latency', type=float, default=0.002, help='seconds per request')
+    parser.add_argument('--bandwidth', type=float, default=1e9, help='bytes per second')
+    parser.add_argument('--sizes', default='1024,1048576')
+    parser.add_argument('--concurrency', default='1,8,32')
+    parser.add_argument('--operations', type=int, default=200)
+    args = parser.parse_args(argv)
+    settings = {'NAME': BACKENDS[args.backend], 'BUCKET_NAME': 'benchmark',
+                'LATENCY': args.latency, 'BANDWIDTH': args.bandwidth}
+    with tempfile.TemporaryDirectory() as root:
+        settings['LOCAL_ROOT'] = root
+        results = run(Adapter(settings), [int(size) for size in args.sizes.split(',')],
+                      [int(level) for level in args.concurrency.split(',')], args.operations)
+    for name, measures in sorted(results.items()):
+        print('{:<28} {:>10.1f} ops/s {:>10.1f} MB/s  p50 {:>8.3f} ms  p99 {:>8.3f} ms'.format(
+            name, measures['ops_per_second'], measures['bytes_per_second'] / 1e6,
+            measures['p50_ms'], measures['p99_ms']))
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {key: value for key, value in vars(args).items()
+                     if key not in ('output', 'baseline', 'tolerance')},
+        'results': results,
+    }
+    with open(args.output, 'w') as fileobj:
+        json.dump(report, fileobj, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as fileobj:
+            regressions = compare(results, json.load(fileobj)['results'], args.tolerance)
+        for regression in regressions:
+            print('REGRESSION', regression)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,44 @@
 """adapter class."""
 
+import functools
+import itertools
+import logging
+import os
+import tempfile
+
 import import_string
 
+from . import checksums, transfer
+from .bulk import DEFAULT_MAX_WORKERS, BulkResult, run_bounded
+from .cache import NOT_MODIFIED, MetadataCache, SignedUrlCache
+from .compression import Compression, DecompressingReader, content_codings, decompress_stream
+from .custom_blob import CustomBlob
+from .disk_cache import DiskCache
+from .exceptions import ChecksumMismatchError
+from .instrumentation import instrumented
+from .listing import BlobListing
+from .retry import Hedger, RetryPolicy
+from .streams import BlobReader, as_fileobj
+from .sync import SyncResult, join_key, plan, walk_local
+
+
+def _upload_arguments(filename, bucket_filename=None, ExtraArgs=None):
+    """arguments of `upload`.
+
+    Returns:
+        [tuple]: [filename, name of the file in bucket and ExtraArgs]
+    """
+    return filename, bucket_filename or filename, ExtraArgs
+
+
+def _upload_fileobj_arguments(fileobj, bucket_filename, ExtraArgs=None, size=None):
+    """arguments of `upload_fileobj`.
+
+    Returns:
+        [tuple]: [file object, name of the file in bucket, ExtraArgs and size]
+    """
+    return fileobj, bucket_filename, ExtraArgs, size
+
 
 class Adapter(object):
     """Adapter.
@@ -22,23 +59,785 @@ class Adapter(object):
         self.adaptee_obj = mod()
         self.authenticate = self.adaptee_obj.authenticate(
             options=self.settings)
+        self.signed_url_cache = None
+        if self.settings.get('SIGNED_URL_CACHE') is not None:
+            self.signed_url_cache = SignedUrlCache.from_settings(
+                self.settings.get('BUCKET_NAME'), self.settings['SIGNED_URL_CACHE'])
+        self.metadata_cache = None
+        if self.settings.get('METADATA_CACHE') is not None:
+            self.metadata_cache = MetadataCache.from_settings(
+                self.settings['METADATA_CACHE'])
+        self.disk_cache = None
+        if self.settings.get('DISK_CACHE') is not None:
+            self.disk_cache = DiskCache.from_settings(self.settings['DISK_CACHE'])
+        self.compression = None
+        if self.settings.get('COMPRESSION') is not None:
+            self.compression = Compression.from_settings(self.settings['COMPRESSION'])
+        self.retry_policy = None
+        if self.settings.get('RETRY') is not None:
+            self.retry_policy = RetryPolicy.from_settings(self.settings['RETRY'])
+        self.hedger = None
+        if self.settings.get('HEDGE') is not None:
+            self.hedger = Hedger.from_settings(self.settings['HEDGE'])
+        # connection pool statistics of the backend, see `TRANSPORT`.
+        self.pool_monitor = getattr(self.adaptee_obj, 'pool_monitor', None)
+        self.backend = type(self.adaptee_obj).__name__.lower()
+        self.listeners = []
+        for listener in self.settings.get('INSTRUMENTATION', ()):
+            self.add_listener(listener)
+
+    def add_listener(self, listener):
+        """report every operation to a listener.
+
+        Args:
+            listener ([callable/string]): [callable receiving an OperationEvent, or its dotted path]
+        """
+        if isinstance(listener, str):
+            listener = import_string(listener)
+        self.listeners = self.listeners + [listener]
+
+    def _call(self, operation, func, *args, **kwargs):
+        """run an operation, instrumented and retried when configured.
+
+        Args:
+            operation ([string]): [operation name reported to the listeners]
+            func ([callable]): [function doing the operation]
+
+        Returns:
+            [object]: [whatever func returns]
+        """
+        if self.retry_policy is not None:
+            args = (operation, func) + args
+            func = self.retry_policy.call
+        if not self.listeners:
+            return func(*args, **kwargs)
+        return instrumented(self.listeners, operation, self.backend, func, *args, **kwargs)
+
+    def _hedged(self, operation, func):
+        """hedge the requests of an adaptee method when `HEDGE` is set.
+
+        Args:
+            operation ([string]): [operation name]
+            func ([callable]): [adaptee method]
+
+        Returns:
+            [callable]: [func, hedged when the operation is]
+        """
+        if self.hedger is None:
+            return func
+        return self.hedger.wrap(operation, func)
+
+    def _invalidate(self, filename):
+        """drop the cached metadata of a file changed through this adapter.
 
-    def upload(self, *args, **kwargs):
+        Args:
+            filename ([string]): [name of the file in bucket]
+        """
+        if self.metadata_cache is not None:
+            self.metadata_cache.invalidate(filename)
+
+    def _compression(self, compress):
+        """compression of an upload.
+
+        Args:
+            compress ([bool]): [True to compress, False not to, None to follow the `COMPRESSION` setting]
+
+        Returns:
+            [Compression]: [None when the upload is sent as it is]
+        """
+        if compress is False or (compress is None and self.compression is None):
+            return None
+        return self.compression or Compression()
+
+    def upload(self, *args, compress=None, verify=False, **kwargs):
         """upload.
 
+        With `COMPRESSION` set (or compress=True) the file is compressed
+        while it is sent and stored with its Content-Encoding. With verify
+        the data is hashed while it is sent and checked against the
+        checksums the bucket advertises for the new object.
+
+        Args:
+            compress ([bool], optional): [True to compress whatever the content type, False never]. Defaults to the `COMPRESSION` setting.
+            verify (bool, optional): [check the checksums of the object]. Defaults to False.
+
+        Raises:
+            ChecksumMismatchError: [with verify, when the object does not match the file]
+
+        Returns:
+            [string]: [returns the url afer uploading the file to bucket, the CustomBlob with its checksums with verify]
+        """
+        filename, bucket_filename, ExtraArgs = _upload_arguments(*args, **kwargs)
+        try:
+            compression = self._compression(compress)
+            encoding = compression and compression.encoding_for(
+                bucket_filename, ExtraArgs, os.path.getsize(filename), force=compress is True)
+            if encoding:
+                ExtraArgs = compression.extra_args(bucket_filename, ExtraArgs, encoding)
+            if encoding or verify:
+                return self._call('upload', self._upload_file, filename, bucket_filename,
+                                  ExtraArgs, compression, encoding, verify)
+            return self._call('upload', self.adaptee_obj.upload,
+                              *args, **kwargs, options=self.settings, client=self.authenticate)
+        finally:
+            self._invalidate(bucket_filename)
+
+    def _upload_file(self, filename, bucket_filename, ExtraArgs, compression, encoding, verify):
+        """upload a file, compressed and verified on request.
+
+        The file is opened again by every attempt, so retries send it
+        whole. Verified files large enough for a multipart upload are sent
+        by the adaptee, which hashes the parts in its upload threads.
+
+        Args:
+            filename ([string]): [file to upload]
+            bucket_filename ([string]): [name of the file in bucket]
+            ExtraArgs ([dict]): [extra arguments, with the ContentEncoding when compressed]
+            compression ([Compression]): [compression of the upload, None when not compressed]
+            encoding ([string]): [gzip or zstd, None when not compressed]
+            verify ([bool]): [check the checksums of the object]
+
+        Returns:
+            [tuple]: [bool success and uploaded file bucket url, the CustomBlob with verify]
+        """
+        threshold, _, _ = transfer.multipart_settings(self.settings)
+        if verify and not encoding and threshold is not None and os.path.getsize(filename) >= threshold:
+            hasher = checksums.StreamHasher(self._checksum_algorithms(ExtraArgs))
+            with checksums.hashing(hasher):
+                result = self.adaptee_obj.upload(
+                    filename, bucket_filename=bucket_filename, ExtraArgs=ExtraArgs,
+                    options=self.settings, client=self.authenticate)
+            return self._check_upload(bucket_filename, result, hasher, filename)
+        with open(filename, 'rb') as fileobj:
+            return self._send(fileobj, bucket_filename, ExtraArgs, compression, encoding, verify,
+                              None if encoding else filename)
+
+    def upload_fileobj(self, *args, compress=None, verify=False, **kwargs):
+        """upload a file object without writing it to disk first.
+
+        Compressed and verified like `upload`, file objects are then
+        retried only when they can be rewound.
+
+        Args:
+            compress ([bool], optional): [True to compress whatever the content type, False never]. Defaults to the `COMPRESSION` setting.
+            verify (bool, optional): [check the checksums of the object]. Defaults to False.
+
+        Raises:
+            ChecksumMismatchError: [with verify, when the object does not match the data sent]
+
+        Returns:
+            [tuple]: [bool success and uploaded file bucket url, the CustomBlob with its checksums with verify]
+        """
+        fileobj, bucket_filename, ExtraArgs, size = _upload_fileobj_arguments(*args, **kwargs)
+        try:
+            compression = self._compression(compress)
+            encoding = compression and compression.encoding_for(
+                bucket_filename, ExtraArgs, size, force=compress is True)
+            if encoding:
+                ExtraArgs = compression.extra_args(bucket_filename, ExtraArgs, encoding)
+            if encoding or verify:
+                return self._call('upload_fileobj', self._send, fileobj, bucket_filename,
+                                  ExtraArgs, compression, encoding, verify)
+            return self._call('upload_fileobj', self.adaptee_obj.upload_fileobj,
+                              *args, **kwargs, options=self.settings, client=self.authenticate)
+        finally:
+            self._invalidate(bucket_filename)
+
+    def _send(self, fileobj, bucket_filename, ExtraArgs, compression, encoding, verify, filename=None):
+        """stream a file object to the bucket, compressed and verified on request.
+
+        Args:
+            fileobj ([object]): [readable file object]
+            bucket_filename ([string]): [name of the file in bucket]
+            ExtraArgs ([dict]): [extra arguments, with the ContentEncoding when compressed]
+            compression ([Compression]): [compression of the upload, None when not compressed]
+            encoding ([string]): [gzip or zstd, None when not compressed]
+            verify ([bool]): [check the checksums of the object]
+            filename ([string], optional): [file the data was read from]. Defaults to None.
+
+        Returns:
+            [tuple]: [bool success and uploaded file bucket url, the CustomBlob with verify]
+        """
+        if encoding:
+            fileobj = compression.compress(fileobj, encoding)
+        if not verify:
+            return self.adaptee_obj.upload_fileobj(
+                fileobj, bucket_filename, ExtraArgs=ExtraArgs,
+                options=self.settings, client=self.authenticate)
+        hasher = checksums.StreamHasher(self._checksum_algorithms(ExtraArgs))
+        result = self.adaptee_obj.upload_fileobj(
+            checksums.HashingReader(fileobj, hasher), bucket_filename, ExtraArgs=ExtraArgs,
+            options=self.settings, client=self.authenticate)
+        return self._check_upload(bucket_filename, result, hasher, filename)
+
+    def _checksum_algorithms(self, ExtraArgs=None):
+        """algorithms hashed by a verified transfer.
+
+        Args:
+            ExtraArgs ([dict], optional): [extra arguments of an upload, its ChecksumAlgorithm is added]. Defaults to None.
+
+        Returns:
+            [list]: [the algorithms the backend may advertise]
+        """
+        algorithms = list(getattr(self.adaptee_obj, 'CHECKSUM_ALGORITHMS', ('md5',)))
+        requested = (ExtraArgs or {}).get('ChecksumAlgorithm')
+        if requested:
+            algorithms.append(requested.lower())
+        return algorithms
+
+    def _check_upload(self, bucket_filename, result, hasher, filename=None):
+        """compare the digests of an upload with those of the new object.
+
+        Digests of a file that do not match (an adaptee sent it without
+        hashing it, or read it again) are computed once more from the file
+        before giving up. When the bucket advertises none of the digests
+        the blob is returned with `verified` False.
+
+        Args:
+            bucket_filename ([string]): [name of the file in bucket]
+            result ([object]): [what the adaptee upload returned]
+            hasher ([StreamHasher]): [hasher fed with the data sent]
+            filename ([string], optional): [file the data was read from]. Defaults to None.
+
+        Raises:
+            ChecksumMismatchError: [when the object does not match the data]
+
         Returns:
-            [string]: [returns the url afer uploading the file to bucket]
+            [object]: [the CustomBlob with the checksums and verified, result when the upload failed]
         """
-        return self.adaptee_obj.upload(
+        if not result:
+            return result
+        expected = self.get_checksums(bucket_filename)
+        digests = hasher.digests()
+        try:
+            checksums.verify(bucket_filename, expected, digests)
+        except ChecksumMismatchError:
+            if filename is None:
+                raise
+            with open(filename, 'rb') as fileobj:
+                digests = checksums.digest_file(fileobj, hasher.algorithms)
+            checksums.verify(bucket_filename, expected, digests)
+        return self._verified_blob(bucket_filename, expected, digests)
+
+    def _verified_blob(self, filename, expected, digests):
+        """CustomBlob of a verified transfer.
+
+        Args:
+            filename ([string]): [name of the file in bucket]
+            expected ([dict]): [digests of the file advertised by the bucket]
+            digests ([dict]): [digests of the data transferred by algorithm]
+
+        Returns:
+            [CustomBlob]: [blob of the file, with its `checksums` and whether they were `verified`]
+        """
+        verified = bool(set(expected) & set(digests))
+        if not verified:
+            logging.warning("no checksum of %s to verify the transfer against", filename)
+        blob = self.adaptee_obj.get_blob(filename, options=self.settings, client=self.authenticate)
+        fields = {field: getattr(blob, field) for field in CustomBlob.FIELDS}
+        fields['checksums'] = checksums.encode(digests)
+        fields['verified'] = verified
+        return CustomBlob.from_fields(**fields)
+
+    def upload_stream(self, data, bucket_filename, **kwargs):
+        """upload a file object, bytes-like object or iterable of chunks.
+
+        The payload is streamed to the bucket, bytes/memoryview data is not
+        copied and only the chunk being sent of an iterable is held.
+
+        Args:
+            data ([object]): [file object, bytes/bytearray/memoryview or iterable of bytes-like chunks]
+            bucket_filename ([string]): [name of the file in bucket]
+
+        Returns:
+            [tuple]: [bool success and uploaded file bucket url]
+        """
+        fileobj, size = as_fileobj(data)
+        kwargs.setdefault('size', size)
+        return self.upload_fileobj(fileobj, bucket_filename, **kwargs)
+
+    def _max_workers(self, max_workers):
+        """number of worker threads for a bulk operation.
+
+        Args:
+            max_workers ([int]): [explicit number of workers or None]
+
+        Returns:
+            [int]: [max_workers, else `MAX_WORKERS` from settings, else the default]
+        """
+        if max_workers is None:
+            max_workers = self.settings.get('MAX_WORKERS', DEFAULT_MAX_WORKERS)
+        return max_workers
+
+    def upload_many(self, items, max_workers=None, **kwargs):
+        """upload many files concurrently.
+
+        Every item is uploaded through `upload`, a string item is the
+        filename, a tuple is passed as positional arguments and a dict as
+        keyword arguments (e.g. {'filename': ..., 'bucket_filename': ...}).
+        Extra keyword arguments (e.g. ExtraArgs) are passed to every upload.
+
+        Args:
+            items ([iterable]): [files to upload, consumed lazily]
+            max_workers ([int], optional): [number of concurrent uploads]. Defaults to `MAX_WORKERS` setting or 8.
+
+        Returns:
+            [generator]: [a BulkResult(item, result, error) per item, in input order]
+        """
+        return run_bounded(functools.partial(self.upload, **kwargs), items,
+                           max_workers=self._max_workers(max_workers))
+
+    def _cached_version(self, filename):
+        """version of a file keying its disk cache entry.
+
+        Read from a head, a request on every cache hit unless the metadata
+        cache serves it.
+
+        Args:
+            filename ([string]): [name of the file in bucket]
+
+        Returns:
+            [object]: [generation or ETag, None when the head cannot be read]
+        """
+        success, head = self.get_head_object(filename)
+        if not success or not head:
+            return None
+        return head.get('Generation') or head.get('ETag')
+
+    def _copy_cached(self, filename, fileobj, version):
+        """copy a file from the disk cache, downloading it on a miss.
+
+        The download is pinned to `version` so the entry cannot hold
+        another version of the file. A failed download drops the cached
+        metadata, which may be stale.
+
+        Args:
+            filename ([string]): [name of the file in bucket]
+            fileobj ([object]): [writable destination]
+            version ([object]): [generation or ETag of the file]
+        """
+        entry = self.disk_cache.open(filename, version)
+        if entry is None:
+            download = functools.partial(
+                self._hedged('download_to_file_pointer', self.adaptee_obj.download_to_file_pointer),
+                filename, options=self.settings, client=self.authenticate, version=version)
+            try:
+                entry = self.disk_cache.fill(filename, version, download)
+            except Exception:
+                self._invalidate(filename)
+                raise
+        with entry:
+            self.disk_cache.copy(entry, fileobj)
+
+    def _cached_download(self, filename, bucket_filename=None):
+        """download through the disk cache.
+
+        Args:
+            filename ([string]): [local file]
+            bucket_filename ([string], optional): [name of the file in bucket]. Defaults to filename.
+
+        Returns:
+            [object]: [True, or what the adaptee returns when the file version is unknown]
+        """
+        if bucket_filename is None:
+            bucket_filename = filename
+        version = self._cached_version(bucket_filename)
+        if version is None:
+            return self._hedged('download', self.adaptee_obj.download)(
+                filename, bucket_filename=bucket_filename, options=self.settings,
+                client=self.authenticate)
+        with open(filename, 'wb') as fileobj:
+            self._copy_cached(bucket_filename, fileobj, version)
+        return True
+
+    def _cached_download_to_file_pointer(self, filename, tempfile_name):
+        """download_to_file_pointer through the disk cache.
+
+        Args:
+            filename ([string]): [name of the file in bucket]
+            tempfile_name ([object]): [writable destination]
+
+        Returns:
+            [object]: [None, or what the adaptee returns when the file version is unknown]
+        """
+        version = self._cached_version(filename)
+        if version is None:
+            return self._hedged('download_to_file_pointer', self.adaptee_obj.download_to_file_pointer)(
+                filename, tempfile_name, options=self.settings, client=self.authenticate)
+        self._copy_cached(filename, tempfile_name, version)
+
+    def _fetch(self, *args, **kwargs):
+        """download, from the disk cache when `DISK_CACHE` is set.
+
+        Returns:
+            [object]: [what the adaptee returns]
+        """
+        if self.disk_cache is not None:
+            return self._cached_download(*args, **kwargs)
+        return self._hedged('download', self.adaptee_obj.download)(
             *args, **kwargs, options=self.settings, client=self.authenticate)
 
-    def download(self, *args, **kwargs):
+    def _fetch_to_file_pointer(self, *args, **kwargs):
+        """download_to_file_pointer, from the disk cache when `DISK_CACHE` is set.
+
+        Returns:
+            [object]: [what the adaptee returns]
+        """
+        if self.disk_cache is not None:
+            return self._cached_download_to_file_pointer(*args, **kwargs)
+        return self._hedged('download_to_file_pointer', self.adaptee_obj.download_to_file_pointer)(
+            *args, **kwargs, options=self.settings, client=self.authenticate)
+
+    def _content_encoding(self, filename):
+        """Content-Encoding of a file.
+
+        Args:
+            filename ([string]): [name of the file in bucket]
+
+        Returns:
+            [string]: [Content-Encoding, None when the file has none or its head cannot be read]
+        """
+        success, head = self.get_head_object(filename)
+        if not success or not head:
+            return None
+        return head.get('ContentEncoding')
+
+    def _fetch_verified(self, filename, fileobj):
+        """download_to_file_pointer checking the data against the checksums of the file.
+
+        The data is hashed while it is written, by the threads fetching the
+        ranges of ranged downloads; data that was not hashed (copied from
+        the disk cache) is read back.
+
+        Args:
+            filename ([string]): [name of the file in bucket]
+            fileobj ([object]): [writable destination]
+
+        Raises:
+            ChecksumMismatchError: [when the data does not match]
+
+        Returns:
+            [tuple]: [digests of the file advertised by the bucket and of the data by algorithm]
+        """
+        expected = self.get_checksums(filename)
+        hasher = checksums.StreamHasher(expected or self._checksum_algorithms())
+        start = transfer.position(fileobj)
+        with checksums.hashing(hasher):
+            self._fetch_to_file_pointer(filename, fileobj)
+        return expected, transfer.verify_download(filename, fileobj, start, expected, hasher)
+
+    def _download_into(self, filename, fileobj, encoding, verify):
+        """download a file into a file object, decoded and verified on request.
+
+        Encoded files are downloaded as stored into a temporary file (ranged,
+        cached and verified like any download), which is then decoded into
+        the destination.
+
+        Args:
+            filename ([string]): [name of the file in bucket]
+            fileobj ([object]): [writable destination]
+            encoding ([string]): [Content-Encoding to undo, None to keep the stored bytes]
+            verify ([bool]): [check the checksums of the stored bytes]
+
+        Returns:
+            [CustomBlob]: [the blob with its checksums with verify, else None]
+        """
+        if not content_codings(encoding):
+            return self._verified_blob(filename, *self._fetch_verified(filename, fileobj))
+        with tempfile.TemporaryFile() as raw:
+            if verify:
+                expected, digests = self._fetch_verified(filename, raw)
+            else:
+                self._fetch_to_file_pointer(filename, raw)
+            raw.seek(0)
+            decompress_stream(raw, fileobj, encoding)
+        return self._verified_blob(filename, expected, digests) if verify else None
+
+    def _download_file(self, filename, bucket_filename=None, decompress=False, verify=False):
+        """download a file, decompressed and verified on request.
+
+        Args:
+            filename ([string]): [local file]
+            bucket_filename ([string], optional): [name of the file in bucket]. Defaults to filename.
+            decompress (bool, optional): [undo the Content-Encoding of the file]. Defaults to False.
+            verify (bool, optional): [check the checksums of the file]. Defaults to False.
+
+        Returns:
+            [object]: [the CustomBlob with verify, else True, or what the adaptee returns when the file is not compressed]
+        """
+        if bucket_filename is None:
+            bucket_filename = filename
+        encoding = self._content_encoding(bucket_filename) if decompress else None
+        if not verify and not content_codings(encoding):
+            return self._fetch(filename, bucket_filename=bucket_filename)
+        with open(filename, 'wb+') as fileobj:
+            blob = self._download_into(bucket_filename, fileobj, encoding, verify)
+        return blob if verify else True
+
+    def _download_to_file_pointer(self, filename, tempfile_name, decompress=False, verify=False):
+        """download_to_file_pointer, decompressed and verified on request.
+
+        Args:
+            filename ([string]): [name of the file in bucket]
+            tempfile_name ([object]): [writable destination]
+            decompress (bool, optional): [undo the Content-Encoding of the file]. Defaults to False.
+            verify (bool, optional): [check the checksums of the file]. Defaults to False.
+
+        Returns:
+            [object]: [the CustomBlob with verify, else None, or what the adaptee returns when the file is not compressed]
+        """
+        encoding = self._content_encoding(filename) if decompress else None
+        if not verify and not content_codings(encoding):
+            return self._fetch_to_file_pointer(filename, tempfile_name)
+        return self._download_into(filename, tempfile_name, encoding, verify)
+
+    def download(self, *args, decompress=False, verify=False, **kwargs):
         """download.
 
+        Served from the local disk cache when `DISK_CACHE` is set. With
+        verify the data is hashed while it is written and checked against
+        the checksums the bucket advertises.
+
+        Args:
+            decompress (bool, optional): [undo the Content-Encoding of compressed files]. Defaults to False, the stored bytes.
+            verify (bool, optional): [check the checksums of the stored bytes]. Defaults to False.
+
+        Raises:
+            ChecksumMismatchError: [with verify, when the data does not match]
+
+        Returns:
+            [file]: [downlaod the file in the working directory, the CustomBlob with its checksums with verify]
+        """
+        if decompress or verify:
+            return self._call('download', self._download_file, *args,
+                              decompress=decompress, verify=verify, **kwargs)
+        return self._call('download', self._fetch, *args, **kwargs)
+
+    def download_many(self, items, max_workers=None, to_file_pointer=False, **kwargs):
+        """download many files concurrently.
+
+        Items are passed to `download` the same way `upload_many` passes them
+        to `upload`. With to_file_pointer every item is a (filename,
+        file pointer) pair passed to `download_to_file_pointer` instead.
+
+        Args:
+            items ([iterable]): [files to download, consumed lazily]
+            max_workers ([int], optional): [number of concurrent downloads]. Defaults to `MAX_WORKERS` setting or 8.
+            to_file_pointer (bool, optional): [download into file pointers]. Defaults to False.
+
+        Returns:
+            [generator]: [a BulkResult(item, result, error) per item, in input order]
+        """
+        method = self.download_to_file_pointer if to_file_pointer else self.download
+        return run_bounded(functools.partial(method, **kwargs), items,
+                           max_workers=self._max_workers(max_workers))
+
+    def _list_prefix(self, prefix):
+        """list the objects of a synced tree.
+
+        Args:
+            prefix ([string]): [prefix of the tree in the bucket]
+
+        Returns:
+            [dict]: [CustomBlob by name relative to the prefix]
+        """
+        root = join_key(prefix, '')
+        with self.list_blobs(prefix=root or None) as listing:
+            return {blob.name[len(root):]: blob for blob in listing
+                    if not blob.name.endswith('/')}
+
+    def sync_dir(self, local_dir, prefix='', checksum=True, max_workers=None, hash_workers=None,
+                 **kwargs):
+        """upload the files of a local tree that changed.
+
+        Files missing in the bucket, of another size, or whose content
+        differs from the md5/crc32c the object advertises (else older than
+        the local file) are uploaded concurrently with `upload_many`; local
+        files are hashed in parallel processes. Objects without a local
+        file are left alone. Files are not compressed unless compress=True
+        is passed, compressed objects never match their local file.
+
+        Args:
+            local_dir ([string]): [root of the local tree]
+            prefix (str, optional): [prefix of the tree in the bucket]. Defaults to the bucket root.
+            checksum (bool, optional): [compare content digests when available, else size and time only]. Defaults to True.
+            max_workers ([int], optional): [number of concurrent uploads]. Defaults to `MAX_WORKERS` setting or 8.
+            hash_workers ([int], optional): [number of hashing processes]. Defaults to the number of CPUs.
+
+        Returns:
+            [SyncResult]: [BulkResult of every upload and the names skipped]
+        """
+        kwargs.setdefault('compress', False)
+        local_files = walk_local(local_dir)
+        changed, skipped = plan(local_files, self._list_prefix(prefix), upload=True,
+                                checksum=checksum, hash_workers=hash_workers)
+        items = ({'filename': local_files[name].path, 'bucket_filename': join_key(prefix, name)}
+                 for name in changed)
+        return SyncResult(list(self.upload_many(items, max_workers=max_workers, **kwargs)), skipped)
+
+    def sync_prefix(self, prefix, local_dir, checksum=True, max_workers=None, hash_workers=None):
+        """download the objects under a prefix that changed, the reverse of `sync_dir`.
+
+        Downloaded files get the time of their object, so a later sync
+        without digests sees them up to date.
+
+        Args:
+            prefix ([string]): [prefix of the tree in the bucket, '' for the whole bucket]
+            local_dir ([string]): [root of the local tree, created when missing]
+            checksum (bool, optional): [compare content digests when available, else size and time only]. Defaults to True.
+            max_workers ([int], optional): [number of concurrent downloads]. Defaults to `MAX_WORKERS` setting or 8.
+            hash_workers ([int], optional): [number of hashing processes]. Defaults to the number of CPUs.
+
+        Returns:
+            [SyncResult]: [BulkResult of every download and the names skipped]
+        """
+        remote_blobs = self._list_prefix(prefix)
+        changed, skipped = plan(walk_local(local_dir), remote_blobs, upload=False,
+                                checksum=checksum, hash_workers=hash_workers)
+        items = []
+        for name in changed:
+            path = os.path.join(local_dir, *name.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            items.append({'filename': path, 'bucket_filename': join_key(prefix, name)})
+        transferred = list(self.download_many(items, max_workers=max_workers))
+        for name, result in zip(changed, transferred):
+            modified = remote_blobs[name].time_created
+            if result.error is None and modified is not None and os.path.exists(result.item['filename']):
+                os.utime(result.item['filename'], (modified.timestamp(), modified.timestamp()))
+        return SyncResult(transferred, skipped)
+
+    def copy(self, source, destination):
+        """copy a file server side, the data does not go through this host.
+
+        Args:
+            source ([string]): [name of the file in bucket]
+            destination ([string]): [name of the copy]
+
+        Returns:
+            [bool]: [True when copied, False otherwise]
+        """
+        try:
+            return self._call('copy', self.adaptee_obj.copy, source, destination,
+                              options=self.settings, client=self.authenticate)
+        finally:
+            self._invalidate(destination)
+
+    def delete(self, filename):
+        """delete a file, deleting a missing file succeeds.
+
+        Args:
+            filename ([string]): [name of the file in bucket]
+
+        Returns:
+            [bool]: [True when deleted, False otherwise]
+        """
+        try:
+            return self._call('delete', self.adaptee_obj.delete, filename,
+                              options=self.settings, client=self.authenticate)
+        finally:
+            self._invalidate(filename)
+
+    def move(self, source, destination):
+        """move a file server side, a copy followed by a delete of the source.
+
+        Args:
+            source ([string]): [name of the file in bucket]
+            destination ([string]): [new name]
+
+        Returns:
+            [bool]: [True when moved, False otherwise (the source is kept when the copy failed)]
+        """
+        if not self.copy(source, destination):
+            return False
+        return self.delete(source)
+
+    def copy_many(self, items, max_workers=None):
+        """copy many files concurrently.
+
+        Args:
+            items ([iterable]): [(source, destination) pairs, consumed lazily]
+            max_workers ([int], optional): [number of concurrent copies]. Defaults to `MAX_WORKERS` setting or 8.
+
+        Returns:
+            [generator]: [a BulkResult(item, result, error) per item, in input order]
+        """
+        return run_bounded(self.copy, items, max_workers=self._max_workers(max_workers))
+
+    def move_many(self, items, max_workers=None):
+        """move many files concurrently.
+
+        Args:
+            items ([iterable]): [(source, destination) pairs, consumed lazily]
+            max_workers ([int], optional): [number of concurrent moves]. Defaults to `MAX_WORKERS` setting or 8.
+
         Returns:
-            [file]: [downlaod the file in the working directory]
+            [generator]: [a BulkResult(item, result, error) per item, in input order]
         """
-        return self.adaptee_obj.download(*args, **kwargs, options=self.settings, client=self.authenticate)
+        return run_bounded(self.move, items, max_workers=self._max_workers(max_workers))
+
+    def _delete_batch(self, filenames):
+        """delete a batch of files with one request.
+
+        Args:
+            filenames ([list]): [names of the files in bucket]
+
+        Returns:
+            [dict]: [exception by name of the files not deleted]
+        """
+        try:
+            return self._call('delete_many', self.adaptee_obj.delete_batch, filenames,
+                              options=self.settings, client=self.authenticate)
+        finally:
+            for filename in filenames:
+                self._invalidate(filename)
+
+    def delete_many(self, filenames, max_workers=None):
+        """delete many files with batch requests sent concurrently.
+
+        Names are grouped in batches of the backend limit (1000 keys per
+        S3 delete_objects, 100 requests per GCS batch) pulled lazily from
+        the iterable, so any number of files is deleted with bounded memory.
+
+        Args:
+            filenames ([iterable]): [names of the files in bucket, consumed lazily]
+            max_workers ([int], optional): [number of concurrent batches]. Defaults to `MAX_WORKERS` setting or 8.
+
+        Yields:
+            [BulkResult]: [a BulkResult(filename, True, None), or with the error, per file in input order]
+        """
+        filenames = iter(filenames)
+        size = self.adaptee_obj.DELETE_BATCH_SIZE
+        batches = ((batch,) for batch in iter(lambda: list(itertools.islice(filenames, size)), []))
+        for batch in run_bounded(self._delete_batch, batches,
+                                 max_workers=self._max_workers(max_workers)):
+            for filename in batch.item[0]:
+                error = batch.error if batch.error is not None else batch.result.get(filename)
+                yield BulkResult(filename, True if error is None else None, error)
+
+    def _cached_signed_url(self, method, args, kwargs):
+        """sign an url through the signed url cache.
+
+        Args:
+            method ([string]): [name of the adaptee signing method]
+            args ([tuple]): [positional arguments, the filename first]
+            kwargs ([dict]): [keyword arguments, with the optional expiration]
+
+        Returns:
+            [string]: [a signed url]
+        """
+        sign = getattr(self.adaptee_obj, method)
+        if self.signed_url_cache is None:
+            return sign(*args, **kwargs, options=self.settings, client=self.authenticate)
+        filename = args[0] if args else kwargs.get('filename')
+        key, expires_at, url = self.signed_url_cache.lookup(
+            filename, kwargs.get('expiration'))
+        if url is None:
+            if key is not None and 'expiration' in kwargs:
+                kwargs = dict(kwargs, expiration=self.signed_url_cache.sign_expiration(
+                    kwargs['expiration'], expires_at))
+            url = sign(*args, **kwargs, options=self.settings, client=self.authenticate)
+            self.signed_url_cache.store(key, expires_at, url)
+        return url
 
     def generate_signed_url(self, *args, **kwargs):
         """generate the signed url.
@@ -46,15 +845,100 @@ class Adapter(object):
         Returns:
             [string]: [a signed url which expires in an hour]
         """
-        return self.adaptee_obj.generate_signed_url(*args, **kwargs, options=self.settings, client=self.authenticate)
+        return self._call('generate_signed_url', self._cached_signed_url,
+                          'generate_signed_url', args, kwargs)
+
+    def generate_signed_urls(self, *args, **kwargs):
+        """generate signed urls for many files in one call.
+
+        Only the urls missing from the signed url cache are signed.
+
+        Returns:
+            [dict]: [signed url by filename]
+        """
+        return self._call('generate_signed_urls', self._generate_signed_urls, *args, **kwargs)
+
+    def _generate_signed_urls(self, *args, **kwargs):
+        """sign the urls missing from the signed url cache.
+
+        Returns:
+            [dict]: [signed url by filename]
+        """
+        if self.signed_url_cache is None:
+            return self.adaptee_obj.generate_signed_urls(*args, **kwargs, options=self.settings, client=self.authenticate)
+        filenames = args[0] if args else kwargs.pop('filenames')
+        if len(args) > 1:
+            kwargs['expiration'] = args[1]
+        expiration = kwargs.get('expiration')
+        urls, missing = {}, {}
+        for filename in filenames:
+            key, expires_at, url = self.signed_url_cache.lookup(filename, expiration)
+            if url is None:
+                missing[filename] = (key, expires_at)
+            urls[filename] = url
+        if missing:
+            if expires_at is not None and 'expiration' in kwargs:
+                # the keys of a batch share the expiry window.
+                kwargs['expiration'] = self.signed_url_cache.sign_expiration(expiration, expires_at)
+            signed = self.adaptee_obj.generate_signed_urls(
+                list(missing), **kwargs, options=self.settings, client=self.authenticate)
+            if signed is None:
+                return None
+            for filename, url in signed.items():
+                self.signed_url_cache.store(*missing[filename], url)
+                urls[filename] = url
+        return urls
+
+    def _cached_metadata(self, kind, method, args, kwargs):
+        """fetch metadata through the metadata cache.
+
+        Fresh records are returned as is, expired ones are revalidated with
+        a conditional request on their generation/ETag and kept when the
+        object did not change.
+
+        Args:
+            kind ([string]): ['blob' or 'head']
+            method ([string]): [name of the adaptee method]
+            args ([tuple]): [positional arguments, the filename first]
+            kwargs ([dict]): [keyword arguments]
+
+        Returns:
+            [object]: [whatever the adaptee method returns]
+        """
+        fetch = functools.partial(self._hedged(method, getattr(self.adaptee_obj, method)),
+                                  *args, **kwargs, options=self.settings, client=self.authenticate)
+        if self.metadata_cache is None or 'if_none_match' in kwargs:
+            return fetch()
+        filename = args[0] if args else kwargs.get('filename')
+        cached, fresh = self.metadata_cache.lookup(kind, filename)
+        if fresh:
+            return cached
+        validator = None
+        if cached is not None and self.metadata_cache.revalidate:
+            if kind == 'blob':
+                validator = cached.generation if cached.generation is not None else cached.etag
+            else:
+                validator = cached[1].get('Generation') or cached[1].get('ETag')
+        if validator is not None:
+            value = fetch(if_none_match=validator)
+            if value is NOT_MODIFIED or (kind == 'head' and value[1] is NOT_MODIFIED):
+                self.metadata_cache.store(kind, filename, cached)
+                return cached
+        else:
+            value = fetch()
+        if (kind == 'blob' and value.name is not None) or (kind == 'head' and value[0]):
+            self.metadata_cache.store(kind, filename, value)
+        return value
 
     def get_blob(self, *args, **kwargs):
         """give us a custom blob object.
 
+        Served from the metadata cache when `METADATA_CACHE` is set.
+
         Returns:
             [object]: [a custom blob/resource object]
         """
-        return self.adaptee_obj.get_blob(*args, **kwargs, options=self.settings, client=self.authenticate)
+        return self._call('get_blob', self._cached_metadata, 'blob', 'get_blob', args, kwargs)
 
     def generate_signed_url_with_custom_expiry(self, *args, **kwargs):
         """generate the signed url with custom expiry.
@@ -62,20 +946,132 @@ class Adapter(object):
         Returns:
             [string]: [returns the signed url with custom expiry]
         """
-        return self.adaptee_obj.generate_signed_url_with_custom_expiry(*args, **kwargs, options=self.settings, client=self.authenticate)
+        return self._call('generate_signed_url_with_custom_expiry', self._cached_signed_url,
+                          'generate_signed_url_with_custom_expiry', args, kwargs)
 
-    def download_to_file_pointer(self, *args, **kwargs):
+    def download_to_file_pointer(self, *args, decompress=False, verify=False, **kwargs):
         """download_to_file_pointer.
 
+        Served from the local disk cache when `DISK_CACHE` is set, verified
+        like `download`.
+
+        Args:
+            decompress (bool, optional): [undo the Content-Encoding of compressed files]. Defaults to False, the stored bytes.
+            verify (bool, optional): [check the checksums of the stored bytes]. Defaults to False.
+
+        Raises:
+            ChecksumMismatchError: [with verify, when the data does not match]
+
         Returns:
-            [type]: [returns the file pointer]
+            [type]: [returns the file pointer, the CustomBlob with its checksums with verify]
         """
-        return self.adaptee_obj.download_to_file_pointer(*args, **kwargs, options=self.settings, client=self.authenticate)
-    
+        if decompress or verify:
+            return self._call('download_to_file_pointer', self._download_to_file_pointer, *args,
+                              decompress=decompress, verify=verify, **kwargs)
+        return self._call('download_to_file_pointer', self._fetch_to_file_pointer, *args, **kwargs)
+
+    def get_checksums(self, *args, **kwargs):
+        """digests of a file advertised by the bucket.
+
+        Returns:
+            [dict]: [digest by algorithm, e.g. md5, crc32c, crc32 or sha256]
+        """
+        return self._call('get_checksums', self.adaptee_obj.get_checksums,
+                          *args, **kwargs, options=self.settings, client=self.authenticate)
+
     def get_head_object(self, *args, **kwargs):
         """get_head_object.
 
+        Served from the metadata cache when `METADATA_CACHE` is set.
+
         Returns:
             [type]: [returns the head object]
         """
-        return self.adaptee_obj.get_head_object(*args, **kwargs, options=self.settings, client=self.authenticate)
+        return self._call('get_head_object', self._cached_metadata,
+                          'head', 'get_head_object', args, kwargs)
+
+    def open_read(self, filename, *args, decompress=False, **kwargs):
+        """open a file for streamed reading.
+
+        Args:
+            filename ([string]): [name of the file in bucket]
+            decompress (bool, optional): [undo the Content-Encoding of compressed files, the reader is then forward only]. Defaults to False.
+
+        Returns:
+            [BlobReader]: [seekable file object reading ahead and iterating in chunks]
+        """
+        reader = self._call('open_read', self.adaptee_obj.open_read, filename,
+                            *args, **kwargs, options=self.settings, client=self.authenticate)
+        if decompress:
+            encoding = self._content_encoding(filename)
+            if content_codings(encoding):
+                return BlobReader(DecompressingReader(reader, encoding, reader.chunk_size),
+                                  reader.chunk_size)
+        return reader
+
+    def read_range(self, *args, **kwargs):
+        """read a byte range of a file, end excluded.
+
+        Returns:
+            [bytes]: [content of the range]
+        """
+        return self._call('read_range', self._hedged('read_range', self.adaptee_obj.read_range),
+                          *args, **kwargs, options=self.settings, client=self.authenticate)
+
+    def list_blobs(self, prefix=None, delimiter=None, page_size=None, start_after=None,
+                   page_token=None, prefetch=True):
+        """list the files of the bucket lazily, one page at a time.
+
+        Args:
+            prefix ([string], optional): [only list names starting with it]. Defaults to None.
+            delimiter ([string], optional): [group names up to it in `listing.prefixes`, e.g. '/']. Defaults to None.
+            page_size ([int], optional): [names per list request]. Defaults to 1000.
+            start_after ([string], optional): [only list names after it]. Defaults to None.
+            page_token ([string], optional): [`page_token` of an earlier listing to resume it]. Defaults to None.
+            prefetch (bool, optional): [fetch the next page while the current one is consumed]. Defaults to True.
+
+        Returns:
+            [BlobListing]: [iterator of custom blob objects]
+        """
+        pages = self._list_pages(page_token, prefix=prefix, delimiter=delimiter,
+                                 page_size=page_size, start_after=start_after)
+        return BlobListing(pages, prefetch=prefetch)
+
+    def _list_pages(self, page_token, **kwargs):
+        """pages of a listing, every page fetched as a `list_blobs` operation.
+
+        Pages are instrumented and retried one by one. A failed page kills
+        the adaptee generator, the retry lists again from the token of that
+        page with a new one.
+
+        Args:
+            page_token ([string]): [token of the first page, None to start from the beginning]
+
+        Yields:
+            [tuple]: [token of the page, its CustomBlob objects, its common prefixes and the token of the next page]
+        """
+        state = {'pages': None, 'page_token': page_token}
+
+        def fetch():
+            if state['pages'] is None:
+                state['pages'] = self.adaptee_obj.list_blob_pages(
+                    options=self.settings, client=self.authenticate,
+                    page_token=state['page_token'], **kwargs)
+            try:
+                return next(state['pages'], None)
+            except Exception:
+                state['pages'] = None
+                raise
+
+        try:
+            while True:
+                page = self._call('list_blobs', fetch)
+                if page is None:
+                    return
+                yield page
+                if not page[3]:
+                    return
+                state['page_token'] = page[3]
+        finally:
+            if state['pages'] is not None:
+                state['pages'].close()
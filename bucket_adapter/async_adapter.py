@@ -0,0 +1,392 @@
+"""asyncio adapter class."""
+
+import asyncio
+import collections
+import functools
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .adapter import Adapter
+
+# Default number of concurrent operations, the default http connection pool
+# size of both google-cloud-storage and botocore.
+DEFAULT_MAX_CONCURRENCY = 10
+
+
+class AsyncAdapter(object):
+    """AsyncAdapter exposing the Adapter methods as coroutines.
+
+    The blocking SDK calls run on a thread pool of `max_concurrency`
+    workers owned by this adapter, so no matter how many coroutines are
+    gathered at once, at most that many requests use the SDK connection
+    pool while the rest wait in the queue. Cancelling a coroutine drops its
+    call if it has not started yet; a call already running in a worker
+    thread finishes, as the SDKs offer no way to interrupt it.
+
+    Args:
+        object ([object]): [asyncio adapter class which calls the Adapter functions]
+    """
+
+    def __init__(self, settings_file, max_concurrency=None, adapter=None):
+        """__init__ function.
+
+        The Adapter is built, and authenticated, on a worker thread by the
+        first call, so creating an AsyncAdapter never blocks the event loop.
+
+        Args:
+            settings_file ([dict]): [main configuration settings of the respective service being used (s3/gcp)]
+            max_concurrency ([int], optional): [number of concurrent operations]. Defaults to `MAX_CONCURRENCY` setting or 10.
+            adapter ([Adapter], optional): [an existing adapter to wrap]. Defaults to a new Adapter(settings_file).
+        """
+        self._adapter = adapter
+        self._adapter_lock = threading.Lock()
+        self.settings = adapter.settings if adapter is not None else settings_file
+        if max_concurrency is None:
+            max_concurrency = self.settings.get(
+                'MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY)
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix='bucket-adapter')
+
+    @property
+    def adapter(self):
+        """the wrapped Adapter, built on first use.
+
+        Blocks while the Adapter authenticates the first time, coroutines
+        should await `get_adapter` instead.
+
+        Returns:
+            [Adapter]: [the adapter]
+        """
+        if self._adapter is None:
+            with self._adapter_lock:
+                if self._adapter is None:
+                    self._adapter = Adapter(self.settings)
+        return self._adapter
+
+    async def get_adapter(self):
+        """the wrapped Adapter, built on the worker threads on first use.
+
+        Returns:
+            [Adapter]: [the adapter]
+        """
+        if self._adapter is not None:
+            return self._adapter
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: self.adapter)
+
+    async def __aenter__(self):
+        """enter the async context manager.
+
+        Returns:
+            [AsyncAdapter]: [self]
+        """
+        return self
+
+    async def __aexit__(self, *exc_info):
+        """exit the async context manager and shut the worker threads down."""
+        await self.aclose()
+
+    def close(self, wait=True):
+        """shut down the worker threads.
+
+        Args:
+            wait (bool, optional): [wait for the running calls to finish]. Defaults to True.
+        """
+        self._executor.shutdown(wait=wait)
+
+    async def aclose(self):
+        """shut down the worker threads, waiting for running calls without blocking the event loop."""
+        await self._in_thread(self.close)
+
+    async def _in_thread(self, func):
+        """run a blocking cleanup call off the event loop.
+
+        Args:
+            func ([callable]): [function taking no arguments]
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, func)
+
+    def _call(self, method, args, kwargs):
+        """call an Adapter method, on a worker thread.
+
+        Args:
+            method ([string]): [name of the Adapter method]
+            args ([tuple]): [positional arguments]
+            kwargs ([dict]): [keyword arguments]
+
+        Returns:
+            [object]: [whatever the Adapter method returns]
+        """
+        return getattr(self.adapter, method)(*args, **kwargs)
+
+    async def _run(self, method, *args, **kwargs):
+        """run an Adapter method on the worker threads.
+
+        Args:
+            method ([string]): [name of the Adapter method]
+
+        Returns:
+            [object]: [whatever the Adapter method returns]
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(self._call, method, args, kwargs))
+
+    def _run_item(self, method, item):
+        """run an Adapter method for an item of `map`.
+
+        Args:
+            method ([string]): [name of the method]
+            item ([object]): [a dict of keyword arguments, a tuple of positional arguments or the single argument]
+
+        Returns:
+            [coroutine]: [the call]
+        """
+        if isinstance(item, dict):
+            return self._run(method, **item)
+        if isinstance(item, (tuple, list)):
+            return self._run(method, *item)
+        return self._run(method, item)
+
+    async def map(self, method, items, return_exceptions=True, max_pending=None):
+        """run an Adapter method for many items concurrently.
+
+        Items are passed the same way as in `Adapter.upload_many`, a dict as
+        keyword arguments, a tuple as positional arguments and anything else
+        as the single argument. Like `Adapter.upload_many`, items are pulled
+        from the iterable only while fewer than `max_pending` calls are in
+        flight; all calls share the `max_concurrency` limit.
+
+        Args:
+            method ([string]): [name of the method, e.g. 'upload']
+            items ([iterable]): [arguments for every call, consumed lazily]
+            return_exceptions (bool, optional): [return exceptions in the result list instead of raising]. Defaults to True.
+            max_pending ([int], optional): [maximum number of calls started and not yet collected]. Defaults to twice max_concurrency.
+
+        Returns:
+            [list]: [results (or exceptions) in input order]
+        """
+        if max_pending is None:
+            max_pending = self.max_concurrency * 2
+        pending = collections.deque()
+        results = []
+
+        async def collect():
+            task = pending.popleft()
+            try:
+                results.append(await task)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+
+        try:
+            for item in items:
+                pending.append(asyncio.ensure_future(self._run_item(method, item)))
+                if len(pending) >= max_pending:
+                    await collect()
+            while pending:
+                await collect()
+        finally:
+            # raised or cancelled, drop the calls not started yet.
+            for task in pending:
+                task.cancel()
+        return results
+
+    async def upload(self, *args, **kwargs):
+        """upload.
+
+        Returns:
+            [string]: [returns the url afer uploading the file to bucket]
+        """
+        return await self._run('upload', *args, **kwargs)
+
+    async def upload_fileobj(self, *args, **kwargs):
+        """upload a file object without writing it to disk first.
+
+        Returns:
+            [tuple]: [bool success and uploaded file bucket url]
+        """
+        return await self._run('upload_fileobj', *args, **kwargs)
+
+    async def upload_stream(self, *args, **kwargs):
+        """upload a file object, bytes-like object or iterable of chunks.
+
+        Returns:
+            [tuple]: [bool success and uploaded file bucket url]
+        """
+        return await self._run('upload_stream', *args, **kwargs)
+
+    async def download(self, *args, **kwargs):
+        """download.
+
+        Returns:
+            [file]: [downlaod the file in the working directory]
+        """
+        return await self._run('download', *args, **kwargs)
+
+    async def copy(self, *args, **kwargs):
+        """copy a file server side.
+
+        Returns:
+            [bool]: [True when copied, False otherwise]
+        """
+        return await self._run('copy', *args, **kwargs)
+
+    async def move(self, *args, **kwargs):
+        """move a file server side.
+
+        Returns:
+            [bool]: [True when moved, False otherwise]
+        """
+        return await self._run('move', *args, **kwargs)
+
+    async def delete(self, *args, **kwargs):
+        """delete a file.
+
+        Returns:
+            [bool]: [True when deleted, False otherwise]
+        """
+        return await self._run('delete', *args, **kwargs)
+
+    async def delete_many(self, filenames, max_workers=None):
+        """delete many files without blocking the event loop.
+
+        Results are collected on the worker threads a batch at a time. The
+        batch requests are sent by the threads of `Adapter.delete_many`,
+        at most `max_concurrency` of them, so bulk deletes keep to the
+        connection bound of this adapter.
+
+        Args:
+            filenames ([iterable]): [names of the files in bucket, consumed lazily]
+            max_workers ([int], optional): [number of concurrent batches, capped at max_concurrency]. Defaults to max_concurrency.
+
+        Yields:
+            [BulkResult]: [result of every file, in input order]
+        """
+        adapter = await self.get_adapter()
+        results = adapter.delete_many(
+            filenames, max_workers=min(max_workers or self.max_concurrency, self.max_concurrency))
+        size = adapter.adaptee_obj.DELETE_BATCH_SIZE
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                batch = await loop.run_in_executor(
+                    self._executor, functools.partial(list, itertools.islice(results, size)))
+                if not batch:
+                    break
+                for result in batch:
+                    yield result
+        finally:
+            # waits for the batches in flight.
+            await self._in_thread(results.close)
+
+    async def generate_signed_url(self, *args, **kwargs):
+        """generate the signed url.
+
+        Returns:
+            [string]: [a signed url which expires in an hour]
+        """
+        return await self._run('generate_signed_url', *args, **kwargs)
+
+    async def generate_signed_urls(self, *args, **kwargs):
+        """generate signed urls for many files in one call.
+
+        Returns:
+            [dict]: [signed url by filename]
+        """
+        return await self._run('generate_signed_urls', *args, **kwargs)
+
+    async def get_blob(self, *args, **kwargs):
+        """give us a custom blob object.
+
+        Returns:
+            [object]: [a custom blob/resource object]
+        """
+        return await self._run('get_blob', *args, **kwargs)
+
+    async def generate_signed_url_with_custom_expiry(self, *args, **kwargs):
+        """generate the signed url with custom expiry.
+
+        Returns:
+            [string]: [returns the signed url with custom expiry]
+        """
+        return await self._run('generate_signed_url_with_custom_expiry', *args, **kwargs)
+
+    async def download_to_file_pointer(self, *args, **kwargs):
+        """download_to_file_pointer.
+
+        Returns:
+            [type]: [returns the file pointer]
+        """
+        return await self._run('download_to_file_pointer', *args, **kwargs)
+
+    async def get_head_object(self, *args, **kwargs):
+        """get_head_object.
+
+        Returns:
+            [type]: [returns the head object]
+        """
+        return await self._run('get_head_object', *args, **kwargs)
+
+    async def get_checksums(self, *args, **kwargs):
+        """digests of a file advertised by the bucket.
+
+        Returns:
+            [dict]: [digest by algorithm]
+        """
+        return await self._run('get_checksums', *args, **kwargs)
+
+    async def read_range(self, *args, **kwargs):
+        """read a byte range of a file, end excluded.
+
+        Returns:
+            [bytes]: [content of the range]
+        """
+        return await self._run('read_range', *args, **kwargs)
+
+    async def iter_read(self, *args, **kwargs):
+        """read a file in chunks without blocking the event loop.
+
+        Takes the arguments of `Adapter.open_read`, every chunk is fetched on
+        the worker threads. Usable as the body of an async Django
+        StreamingHttpResponse.
+
+        Yields:
+            [bytes]: [chunks of the file]
+        """
+        reader = await self._run('open_read', *args, **kwargs)
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(self._executor, reader.read, reader.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            await self._in_thread(reader.close)
+
+    async def list_blobs(self, *args, **kwargs):
+        """list the files of the bucket without blocking the event loop.
+
+        Takes the arguments of `Adapter.list_blobs`, every page is fetched on
+        the worker threads.
+
+        Yields:
+            [CustomBlob]: [custom blob objects]
+        """
+        listing = (await self.get_adapter()).list_blobs(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                page = await loop.run_in_executor(self._executor, listing.next_page)
+                if page is None:
+                    break
+                for blob in page:
+                    yield blob
+        finally:
+            # waits for a page being prefetched.
+            await self._in_thread(listing.close)
@@ -1,14 +1,57 @@
 """AWS adapter."""
 
+import base64
+import functools
+import hashlib
+import hmac
 import logging
-from datetime import datetime, timezone
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qsl, quote, urlsplit
+
+from bucket_adapter import checksums, instrumentation, listing, transfer
+from bucket_adapter.cache import NOT_MODIFIED
+from bucket_adapter.custom_blob import CustomBlob
+from bucket_adapter.exceptions import ChecksumMismatchError
+from bucket_adapter.streams import DEFAULT_READ_CHUNKSIZE, BlobReader, RangeReader
+from bucket_adapter.transport import PoolMonitor, transport_settings
 
-import boto3
-from botocore.config import Config
-from botocore.exceptions import ClientError
-from dateutil.relativedelta import relativedelta
 
-from bucket_adapter.custom_blob import CustomBlob
+def _on_request(**kwargs):
+    """botocore handler counting every request sent, retries included."""
+    instrumentation.record(remote_calls=1)
+
+
+def _on_response(parsed=None, **kwargs):
+    """botocore handler counting the retries of a call."""
+    retries = (parsed or {}).get('ResponseMetadata', {}).get('RetryAttempts')
+    if retries:
+        instrumentation.record(retries=retries)
+
+
+def _instrument(client):
+    """report the requests of a client to the running operation.
+
+    Requests made by the s3transfer threads (upload_file, download_file,
+    ...) are not counted, their bytes are reported by progress callbacks.
+
+    Args:
+        client ([object]): [boto3 s3 client]
+
+    Returns:
+        [object]: [the client]
+    """
+    client.meta.events.register('request-created.s3', _on_request)
+    client.meta.events.register('after-call.s3', _on_response)
+    return client
+
+
+def _close_connection(request=None, **kwargs):
+    """botocore handler asking the server to close the connection of a request."""
+    request.headers['Connection'] = 'close'
 
 
 class AWS(object):
@@ -21,6 +64,126 @@ class AWS(object):
     # Default signing version to be used.
     DEFAULT_VERSION = 's3v4'
 
+    # S3 multipart upload limits.
+    MIN_PART_SIZE = 5 * 1024 * 1024
+    MAX_PARTS = 10000
+    # Keys per delete_objects request.
+    DELETE_BATCH_SIZE = 1000
+    # Digests computed by verified transfers: the CRC32 the SDK adds to
+    # uploads and the md5 of the ETag of single part objects.
+    CHECKSUM_ALGORITHMS = ('crc32', 'md5')
+    # Checksum fields of the S3 responses by algorithm.
+    CHECKSUM_FIELDS = (('crc32', 'ChecksumCRC32'), ('crc32c', 'ChecksumCRC32C'),
+                       ('sha1', 'ChecksumSHA1'), ('sha256', 'ChecksumSHA256'))
+
+    def __init__(self):
+        """__init__ function to set up the per adapter session and resources."""
+        self._session = None
+        # boto3 sessions are not thread safe, creating clients/resources from
+        # them is serialised with this lock.
+        self._lock = threading.Lock()
+        # boto3 resources are not thread safe either, so each thread gets its
+        # own resource built from the shared session.
+        self._local = threading.local()
+        # utilisation of the connection pools of the clients, see `TRANSPORT`.
+        self.pool_monitor = PoolMonitor()
+
+    def _get_config(self, options):
+        """botocore config shared by the client and the resources.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+
+        Returns:
+            [object]: [botocore config object]
+        """
+        from botocore.config import Config
+
+        kwargs = {'signature_version': self._get_signature_version(options)}
+        transport = transport_settings(options)
+        if transport is not None:
+            kwargs['max_pool_connections'] = transport.pool_size
+            kwargs['tcp_keepalive'] = transport.tcp_keepalive
+            if transport.connect_timeout is not None:
+                kwargs['connect_timeout'] = transport.connect_timeout
+            if transport.read_timeout is not None:
+                kwargs['read_timeout'] = transport.read_timeout
+        return Config(**kwargs)
+
+    def _tune_transport(self, client, options):
+        """monitor the connection pool of a client and apply `KEEPALIVE`.
+
+        botocore has no public hook on its pool manager, the monitor is
+        installed on the one of the client endpoint when it can be found.
+
+        Args:
+            client ([object]): [boto3 s3 client]
+            options ([dict]): [options dict contains all the configuration settings]
+
+        Returns:
+            [object]: [the client]
+        """
+        transport = transport_settings(options)
+        if transport is None:
+            return client
+        if not transport.keepalive:
+            client.meta.events.register('before-send.s3', _close_connection)
+        http_session = getattr(getattr(client, '_endpoint', None), 'http_session', None)
+        manager = getattr(http_session, '_manager', None)
+        if manager is not None:
+            self.pool_monitor.install(manager)
+        else:
+            logging.warning("connection pool of %r not found, it is not monitored", client)
+        return client
+
+    def _get_credentials(self, options):
+        """credential kwargs used to build clients and resources.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+
+        Returns:
+            [dict]: [keyword arguments for session.client/session.resource]
+        """
+        credentials = dict(options.get('CREDENTIALS', {}))
+        if 'ACCESS_KEY' in options:
+            credentials['aws_access_key_id'] = options['ACCESS_KEY']
+        if 'SECRET_KEY' in options:
+            credentials['aws_secret_access_key'] = options['SECRET_KEY']
+        return credentials
+
+    def _get_session(self):
+        """get the long lived boto3 session of this adapter.
+
+        Returns:
+            [object]: [boto3 session]
+        """
+        import boto3
+
+        with self._lock:
+            if self._session is None:
+                self._session = boto3.session.Session()
+            return self._session
+
+    def _get_resource(self, options):
+        """get the s3 resource of the current thread, created on first use.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+
+        Returns:
+            [object]: [boto3 s3 service resource]
+        """
+        resource = getattr(self._local, 'resource', None)
+        if resource is None:
+            session = self._get_session()
+            with self._lock:
+                resource = session.resource('s3', config=self._get_config(options),
+                                            **self._get_credentials(options))
+            self._tune_transport(_instrument(resource.meta.client), options)
+            self._local.resource = resource
+        return resource
+
     def _get_signature_version(self, options: dict) -> str:
         """return a valid signature version for use in signing.
 
@@ -30,7 +193,7 @@ class AWS(object):
         Returns:
             str: Defaults to s3v4 if not found in options.
         """
-        version = options.get('SIGNATURE_VERSION', self.DEFAULT_VERSION)
+        return options.get('SIGNATURE_VERSION', self.DEFAULT_VERSION)
 
     def authenticate(self, options):
         """authenticate function to authenticate the service (aws s3/gcp bucket).
@@ -41,12 +204,14 @@ class AWS(object):
         Returns:
             [object]: [a client object when authentication is successful else exception is raised]
         """
+        from botocore.exceptions import ClientError
+
         try:
-            client = boto3.client('s3',
-                                  config=Config(
-                                      signature_version=self._get_signature_version(options)),
-                                  **options['CREDENTIALS'])
-            return client
+            session = self._get_session()
+            with self._lock:
+                client = session.client('s3', config=self._get_config(options),
+                                        **options['CREDENTIALS'])
+            return self._tune_transport(_instrument(client), options)
         except ClientError as e:
             logging.error(e)
             raise Exception('Authentication Failed')
@@ -59,19 +224,266 @@ class AWS(object):
         :param object_name: S3 object name. If not specified then file_name is used
         :return: True if file was uploaded, else False
         """
+        from botocore.exceptions import ClientError
+
         if bucket_filename is None:
             bucket_filename = filename
         try:
-            client.upload_file(
-                filename, options['BUCKET_NAME'], bucket_filename, ExtraArgs)
+            threshold, _, _ = transfer.multipart_settings(options)
+            if threshold is not None and os.path.getsize(filename) >= threshold:
+                self._upload_multipart(
+                    filename, options, client, bucket_filename, ExtraArgs)
+            else:
+                client.upload_file(
+                    filename, options['BUCKET_NAME'], bucket_filename, ExtraArgs,
+                    Callback=instrumentation.progress_callback())
             # NOTE: S3 client does not return anything, so to make sure our interface
             # signature remains same, we will add a dummy url with file name.
             url_link = f'https://localhost/{bucket_filename}'
             return True, url_link
         except ClientError as e:
             logging.error(e)
+            instrumentation.record(error=e)
             return False
 
+    def _get_transfer_config(self, options):
+        """s3transfer config built from the multipart settings.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+
+        Returns:
+            [object]: [boto3 TransferConfig]
+        """
+        from boto3.s3.transfer import TransferConfig
+
+        threshold, chunksize, concurrency = transfer.multipart_settings(options)
+        kwargs = {'multipart_chunksize': chunksize, 'max_concurrency': concurrency}
+        if threshold is not None:
+            kwargs['multipart_threshold'] = threshold
+        return TransferConfig(**kwargs)
+
+    def upload_fileobj(self, fileobj, bucket_filename, options, client, ExtraArgs=None, size=None):
+        """stream a file object to the S3 bucket.
+
+        Non seekable streams are sent as a multipart upload holding only
+        `MULTIPART_CONCURRENCY` parts of `MULTIPART_CHUNKSIZE` bytes in
+        memory at a time.
+
+        Args:
+            fileobj ([object]): [readable file object]
+            bucket_filename ([string]): [object key]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+            ExtraArgs ([dict], optional): [extra arguments, e.g. ContentType]. Defaults to None.
+            size ([int], optional): [not needed by s3transfer]. Defaults to None.
+
+        Returns:
+            [tuple]: [bool success and uploaded file bucket url]
+        """
+        from botocore.exceptions import ClientError
+
+        try:
+            client.upload_fileobj(fileobj, options['BUCKET_NAME'], bucket_filename,
+                                  ExtraArgs=ExtraArgs,
+                                  Callback=instrumentation.progress_callback(),
+                                  Config=self._get_transfer_config(options))
+            url_link = f'https://localhost/{bucket_filename}'
+            return True, url_link
+        except ClientError as e:
+            logging.error(e)
+            instrumentation.record(error=e)
+            return False
+
+    def _find_multipart_upload(self, client, bucket, key):
+        """find an unfinished multipart upload of a key to resume.
+
+        Args:
+            client ([object]): [client object received after successful authentication]
+            bucket ([string]): [bucket name]
+            key ([string]): [object key]
+
+        Returns:
+            [tuple]: [upload id (None if there is none) and the uploaded parts by part number]
+        """
+        uploads = [upload for upload in client.list_multipart_uploads(
+            Bucket=bucket, Prefix=key).get('Uploads', []) if upload['Key'] == key]
+        if not uploads:
+            return None, {}
+        upload_id = max(uploads, key=lambda upload: upload['Initiated'])['UploadId']
+        parts = {}
+        paginator = client.get_paginator('list_parts')
+        for page in paginator.paginate(Bucket=bucket, Key=key, UploadId=upload_id):
+            for part in page.get('Parts', []):
+                parts[part['PartNumber']] = part
+        return upload_id, parts
+
+    def _upload_multipart(self, filename, options, client, bucket_filename, ExtraArgs=None):
+        """upload a large file as a parallel S3 multipart upload.
+
+        Parts of `MULTIPART_CHUNKSIZE` bytes are streamed from disk by
+        `MULTIPART_CONCURRENCY` threads. When a part fails the upload is left
+        open and the next upload of the same key (with `MULTIPART_RESUME`,
+        the default) only sends the parts that are missing. A bucket
+        lifecycle rule should abort abandoned uploads. In verified uploads
+        every thread hashes its part while it is sent and checks it against
+        the digests S3 returns for it; the parts of a resumed upload are
+        hashed from disk, checked against those S3 lists and sent again
+        when they differ.
+
+        Args:
+            filename ([string]): [file to upload]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+            bucket_filename ([string]): [object key]
+            ExtraArgs ([dict], optional): [extra arguments of create_multipart_upload]. Defaults to None.
+        """
+        started = time.monotonic()
+        bucket = options['BUCKET_NAME']
+        size = os.path.getsize(filename)
+        _, chunksize, concurrency = transfer.multipart_settings(options)
+        chunksize = max(chunksize, self.MIN_PART_SIZE, -(-size // self.MAX_PARTS))
+        upload_id, uploaded = None, {}
+        if options.get('MULTIPART_RESUME', True):
+            upload_id, uploaded = self._find_multipart_upload(
+                client, bucket, bucket_filename)
+        if upload_id is None:
+            upload_id = client.create_multipart_upload(
+                Bucket=bucket, Key=bucket_filename, **(ExtraArgs or {}))['UploadId']
+
+        hasher = checksums.current_hasher()
+
+        def upload_part(part_number, start, end):
+            part = uploaded.get(part_number)
+            if part is not None and part['Size'] == end - start:
+                if hasher is None:
+                    return part['ETag']
+                part_hasher = checksums.StreamHasher(self.CHECKSUM_ALGORITHMS, start)
+                transfer.hash_part(filename, start, end, (hasher, part_hasher))
+                try:
+                    checksums.verify('{} part {}'.format(bucket_filename, part_number),
+                                     self._get_checksums(part), part_hasher.digests())
+                    return part['ETag']
+                except ChecksumMismatchError as e:
+                    logging.warning("%s, sending it again", e)
+            part_hasher = None
+            if hasher is not None:
+                part_hasher = checksums.StreamHasher(self.CHECKSUM_ALGORITHMS, start)
+            with transfer.PartReader(filename, start, end, (hasher, part_hasher)) as body:
+                response = client.upload_part(
+                    Bucket=bucket, Key=bucket_filename, UploadId=upload_id,
+                    PartNumber=part_number, Body=body, ContentLength=end - start)
+            if part_hasher is not None:
+                checksums.verify('{} part {}'.format(bucket_filename, part_number),
+                                 self._get_checksums(response), part_hasher.digests())
+            instrumentation.record(bytes=end - start)
+            return response['ETag']
+
+        ranges = transfer.split_ranges(size, chunksize)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            etags = list(executor.map(
+                instrumentation.bind(upload_part), range(1, len(ranges) + 1), *zip(*ranges)))
+        client.complete_multipart_upload(
+            Bucket=bucket, Key=bucket_filename, UploadId=upload_id,
+            MultipartUpload={'Parts': [{'PartNumber': number, 'ETag': etag}
+                                       for number, etag in enumerate(etags, 1)]})
+        transfer.log_throughput('upload', bucket_filename, size,
+                                time.monotonic() - started)
+
+    def _get_ranged_head(self, options, client, key):
+        """head of an object large enough for a ranged download.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+            key ([string]): [object key]
+
+        Returns:
+            [dict]: [head_object response, None when ranged downloads are disabled or the object is small]
+        """
+        threshold, _, _ = transfer.ranged_download_settings(options)
+        if threshold is None:
+            return None
+        head = client.head_object(
+            Bucket=options['BUCKET_NAME'], Key=key, ChecksumMode='ENABLED')
+        if head['ContentLength'] < threshold:
+            return None
+        return head
+
+    def _get_checksums(self, head):
+        """full object digests advertised by a head_object response.
+
+        Composite (multipart) checksums are skipped, checksums of multipart
+        objects are only used when their type says FULL_OBJECT. The ETag is
+        only used as md5 for single part objects not encrypted with
+        KMS/SSE-C. Works for upload_part responses too.
+
+        Args:
+            head ([dict]): [head_object response]
+
+        Returns:
+            [dict]: [digest by algorithm]
+        """
+        expected = {}
+        etag = head.get('ETag', '').strip('"')
+        checksum_type = head.get('ChecksumType')
+        for algorithm, field in self.CHECKSUM_FIELDS:
+            value = head.get(field)
+            if value and '-' not in value and checksum_type != 'COMPOSITE' \
+                    and ('-' not in etag or checksum_type == 'FULL_OBJECT'):
+                expected[algorithm] = base64.b64decode(value)
+        if etag and '-' not in etag and head.get('ServerSideEncryption') != 'aws:kms' \
+                and 'SSECustomerAlgorithm' not in head:
+            expected['md5'] = bytes.fromhex(etag)
+        return expected
+
+    def _fetch_range(self, options, client, key, etag, start, end):
+        """fetch a byte range of an object.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+            key ([string]): [object key]
+            etag ([string]): [ETag the object must still have, None to skip the check]
+            start ([int]): [first byte]
+            end ([int]): [end of the range, excluded, None for the end of the object]
+
+        Returns:
+            [bytes]: [content of the range]
+        """
+        kwargs = {'IfMatch': etag} if etag else {}
+        last = '' if end is None else end - 1
+        data = client.get_object(
+            Bucket=options['BUCKET_NAME'], Key=key,
+            Range='bytes={}-{}'.format(start, last), **kwargs)['Body'].read()
+        instrumentation.record(bytes=len(data))
+        return data
+
+    def _download_ranges(self, options, client, key, head, fileobj):
+        """download an object as concurrent byte ranges.
+
+        Every range is pinned to the ETag of `head` so a concurrent
+        overwrite fails the download instead of mixing two versions; the
+        result is checked against the object checksums, hashed by the
+        threads fetching the ranges.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+            key ([string]): [object key]
+            head ([dict]): [head_object response of the object]
+            fileobj ([object]): [writable and seekable destination]
+        """
+        _, chunksize, concurrency = transfer.ranged_download_settings(options)
+        fetch = functools.partial(
+            self._fetch_range, options, client, key, head['ETag'])
+        start = fileobj.tell()
+        expected = self._get_checksums(head)
+        hasher = checksums.current_hasher() or checksums.StreamHasher(expected)
+        transfer.download_ranges(fetch, head['ContentLength'], fileobj,
+                                 chunksize, concurrency, hasher)
+        transfer.verify_download(key, fileobj, start, expected, hasher)
+
     def download(self, filename, options, client, bucket_filename=None):
         """download file.
 
@@ -83,15 +495,25 @@ class AWS(object):
         Returns:
             [type]: [description]
         """
+        from botocore.exceptions import ClientError
+
         try:
             if bucket_filename is None:
                 bucket_filename = filename
-            response = client.download_file(
-                options['BUCKET_NAME'], bucket_filename, filename)
+            head = self._get_ranged_head(options, client, bucket_filename)
+            if head is not None:
+                with open(filename, 'wb+') as fileobj:
+                    self._download_ranges(
+                        options, client, bucket_filename, head, fileobj)
+            else:
+                client.download_file(
+                    options['BUCKET_NAME'], bucket_filename, filename,
+                    Callback=instrumentation.progress_callback())
             # FIXME: return proper type.
             return ('File Downloaded in your working directory')
         except ClientError as e:
             logging.error(e)
+            instrumentation.record(error=e)
             return None
 
     def generate_signed_url(self, filename, options, client, expiration=3600):
@@ -106,6 +528,8 @@ class AWS(object):
         Returns:
             [type]: [description]
         """
+        from botocore.exceptions import ClientError
+
         try:
             response = client.generate_presigned_url('get_object',
                                                      Params={'Bucket': options['BUCKET_NAME'],
@@ -114,25 +538,150 @@ class AWS(object):
             return response
         except ClientError as e:
             logging.error(e)
+            instrumentation.record(error=e)
             return None
 
-    def get_blob(self, filename, options, client=None):
+    def _expires_in(self, expiration):
+        """convert an expiration to the number of seconds a url stays valid.
+
+        Args:
+            expiration ([int/timedelta/datetime]): [seconds, a duration or an aware expiry datetime]
+
+        Returns:
+            [int]: [number of seconds, defaults to an hour when expiration is None]
+        """
+        if expiration is None:
+            return 3600
+        if isinstance(expiration, datetime):
+            expiration = expiration - datetime.utcnow().replace(tzinfo=timezone.utc)
+        if isinstance(expiration, timedelta):
+            return int(expiration.total_seconds())
+        return int(expiration)
+
+    def _get_batch_signer(self, url, filename, options):
+        """build a SigV4 query signer from an url presigned by botocore.
+
+        The scope, date and query parameters of `url` are reused for other
+        keys of the same bucket and the signing key is derived only once, so
+        signing another key costs two sha256 and one hmac instead of a full
+        trip through the botocore request pipeline. The signer is checked
+        against `url` first, None is returned when it cannot reproduce it.
+
+        Args:
+            url ([string]): [url presigned by botocore for filename]
+            filename ([string]): [key url was signed for]
+            options ([dict]): [options dict contains all the configuration settings]
+
+        Returns:
+            [callable]: [function returning the signed url of a key, or None]
+        """
+        parts = urlsplit(url)
+        query = parse_qsl(parts.query, keep_blank_values=True)
+        params = dict(query)
+        quoted_filename = quote(filename, safe='/~')
+        if params.get('X-Amz-Algorithm') != 'AWS4-HMAC-SHA256' or \
+                params.get('X-Amz-SignedHeaders') != 'host' or \
+                not parts.path.endswith(quoted_filename):
+            return None
+        secret_key = self._get_credentials(options).get('aws_secret_access_key')
+        if secret_key is None:
+            credentials = self._get_session().get_credentials()
+            if credentials is None:
+                return None
+            secret_key = credentials.get_frozen_credentials().secret_key
+        _, date, region, service, terminal = params['X-Amz-Credential'].split('/')
+        signing_key = ('AWS4' + secret_key).encode('utf-8')
+        for value in (date, region, service, terminal):
+            signing_key = hmac.new(signing_key, value.encode('utf-8'), hashlib.sha256).digest()
+        scope = '/'.join((date, region, service, terminal))
+        prefix = parts.path[:-len(quoted_filename)]
+        canonical_query = '&'.join(sorted(
+            '{}={}'.format(quote(key, safe='-_.~'), quote(value, safe='-_.~'))
+            for key, value in query if key != 'X-Amz-Signature'))
+
+        def sign(key):
+            path = prefix + quote(key, safe='/~')
+            canonical_request = '\n'.join((
+                'GET', path, canonical_query, 'host:' + parts.netloc, '', 'host',
+                'UNSIGNED-PAYLOAD'))
+            string_to_sign = '\n'.join((
+                'AWS4-HMAC-SHA256', params['X-Amz-Date'], scope,
+                hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()))
+            signature = hmac.new(signing_key, string_to_sign.encode('utf-8'),
+                                 hashlib.sha256).hexdigest()
+            return '{}://{}{}?{}&X-Amz-Signature={}'.format(
+                parts.scheme, parts.netloc, path, canonical_query, signature)
+
+        if sign(filename).rsplit('=', 1)[1] != params.get('X-Amz-Signature'):
+            return None
+        return sign
+
+    def generate_signed_urls(self, filenames, options, client, expiration=3600):
+        """signed urls for many files at once.
+
+        The first url is presigned by botocore, the rest reuse its signing
+        key (see `_get_batch_signer`). Falls back to botocore for every key
+        when the configured signature version is not SigV4.
+
+        Args:
+            filenames ([iterable]): [filenames to generate signed urls for]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [a client object received after successful authentication]
+            expiration ([int/timedelta/datetime], optional): [expiry of the urls]. Defaults to 3600.
+
+        Returns:
+            [dict]: [signed url by filename]
+        """
+        from botocore.exceptions import ClientError
+
+        filenames = list(filenames)
+        expires_in = self._expires_in(expiration)
+        urls = {}
+        signer = None
+        try:
+            for filename in filenames:
+                if signer is not None:
+                    urls[filename] = signer(filename)
+                    continue
+                urls[filename] = client.generate_presigned_url(
+                    'get_object',
+                    Params={'Bucket': options['BUCKET_NAME'], 'Key': filename},
+                    ExpiresIn=expires_in)
+                if len(urls) == 1:
+                    signer = self._get_batch_signer(urls[filename], filename, options)
+            return urls
+        except ClientError as e:
+            logging.error(e)
+            instrumentation.record(error=e)
+            return None
+
+    def get_blob(self, filename, options, client=None, if_none_match=None):
         """a resource object.
 
         Args:
             filename ([string]): [filename]
             options ([dict]): [options dict contains all the configuration settings]
+            client ([object], optional): [client object, needed for conditional requests]. Defaults to None.
+            if_none_match ([string], optional): [ETag of a cached copy, makes the request conditional]. Defaults to None.
+
+        Raises:
+            ClientError: [when the object does not exist]
 
         Returns:
-            [object]: [a custom blob/resource object]
+            [object]: [a custom blob/resource object, NOT_MODIFIED when the object still has ETag if_none_match]
         """
-        client = boto3.resource('s3',
-                                aws_access_key_id=options['ACCESS_KEY'],
-                                aws_secret_access_key=options['SECRET_KEY'],
-                                config=Config(
-                                    signature_version=self._get_signature_version(options))
-                                )
-        resource = client.Object(options['BUCKET_NAME'], filename)
+        resource = self._get_resource(options).Object(
+            options['BUCKET_NAME'], filename)
+        if if_none_match is not None:
+            _, response = self._head_object(filename, options, client, if_none_match)
+            if response is NOT_MODIFIED:
+                return response
+            # the resource is loaded from the response, no second HEAD.
+            resource.meta.data = response
+        else:
+            # the HEAD runs here, in the retried and instrumented call,
+            # not on the first field access of the CustomBlob.
+            resource.load()
         resource = CustomBlob(
             blob=resource, options=options, filename=filename)
         return resource
@@ -149,57 +698,260 @@ class AWS(object):
         Returns:
             [string]: [a signed url of the file you want to access (download)]
         """
+        from botocore.exceptions import ClientError
+
         try:
-            if not expiration:
-                # defaulting to an hour
-                expiration = datetime.utcnow().replace(tzinfo=timezone.utc) + \
-                    relativedelta(seconds=3600)
-            delta = expiration - datetime.utcnow().replace(tzinfo=timezone.utc)
+            # whole seconds of the duration, defaulting to an hour.
             response = client.generate_presigned_url('get_object',
                                                      Params={'Bucket': options['BUCKET_NAME'],
                                                              'Key': filename},
-                                                     ExpiresIn=delta.seconds)
+                                                     ExpiresIn=self._expires_in(expiration or None))
             return response
         except ClientError as e:
             logging.error(e)
+            instrumentation.record(error=e)
             return None
 
-    def download_to_file_pointer(self, filename, tempfile_name, client, options):
+    def download_to_file_pointer(self, filename, tempfile_name, client, options, version=None):
         """download to file pointer.
 
         Args:
             filename ([string]): [description]
             client ([object]): [client object of the service used (aws s3/gcp bucket)]
             options ([dict]): [options dict that contains all the configuration settings]
+            version ([string], optional): [ETag the object must have, the download fails otherwise]. Defaults to None.
 
         Returns:
             [type]: [description]
         """
-        resource = boto3.resource('s3',
-                                  aws_access_key_id=options['ACCESS_KEY'],
-                                  aws_secret_access_key=options['SECRET_KEY'],
-                                  config=Config(
-                                      signature_version=self._get_signature_version(options))
-                                  )
-        bucket = resource.Bucket(options['BUCKET_NAME'])
-        response = bucket.download_fileobj(filename, tempfile_name)
+        # ranges are written at their offset, streams are downloaded in order.
+        head = None
+        if transfer.seekable(tempfile_name):
+            head = self._get_ranged_head(options, client, filename)
+        if head is not None:
+            if version is not None:
+                head = dict(head, ETag=version)
+            return self._download_ranges(options, client, filename, head, tempfile_name)
+        tempfile_name = checksums.hashing_writer(tempfile_name)
+        if version is not None:
+            # s3transfer does not take IfMatch, read the body ourselves.
+            body = client.get_object(
+                Bucket=options['BUCKET_NAME'], Key=filename, IfMatch=version)['Body']
+            for chunk in body.iter_chunks(DEFAULT_READ_CHUNKSIZE):
+                tempfile_name.write(chunk)
+                instrumentation.record(bytes=len(chunk))
+            return None
+        # the client is thread safe and already authenticated, no resource
+        # is needed for a plain download.
+        response = client.download_fileobj(
+            options['BUCKET_NAME'], filename, tempfile_name,
+            Callback=instrumentation.progress_callback())
         return response
 
-    def get_head_object(self, filename, options, client):
+    def open_read(self, filename, options, client, chunk_size=DEFAULT_READ_CHUNKSIZE):
+        """open an object for streamed reading.
+
+        Args:
+            filename ([string]): [object key]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+            chunk_size ([int], optional): [readahead and iteration chunk size]. Defaults to 1 MiB.
+
+        Returns:
+            [BlobReader]: [seekable file object iterating in chunks]
+        """
+        head = client.head_object(Bucket=options['BUCKET_NAME'], Key=filename)
+        fetch = functools.partial(
+            self._fetch_range, options, client, filename, head['ETag'])
+        return BlobReader(RangeReader(fetch, head['ContentLength']), chunk_size)
+
+    def read_range(self, filename, start, end, options, client):
+        """read a byte range of an object with a single request.
+
+        Args:
+            filename ([string]): [object key]
+            start ([int]): [first byte]
+            end ([int]): [end of the range, excluded, None for the end of the object]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+
+        Returns:
+            [bytes]: [content of the range]
+        """
+        if end is not None and end <= start:
+            return b''
+        return self._fetch_range(options, client, filename, None, start, end)
+
+    def get_checksums(self, filename, options, client):
+        """full object digests of an object, see `_get_checksums`.
+
+        Args:
+            filename ([string]): [object key]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+
+        Raises:
+            ClientError: [when the object does not exist]
+
+        Returns:
+            [dict]: [digest by algorithm]
+        """
+        head = client.head_object(
+            Bucket=options['BUCKET_NAME'], Key=filename, ChecksumMode='ENABLED')
+        return self._get_checksums(head)
+
+    def _head_object(self, filename, options, client, if_none_match=None):
+        """head_object, conditional when if_none_match is given.
+
+        Args:
+            filename ([string]): [file name]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+            if_none_match ([string], optional): [ETag of a cached copy]. Defaults to None.
+
+        Raises:
+            ClientError: [for any error but the 304 of an unchanged object]
+
+        Returns:
+            [tuple]: [True and the head_object response, or NOT_MODIFIED]
+        """
+        from botocore.exceptions import ClientError
+
+        kwargs = {'IfNoneMatch': if_none_match} if if_none_match is not None else {}
+        try:
+            return True, client.head_object(
+                Bucket=options['BUCKET_NAME'], Key=filename, **kwargs)
+        except ClientError as e:
+            if if_none_match is not None and e.response.get('Error', {}).get('Code') in ('304', 'NotModified'):
+                return True, NOT_MODIFIED
+            raise
+
+    def get_head_object(self, filename, options, client, if_none_match=None):
         """get head_object of s3 object.
 
         Args:
             Key ([string]): [file name]
             options ([dict]): [description]
             client ([dict]): [description]
+            if_none_match ([string], optional): [ETag of a cached copy, makes the request conditional]. Defaults to None.
 
         Returns:
-            [dict]: [meta data of S3 object]
+            [dict]: [meta data of S3 object, NOT_MODIFIED when unchanged]
         """
+        from botocore.exceptions import ClientError
+
         try:
-            response = client.head_object(
-                Bucket=options['BUCKET_NAME'], Key=filename)
-            return True, response
+            return self._head_object(filename, options, client, if_none_match)
         except ClientError as e:
             logging.error(e)
+            instrumentation.record(error=e)
             return False, None
+
+    def list_blob_pages(self, options, client, prefix=None, delimiter=None, page_size=None,
+                        start_after=None, page_token=None):
+        """list the objects page by page with list_objects_v2.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+            prefix ([string], optional): [only list keys starting with it]. Defaults to None.
+            delimiter ([string], optional): [group keys up to it in common prefixes, e.g. '/']. Defaults to None.
+            page_size ([int], optional): [keys per request, at most 1000]. Defaults to 1000.
+            start_after ([string], optional): [only list keys after it]. Defaults to None.
+            page_token ([string], optional): [continuation token to resume from]. Defaults to None.
+
+        Yields:
+            [tuple]: [token of the page, its CustomBlob objects, its common prefixes and the token of the next page]
+        """
+        params = {'Bucket': options['BUCKET_NAME'],
+                  'MaxKeys': page_size or listing.DEFAULT_PAGE_SIZE}
+        if prefix:
+            params['Prefix'] = prefix
+        if delimiter:
+            params['Delimiter'] = delimiter
+        if start_after:
+            params['StartAfter'] = start_after
+        while True:
+            if page_token:
+                params['ContinuationToken'] = page_token
+            response = client.list_objects_v2(**params)
+            blobs = [CustomBlob.from_fields(name=item['Key'],
+                                            time_created=item.get('LastModified'),
+                                            bucket=options['BUCKET_NAME'],
+                                            size=item.get('Size'),
+                                            etag=item.get('ETag'))
+                     for item in response.get('Contents', ())]
+            prefixes = [item['Prefix'] for item in response.get('CommonPrefixes', ())]
+            next_token = response.get('NextContinuationToken') if response.get('IsTruncated') else None
+            yield page_token, blobs, prefixes, next_token
+            if not next_token:
+                return
+            page_token = next_token
+
+    def copy(self, source, destination, options, client):
+        """copy an object server side.
+
+        s3transfer sends a copy_object request, or an UploadPartCopy
+        multipart copy for objects over `MULTIPART_THRESHOLD` (the 5 GiB
+        copy_object limit otherwise), the data never leaves S3.
+
+        Args:
+            source ([string]): [key of the object to copy]
+            destination ([string]): [key of the copy]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+
+        Returns:
+            [bool]: [True when copied, False otherwise]
+        """
+        from botocore.exceptions import ClientError
+
+        try:
+            client.copy({'Bucket': options['BUCKET_NAME'], 'Key': source},
+                        options['BUCKET_NAME'], destination,
+                        Config=self._get_transfer_config(options))
+            return True
+        except ClientError as e:
+            logging.error(e)
+            instrumentation.record(error=e)
+            return False
+
+    def delete(self, filename, options, client):
+        """delete an object, deleting a missing object succeeds.
+
+        Args:
+            filename ([string]): [object key]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+
+        Returns:
+            [bool]: [True when deleted, False otherwise]
+        """
+        from botocore.exceptions import ClientError
+
+        try:
+            client.delete_object(Bucket=options['BUCKET_NAME'], Key=filename)
+            return True
+        except ClientError as e:
+            logging.error(e)
+            instrumentation.record(error=e)
+            return False
+
+    def delete_batch(self, filenames, options, client):
+        """delete up to DELETE_BATCH_SIZE objects with one delete_objects request.
+
+        Args:
+            filenames ([list]): [object keys]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+
+        Returns:
+            [dict]: [exception by key of the objects not deleted]
+        """
+        from botocore.exceptions import ClientError
+
+        response = client.delete_objects(
+            Bucket=options['BUCKET_NAME'],
+            Delete={'Objects': [{'Key': filename} for filename in filenames], 'Quiet': True})
+        return {error['Key']: ClientError({'Error': error}, 'DeleteObjects')
+                for error in response.get('Errors', ())}
@@ -0,0 +1,87 @@
+"""bulk operations helpers."""
+
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+# Default number of worker threads used by the bulk operations.
+DEFAULT_MAX_WORKERS = 8
+
+BulkResult = collections.namedtuple('BulkResult', ['item', 'result', 'error'])
+BulkResult.__doc__ = """result of one item of a bulk operation.
+
+Args:
+    item ([object]): [the input item]
+    result ([object]): [value returned for the item, None when it failed]
+    error ([Exception]): [exception raised for the item, None on success]
+"""
+
+
+def _call_item(func, item):
+    """call func with an item.
+
+    A dict item is passed as keyword arguments, a tuple/list item as
+    positional arguments and anything else as the single argument.
+
+    Args:
+        func ([callable]): [function to call]
+        item ([object]): [item to pass to the function]
+
+    Returns:
+        [object]: [whatever func returns]
+    """
+    if isinstance(item, dict):
+        return func(**item)
+    if isinstance(item, (tuple, list)):
+        return func(*item)
+    return func(item)
+
+
+def _get_result(item, future):
+    """wait for a future and wrap its outcome in a BulkResult.
+
+    Args:
+        item ([object]): [the input item]
+        future ([object]): [future of the call made for the item]
+
+    Returns:
+        [BulkResult]: [result of the item]
+    """
+    try:
+        return BulkResult(item, future.result(), None)
+    except Exception as e:
+        return BulkResult(item, None, e)
+
+
+def run_bounded(func, items, max_workers=DEFAULT_MAX_WORKERS, max_pending=None):
+    """call func for every item on a bounded thread pool.
+
+    Items are pulled from the iterable only while fewer than `max_pending`
+    calls are in flight, so arbitrarily large (or endless) iterables are
+    processed with bounded memory. Results are yielded in input order and an
+    exception raised for one item does not stop the others.
+
+    Args:
+        func ([callable]): [function called for every item]
+        items ([iterable]): [items to process, see `_call_item`]
+        max_workers (int, optional): [number of worker threads]. Defaults to DEFAULT_MAX_WORKERS.
+        max_pending ([int], optional): [maximum number of submitted calls not yet yielded]. Defaults to twice max_workers.
+
+    Yields:
+        [BulkResult]: [result of every item, in input order]
+    """
+    if max_pending is None:
+        max_pending = max_workers * 2
+    pending = collections.deque()
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for item in items:
+            pending.append((item, executor.submit(_call_item, func, item)))
+            if len(pending) >= max_pending:
+                yield _get_result(*pending.popleft())
+        while pending:
+            yield _get_result(*pending.popleft())
+    finally:
+        # the caller stopped iterating early, drop the queued calls.
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
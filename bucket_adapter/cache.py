@@ -0,0 +1,343 @@
+"""in memory caches."""
+
+import collections
+import datetime
+import math
+import threading
+import time
+
+# Returned by the adaptees when a conditional metadata request finds the
+# object unchanged.
+NOT_MODIFIED = object()
+
+# Rough per entry overhead (key tuple, entry list, dict slot) in bytes.
+ENTRY_OVERHEAD = 200
+
+
+class LRUCache(object):
+    """thread safe LRU cache with expiring entries and a memory cap.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        """__init__ function.
+
+        Args:
+            max_entries ([int], optional): [maximum number of entries]. Defaults to unbounded.
+            max_bytes ([int], optional): [maximum total size of the entries]. Defaults to unbounded.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """number of entries.
+
+        Returns:
+            [int]: [number of entries]
+        """
+        return len(self._entries)
+
+    def get(self, key, min_remaining=0):
+        """get a value while it has at least min_remaining seconds left.
+
+        Args:
+            key ([object]): [cache key]
+            min_remaining (int, optional): [seconds the entry must stay valid]. Defaults to 0.
+
+        Returns:
+            [object]: [cached value, None on a miss]
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[1] is not None and entry[1] - now < min_remaining):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key):
+        """get a value and its expiry even if it expired, without stats.
+
+        Args:
+            key ([object]): [cache key]
+
+        Returns:
+            [tuple]: [cached value and expiry, (None, None) when missing]
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def set(self, key, value, expires_at=None, size=0):
+        """add or replace a value, evicting the least recently used ones.
+
+        Args:
+            key ([object]): [cache key]
+            value ([object]): [value to cache]
+            expires_at ([float], optional): [unix time the value expires at]. Defaults to never.
+            size (int, optional): [size of the value in bytes]. Defaults to 0.
+        """
+        size += ENTRY_OVERHEAD
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = [value, expires_at, size]
+            self._bytes += size
+            while self._entries and (
+                    (self.max_entries is not None and len(self._entries) > self.max_entries)
+                    or (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[2]
+                self.evictions += 1
+
+    def pop(self, key):
+        """remove a value.
+
+        Args:
+            key ([object]): [cache key]
+
+        Returns:
+            [object]: [removed value, None if there was none]
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self._bytes -= entry[2]
+            return entry[0]
+
+    def clear(self):
+        """remove all the values, the stats are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """hit/miss statistics.
+
+        Returns:
+            [dict]: [hits, misses, hit_ratio, evictions, entries and bytes]
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+
+class SignedUrlCache(LRUCache):
+    """LRU cache of signed urls.
+
+    Urls are keyed by (bucket, filename, method, expiry bucket). A relative
+    expiry (seconds or timedelta) is its own bucket and the url is reused
+    while at least `min_remaining_ratio` of the requested validity is left.
+    Absolute expiries (datetime) are rounded up to the end of windows of
+    `granularity` seconds and the urls signed for that end (see
+    `sign_expiration`), so a cached url may stay valid up to that much
+    longer than asked but never expires earlier. Urls are never returned
+    with less than `min_remaining` seconds left.
+
+    Args:
+        LRUCache ([type]): [base LRU cache]
+    """
+
+    # Validity of the urls signed without an explicit expiration.
+    DEFAULT_EXPIRATION = 3600
+
+    def __init__(self, bucket, max_entries=10000, max_bytes=None, min_remaining=300,
+                 min_remaining_ratio=0.5, granularity=300):
+        """__init__ function.
+
+        Args:
+            bucket ([string]): [bucket the urls are signed for]
+            max_entries (int, optional): [maximum number of urls]. Defaults to 10000.
+            max_bytes ([int], optional): [maximum memory used by the urls]. Defaults to unbounded.
+            min_remaining (int, optional): [seconds a returned url must stay valid]. Defaults to 300.
+            min_remaining_ratio (float, optional): [part of a relative expiry a returned url must have left]. Defaults to 0.5.
+            granularity (int, optional): [width in seconds of the absolute expiry windows, 0 for exact expiries]. Defaults to 300.
+        """
+        super().__init__(max_entries=max_entries, max_bytes=max_bytes)
+        self.bucket = bucket
+        self.min_remaining = min_remaining
+        self.min_remaining_ratio = min_remaining_ratio
+        self.granularity = granularity
+
+    @classmethod
+    def from_settings(cls, bucket, settings):
+        """build a cache from the `SIGNED_URL_CACHE` settings dict.
+
+        Args:
+            bucket ([string]): [bucket the urls are signed for]
+            settings ([dict]): [MAX_ENTRIES, MAX_BYTES, MIN_REMAINING, MIN_REMAINING_RATIO and GRANULARITY, all optional]
+
+        Returns:
+            [SignedUrlCache]: [the cache]
+        """
+        return cls(bucket,
+                   max_entries=settings.get('MAX_ENTRIES', 10000),
+                   max_bytes=settings.get('MAX_BYTES'),
+                   min_remaining=settings.get('MIN_REMAINING', 300),
+                   min_remaining_ratio=settings.get('MIN_REMAINING_RATIO', 0.5),
+                   granularity=settings.get('GRANULARITY', 300))
+
+    def lookup(self, filename, expiration, method='GET'):
+        """look a signed url up.
+
+        Args:
+            filename ([string]): [file the url is signed for]
+            expiration ([int/timedelta/datetime]): [requested expiry, None for the default hour]
+            method (str, optional): [http method]. Defaults to 'GET'.
+
+        Returns:
+            [tuple]: [cache key and expiry to pass to `store` and `sign_expiration`, and the cached url or None; the key is None when the expiration cannot be cached]
+        """
+        now = time.time()
+        if expiration is None:
+            expiration = self.DEFAULT_EXPIRATION
+        if isinstance(expiration, datetime.timedelta):
+            expiration = expiration.total_seconds()
+        if isinstance(expiration, datetime.datetime):
+            if expiration.tzinfo is None:
+                expiration = expiration.replace(tzinfo=datetime.timezone.utc)
+            expires_at = expiration.timestamp()
+            if self.granularity:
+                expires_at = math.ceil(expires_at / self.granularity) * self.granularity
+            window = ('at', expires_at)
+            min_remaining = self.min_remaining
+        elif isinstance(expiration, (int, float)) and not isinstance(expiration, bool):
+            expires_at = now + expiration
+            window = ('in', expiration)
+            min_remaining = max(self.min_remaining, expiration * self.min_remaining_ratio)
+        else:
+            return None, None, None
+        key = (self.bucket, filename, method, window)
+        return key, expires_at, self.get(key, min_remaining)
+
+    def sign_expiration(self, expiration, expires_at):
+        """expiration to sign a missing url with.
+
+        Args:
+            expiration ([int/timedelta/datetime]): [requested expiry]
+            expires_at ([float]): [expiry returned by `lookup`]
+
+        Returns:
+            [object]: [the end of the window of an absolute expiry, else expiration]
+        """
+        if isinstance(expiration, datetime.datetime):
+            return datetime.datetime.fromtimestamp(expires_at, datetime.timezone.utc)
+        return expiration
+
+    def store(self, key, expires_at, url):
+        """cache a signed url returned by the adaptee.
+
+        Args:
+            key ([tuple]): [key returned by `lookup`]
+            expires_at ([float]): [expiry returned by `lookup`]
+            url ([string]): [signed url, failures (None) are not cached]
+        """
+        if key is not None and url:
+            self.set(key, url, expires_at, size=len(url) + len(key[1]))
+
+
+class MetadataCache(LRUCache):
+    """LRU cache of object metadata (CustomBlob records and head dicts).
+
+    Entries are fresh for `ttl` seconds; an expired entry is revalidated
+    with a conditional request on its generation/ETag (see `Adapter.get_blob`)
+    and kept when the object did not change.
+
+    Args:
+        LRUCache ([type]): [base LRU cache]
+    """
+
+    # Approximate size of a cached metadata record in bytes.
+    RECORD_SIZE = 1024
+
+    def __init__(self, max_entries=10000, max_bytes=None, ttl=60, revalidate=True):
+        """__init__ function.
+
+        Args:
+            max_entries (int, optional): [maximum number of records]. Defaults to 10000.
+            max_bytes ([int], optional): [maximum memory used by the records]. Defaults to unbounded.
+            ttl (int, optional): [seconds a record is used without asking the bucket]. Defaults to 60.
+            revalidate (bool, optional): [revalidate expired records with conditional requests]. Defaults to True.
+        """
+        super().__init__(max_entries=max_entries, max_bytes=max_bytes)
+        self.ttl = ttl
+        self.revalidate = revalidate
+
+    @classmethod
+    def from_settings(cls, settings):
+        """build a cache from the `METADATA_CACHE` settings dict.
+
+        Args:
+            settings ([dict]): [MAX_ENTRIES, MAX_BYTES, TTL and REVALIDATE, all optional]
+
+        Returns:
+            [MetadataCache]: [the cache]
+        """
+        return cls(max_entries=settings.get('MAX_ENTRIES', 10000),
+                   max_bytes=settings.get('MAX_BYTES'),
+                   ttl=settings.get('TTL', 60),
+                   revalidate=settings.get('REVALIDATE', True))
+
+    def lookup(self, kind, filename):
+        """look a metadata record up.
+
+        Args:
+            kind ([string]): [record kind, 'blob' or 'head']
+            filename ([string]): [object name]
+
+        Returns:
+            [tuple]: [the record (None on a miss) and whether it is still fresh]
+        """
+        value, expires_at = self.peek((kind, filename))
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            return None, False
+        fresh = expires_at is None or expires_at > time.time()
+        with self._lock:
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return value, fresh
+
+    def store(self, kind, filename, value):
+        """cache a metadata record for ttl seconds.
+
+        Args:
+            kind ([string]): [record kind, 'blob' or 'head']
+            filename ([string]): [object name]
+            value ([object]): [the record]
+        """
+        self.set((kind, filename), value, time.time() + self.ttl, size=self.RECORD_SIZE)
+
+    def invalidate(self, filename):
+        """drop every record of an object.
+
+        Args:
+            filename ([string]): [object name]
+        """
+        self.pop(('blob', filename))
+        self.pop(('head', filename))
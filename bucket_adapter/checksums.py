@@ -0,0 +1,499 @@
+"""checksum helpers."""
+
+import base64
+import contextlib
+import contextvars
+import functools
+import hashlib
+import io
+import itertools
+import threading
+import zlib
+
+try:
+    import google_crc32c
+except ImportError:  # pragma: no cover - shipped with google-cloud-storage
+    google_crc32c = None
+
+from .exceptions import ChecksumMismatchError
+
+# Size of the blocks read when hashing a file.
+HASH_BLOCKSIZE = 1024 * 1024
+
+
+# Reflected polynomials of the CRCs, which can be combined.
+CRC_POLYNOMIALS = {'crc32': 0xEDB88320, 'crc32c': 0x82F63B78}
+
+_current_hasher = contextvars.ContextVar('bucket_adapter_hasher', default=None)
+
+
+def _crc(algorithm, data, value=0):
+    """extend a CRC with data.
+
+    Args:
+        algorithm ([string]): [crc32 or crc32c]
+        data ([bytes]): [data]
+        value (int, optional): [CRC of the data before]. Defaults to 0.
+
+    Returns:
+        [int]: [the CRC]
+    """
+    if algorithm == 'crc32':
+        return zlib.crc32(data, value)
+    # the google_crc32c extension only takes bytes.
+    return google_crc32c.extend(value, data if isinstance(data, bytes) else bytes(data))
+
+
+class _Crc(object):
+    """crc32 or crc32c with the hashlib interface.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self, algorithm):
+        """__init__ function.
+
+        Args:
+            algorithm ([string]): [crc32 or crc32c]
+        """
+        self.algorithm = algorithm
+        self.value = 0
+
+    def update(self, data):
+        """add data to the checksum.
+
+        Args:
+            data ([bytes]): [data]
+        """
+        self.value = _crc(self.algorithm, data, self.value)
+
+    def digest(self):
+        """big endian checksum, the encoding used by S3 and GCS.
+
+        Returns:
+            [bytes]: [4 bytes digest]
+        """
+        return self.value.to_bytes(4, 'big')
+
+
+def available(algorithm):
+    """whether an algorithm can be computed.
+
+    Args:
+        algorithm ([string]): [algorithm name]
+
+    Returns:
+        [bool]: [False for unknown algorithms, or crc32c without google-crc32c]
+    """
+    if algorithm == 'crc32c':
+        return google_crc32c is not None
+    return algorithm == 'crc32' or algorithm in hashlib.algorithms_available
+
+
+def new_hasher(algorithm):
+    """build an incremental hasher.
+
+    Args:
+        algorithm ([string]): [md5, sha256, crc32 or crc32c]
+
+    Returns:
+        [object]: [object with update(data) and digest() methods]
+    """
+    if algorithm in CRC_POLYNOMIALS:
+        if algorithm == 'crc32c' and google_crc32c is None:
+            raise ValueError('crc32c needs the google-crc32c package')
+        return _Crc(algorithm)
+    return hashlib.new(algorithm)
+
+
+def _gf2_times(matrix, vector):
+    """multiply a vector by a matrix over GF(2).
+
+    Args:
+        matrix ([list]): [32 columns as ints]
+        vector ([int]): [32 bits vector]
+
+    Returns:
+        [int]: [the product]
+    """
+    product = 0
+    for column in matrix:
+        if not vector:
+            break
+        if vector & 1:
+            product ^= column
+        vector >>= 1
+    return product
+
+
+@functools.lru_cache(maxsize=None)
+def _zero_operators(polynomial):
+    """operators appending zero bytes to a CRC.
+
+    Args:
+        polynomial ([int]): [reflected polynomial of the CRC]
+
+    Returns:
+        [tuple]: [the operator appending 2**n zero bytes at index n, for n below 64]
+    """
+    # one zero bit, then squared up to one zero byte.
+    operator = [polynomial] + [1 << bit for bit in range(31)]
+    operators = []
+    for _ in range(3 + 64):
+        operator = [_gf2_times(operator, column) for column in operator]
+        operators.append(tuple(operator))
+    return tuple(operators[2:])
+
+
+def crc_combine(algorithm, first, second, length):
+    """CRC of two pieces of data from their CRCs, like zlib's crc32_combine.
+
+    Lets pieces hashed in parallel (ranges of a download, parts of an
+    upload) be combined without reading them again.
+
+    Args:
+        algorithm ([string]): [crc32 or crc32c]
+        first ([int]): [CRC of the first piece]
+        second ([int]): [CRC of the second piece]
+        length ([int]): [size of the second piece]
+
+    Returns:
+        [int]: [CRC of the first piece followed by the second]
+    """
+    operators = _zero_operators(CRC_POLYNOMIALS[algorithm])
+    index = 0
+    while length:
+        if length & 1:
+            first = _gf2_times(operators[index], first)
+        length >>= 1
+        index += 1
+    return first ^ second
+
+
+class StreamHasher(object):
+    """digests of data moved at offsets, by one or several threads.
+
+    Data arriving in order from `start` feeds a hasher of every
+    algorithm. Pieces arriving ahead of it (the ranges of a parallel
+    download, the parts of a parallel upload) are hashed by the thread
+    moving them, with the CRCs only, and combined when the digests are
+    asked for; md5 and sha256 are then left out. Bytes seen again, when
+    an SDK reads a body twice or retries it, are skipped.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self, algorithms, start=0):
+        """__init__ function.
+
+        Args:
+            algorithms ([iterable]): [algorithm names, those not `available` are left out]
+            start (int, optional): [offset the data starts at]. Defaults to 0.
+        """
+        self.algorithms = tuple(dict.fromkeys(
+            algorithm for algorithm in algorithms if available(algorithm)))
+        self._crcs = tuple(algorithm for algorithm in self.algorithms if algorithm in CRC_POLYNOMIALS)
+        self._hashers = {algorithm: new_hasher(algorithm) for algorithm in self.algorithms}
+        self._start = start
+        self._end = start
+        self._busy = False
+        # pieces ahead of the hashed data: (start, end, CRC by algorithm, sequence) by end offset.
+        self._pieces = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def update(self, offset, data):
+        """hash data moved at an offset.
+
+        Args:
+            offset ([int]): [offset of the data]
+            data ([bytes]): [bytes-like data]
+        """
+        end = offset + len(data)
+        with self._lock:
+            in_order = not self._busy and offset <= self._end < end
+            if in_order:
+                self._busy = True
+                skipped = self._end - offset
+            elif end <= self._end:
+                return
+            else:
+                piece = self._pieces.pop(offset, None)
+        if in_order:
+            try:
+                if skipped:
+                    data = data[skipped:]
+                for hasher in self._hashers.values():
+                    hasher.update(data)
+            finally:
+                with self._lock:
+                    self._end = end
+                    self._busy = False
+            return
+        if not self._crcs:
+            return
+        if piece is None:
+            piece = (offset, offset, {algorithm: 0 for algorithm in self._crcs}, None)
+        values = {algorithm: _crc(algorithm, data, piece[2][algorithm]) for algorithm in self._crcs}
+        with self._lock:
+            self._pieces[end] = (piece[0], end, values, next(self._sequence))
+
+    def digests(self):
+        """digests of the data hashed from `start`.
+
+        Returns:
+            [dict]: [digest by algorithm, the CRCs only when pieces arrived out of order]
+        """
+        with self._lock:
+            position = self._end
+            digests = {algorithm: hasher.digest() for algorithm, hasher in self._hashers.items()}
+            pieces = {}
+            for piece in sorted(self._pieces.values(), key=lambda piece: piece[3]):
+                pieces[piece[0]] = piece
+        if position not in pieces:
+            return digests
+        values = {algorithm: int.from_bytes(digests[algorithm], 'big') for algorithm in self._crcs}
+        while position in pieces:
+            start, position, crcs, _ = pieces.pop(position)
+            for algorithm in self._crcs:
+                values[algorithm] = crc_combine(algorithm, values[algorithm], crcs[algorithm],
+                                                position - start)
+        return {algorithm: value.to_bytes(4, 'big') for algorithm, value in values.items()}
+
+
+class HashingReader(object):
+    """readable file object hashing what is read from another one.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self, fileobj, hasher):
+        """__init__ function.
+
+        Args:
+            fileobj ([object]): [readable file object, hashed from its current position]
+            hasher ([StreamHasher]): [hasher fed with the data read]
+        """
+        self._fileobj = fileobj
+        self._hasher = hasher
+        self._base = _position(fileobj)
+        self._offset = 0
+
+    def __getattr__(self, name):
+        """attributes of the wrapped file object."""
+        return getattr(self._fileobj, name)
+
+    def __iter__(self):
+        """lines of the file object, hashed."""
+        return iter(self.readline, b'')
+
+    def read(self, size=-1):
+        """read and hash.
+
+        Args:
+            size (int, optional): [bytes to read, -1 to the end]. Defaults to -1.
+
+        Returns:
+            [bytes]: [data read]
+        """
+        data = self._fileobj.read(size)
+        self._hashed(data)
+        return data
+
+    def readinto(self, buffer):
+        """read into a buffer and hash.
+
+        Args:
+            buffer ([object]): [writable buffer]
+
+        Returns:
+            [int]: [bytes read]
+        """
+        read = self._fileobj.readinto(buffer)
+        if read:
+            with memoryview(buffer) as view:
+                self._hashed(view[:read].tobytes())
+        return read
+
+    def readline(self, size=-1):
+        """read and hash a line.
+
+        Args:
+            size (int, optional): [maximum bytes to read]. Defaults to -1.
+
+        Returns:
+            [bytes]: [the line]
+        """
+        data = self._fileobj.readline(size)
+        self._hashed(data)
+        return data
+
+    def _hashed(self, data):
+        """hash data read at the current offset."""
+        if data:
+            self._hasher.update(self._offset, data)
+            self._offset += len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """move in the file object.
+
+        Args:
+            offset ([int]): [offset]
+            whence ([int], optional): [io.SEEK_SET, io.SEEK_CUR or io.SEEK_END]. Defaults to io.SEEK_SET.
+
+        Returns:
+            [int]: [new position]
+        """
+        position = self._fileobj.seek(offset, whence)
+        self._offset = position - (self._base or 0)
+        return position
+
+
+class HashingWriter(object):
+    """writable file object hashing what is written to another one.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self, fileobj, hasher):
+        """__init__ function.
+
+        Args:
+            fileobj ([object]): [writable file object, hashed from its current position]
+            hasher ([StreamHasher]): [hasher fed with the data written]
+        """
+        self._fileobj = fileobj
+        self._hasher = hasher
+        self._base = _position(fileobj)
+        self._offset = 0
+
+    def __getattr__(self, name):
+        """attributes of the wrapped file object."""
+        return getattr(self._fileobj, name)
+
+    def write(self, data):
+        """hash and write.
+
+        Args:
+            data ([bytes]): [bytes-like data]
+
+        Returns:
+            [int]: [bytes written]
+        """
+        written = self._fileobj.write(data)
+        if written is None:
+            written = len(data)
+        if written:
+            self._hasher.update(self._offset, data[:written] if written < len(data) else data)
+            self._offset += written
+        return written
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """move in the file object.
+
+        Args:
+            offset ([int]): [offset]
+            whence ([int], optional): [io.SEEK_SET, io.SEEK_CUR or io.SEEK_END]. Defaults to io.SEEK_SET.
+
+        Returns:
+            [int]: [new position]
+        """
+        position = self._fileobj.seek(offset, whence)
+        self._offset = position - (self._base or 0)
+        return position
+
+
+def _position(fileobj):
+    """current position of a file object, None when it cannot tell."""
+    try:
+        return fileobj.tell()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+@contextlib.contextmanager
+def hashing(hasher):
+    """hash the data the adaptees move in this context.
+
+    Args:
+        hasher ([StreamHasher]): [hasher of the transfer]
+
+    Yields:
+        [StreamHasher]: [the hasher]
+    """
+    token = _current_hasher.set(hasher)
+    try:
+        yield hasher
+    finally:
+        _current_hasher.reset(token)
+
+
+def current_hasher():
+    """hasher of the running verified transfer.
+
+    Returns:
+        [StreamHasher]: [the hasher, None when the transfer is not verified]
+    """
+    return _current_hasher.get()
+
+
+def hashing_writer(fileobj):
+    """destination of a download, hashing it when the transfer is verified.
+
+    Args:
+        fileobj ([object]): [writable file object]
+
+    Returns:
+        [object]: [fileobj, wrapped in a HashingWriter under `hashing`]
+    """
+    hasher = _current_hasher.get()
+    return fileobj if hasher is None else HashingWriter(fileobj, hasher)
+
+
+def digest_file(fileobj, algorithms):
+    """hash a file object from its current position to its end.
+
+    Args:
+        fileobj ([object]): [readable file object]
+        algorithms ([iterable]): [algorithm names]
+
+    Returns:
+        [dict]: [digest by algorithm]
+    """
+    hashers = {algorithm: new_hasher(algorithm) for algorithm in algorithms}
+    for block in iter(lambda: fileobj.read(HASH_BLOCKSIZE), b''):
+        for hasher in hashers.values():
+            hasher.update(block)
+    return {algorithm: hasher.digest() for algorithm, hasher in hashers.items()}
+
+
+def encode(digests):
+    """base64 digests, the encoding of the CustomBlob fields.
+
+    Args:
+        digests ([dict]): [digest by algorithm]
+
+    Returns:
+        [dict]: [base64 string by algorithm]
+    """
+    return {algorithm: base64.b64encode(digest).decode('ascii') for algorithm, digest in digests.items()}
+
+
+def verify(name, expected, actual):
+    """compare digests, raising on the first mismatch.
+
+    Args:
+        name ([string]): [name of the object]
+        expected ([dict]): [digests of the object by algorithm]
+        actual ([dict]): [digests of the transferred data by algorithm]
+
+    Raises:
+        ChecksumMismatchError: [when a digest differs]
+    """
+    for algorithm, digest in expected.items():
+        if algorithm in actual and actual[algorithm] != digest:
+            raise ChecksumMismatchError(name, algorithm, digest, actual[algorithm])
@@ -0,0 +1,297 @@
+"""transparent compression of uploads and decompression of downloads."""
+
+import functools
+import io
+import mimetypes
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional, only needed for zstd
+    zstandard = None
+
+from .streams import DEFAULT_READ_CHUNKSIZE, IterReader
+
+# Content types compressed by default, a type matches when it starts with one of them.
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/x-ndjson', 'application/xml',
+    'application/javascript', 'application/x-yaml', 'application/yaml', 'application/csv',
+    'application/sql', 'image/svg+xml')
+# Default compression level of every codec.
+DEFAULT_LEVELS = {'gzip': 6, 'zstd': 3}
+# zlib window bits writing and reading a gzip header.
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def _codec(encoding):
+    """codec name of a Content-Encoding.
+
+    Args:
+        encoding ([string]): [Content-Encoding value]
+
+    Raises:
+        ValueError: [for encodings no codec is available for]
+
+    Returns:
+        [string]: [gzip or zstd]
+    """
+    codec = {'x-gzip': 'gzip'}.get(encoding, encoding)
+    if codec not in DEFAULT_LEVELS:
+        raise ValueError('unsupported content encoding {!r}'.format(encoding))
+    if codec == 'zstd' and zstandard is None:
+        raise ValueError('zstd compression needs the zstandard package')
+    return codec
+
+
+def content_codings(encoding):
+    """codings applied to an object, in the order they were applied.
+
+    Args:
+        encoding ([string]): [Content-Encoding of the object, None when missing]
+
+    Returns:
+        [list]: [lower case codings, identity left out]
+    """
+    return [coding.strip().lower() for coding in (encoding or '').split(',')
+            if coding.strip() and coding.strip().lower() != 'identity']
+
+
+def compress_chunks(fileobj, encoding, level=None, chunk_size=DEFAULT_READ_CHUNKSIZE):
+    """compress a file object from its current position, block by block.
+
+    Args:
+        fileobj ([object]): [readable file object]
+        encoding ([string]): [gzip or zstd]
+        level ([int], optional): [compression level]. Defaults to DEFAULT_LEVELS.
+        chunk_size ([int], optional): [size of the blocks read]. Defaults to DEFAULT_READ_CHUNKSIZE.
+
+    Returns:
+        [generator]: [compressed chunks]
+    """
+    codec = _codec(encoding)
+    if level is None:
+        level = DEFAULT_LEVELS[codec]
+    if codec == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    for block in iter(functools.partial(fileobj.read, chunk_size), b''):
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def decompress_chunks(fileobj, encoding, chunk_size=DEFAULT_READ_CHUNKSIZE):
+    """decompress a file object from its current position.
+
+    Every decompressed chunk holds at most `chunk_size` bytes (the end of a
+    gzip stream excepted), whatever the compression ratio. Concatenated
+    gzip members are decompressed one after the other.
+
+    Args:
+        fileobj ([object]): [readable file object of compressed data]
+        encoding ([string]): [Content-Encoding, gzip or zstd]
+        chunk_size ([int], optional): [size of the blocks read and written]. Defaults to DEFAULT_READ_CHUNKSIZE.
+
+    Raises:
+        EOFError: [when the compressed data is truncated]
+
+    Returns:
+        [generator]: [decompressed chunks]
+    """
+    if _codec(encoding) == 'zstd':
+        yield from zstandard.ZstdDecompressor().read_to_iter(
+            fileobj, read_size=chunk_size, write_size=chunk_size)
+        return
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    fed = False
+    for data in iter(functools.partial(fileobj.read, chunk_size), b''):
+        while data:
+            fed = True
+            output = decompressor.decompress(data, chunk_size)
+            if output:
+                yield output
+            if decompressor.eof:
+                data = decompressor.unused_data
+                decompressor = zlib.decompressobj(GZIP_WBITS)
+                fed = False
+            else:
+                data = decompressor.unconsumed_tail
+    output = decompressor.flush()
+    if output:
+        yield output
+    if fed and not decompressor.eof:
+        raise EOFError('compressed data ended before the end of the stream')
+
+
+def decoded_chunks(fileobj, encoding, chunk_size=DEFAULT_READ_CHUNKSIZE):
+    """undo every coding of a Content-Encoding, the last applied first.
+
+    Args:
+        fileobj ([object]): [readable file object of encoded data]
+        encoding ([string]): [Content-Encoding of the data, None for none]
+        chunk_size ([int], optional): [size of the blocks read and written]. Defaults to DEFAULT_READ_CHUNKSIZE.
+
+    Returns:
+        [iterator]: [decoded chunks]
+    """
+    codings = content_codings(encoding)
+    if not codings:
+        return iter(functools.partial(fileobj.read, chunk_size), b'')
+    for coding in reversed(codings[1:]):
+        fileobj = io.BufferedReader(IterReader(decompress_chunks(fileobj, coding, chunk_size)),
+                                    buffer_size=chunk_size)
+    return decompress_chunks(fileobj, codings[0], chunk_size)
+
+
+def decompress_stream(source, destination, encoding, chunk_size=DEFAULT_READ_CHUNKSIZE):
+    """decompress a file object into another.
+
+    Args:
+        source ([object]): [readable file object of encoded data]
+        destination ([object]): [writable file object]
+        encoding ([string]): [Content-Encoding of the data]
+        chunk_size ([int], optional): [size of the blocks read and written]. Defaults to DEFAULT_READ_CHUNKSIZE.
+
+    Returns:
+        [int]: [bytes written]
+    """
+    written = 0
+    for chunk in decoded_chunks(source, encoding, chunk_size):
+        destination.write(chunk)
+        written += len(chunk)
+    return written
+
+
+class DecompressingReader(IterReader):
+    """forward only file object decompressing another one.
+
+    Args:
+        IterReader ([type]): [iterator reader class]
+    """
+
+    def __init__(self, source, encoding, chunk_size=DEFAULT_READ_CHUNKSIZE):
+        """__init__ function.
+
+        Args:
+            source ([object]): [readable file object of encoded data, closed with the reader]
+            encoding ([string]): [Content-Encoding of the data]
+            chunk_size ([int], optional): [size of the blocks read]. Defaults to DEFAULT_READ_CHUNKSIZE.
+        """
+        super().__init__(decoded_chunks(source, encoding, chunk_size))
+        self._source = source
+
+    def close(self):
+        """close the reader and its source."""
+        try:
+            self._source.close()
+        finally:
+            super().close()
+
+
+class Compression(object):
+    """compression of the uploads matching a content type.
+
+    Files are compressed block by block while they are sent, only one
+    block and the compressor state are held in memory, and stored with
+    their Content-Encoding (gzip or zstd) and original Content-Type.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self, codec='gzip', level=None, content_types=COMPRESSIBLE_TYPES, min_size=1024):
+        """__init__ function.
+
+        Args:
+            codec (str, optional): [gzip or zstd, which needs the zstandard package]. Defaults to 'gzip'.
+            level ([int], optional): [compression level]. Defaults to 6 for gzip, 3 for zstd.
+            content_types ([tuple], optional): [prefixes of the content types compressed]. Defaults to COMPRESSIBLE_TYPES.
+            min_size (int, optional): [files smaller than this are sent as they are]. Defaults to 1024.
+
+        Raises:
+            ValueError: [for unknown codecs, or zstd without zstandard]
+        """
+        self.codec = _codec(codec)
+        self.level = level
+        self.content_types = tuple(content_types)
+        self.min_size = min_size
+
+    @classmethod
+    def from_settings(cls, settings):
+        """build the compression from the `COMPRESSION` settings dict.
+
+        Args:
+            settings ([dict]): [CODEC, LEVEL, CONTENT_TYPES and MIN_SIZE, all optional]
+
+        Returns:
+            [Compression]: [the compression]
+        """
+        return cls(codec=settings.get('CODEC', 'gzip'), level=settings.get('LEVEL'),
+                   content_types=settings.get('CONTENT_TYPES', COMPRESSIBLE_TYPES),
+                   min_size=settings.get('MIN_SIZE', 1024))
+
+    def content_type(self, bucket_filename, ExtraArgs=None):
+        """content type of an upload.
+
+        Args:
+            bucket_filename ([string]): [name of the file in bucket]
+            ExtraArgs ([dict], optional): [extra arguments of the upload]. Defaults to None.
+
+        Returns:
+            [string]: [ContentType of ExtraArgs, else guessed from the name, None when unknown]
+        """
+        return (ExtraArgs or {}).get('ContentType') or mimetypes.guess_type(bucket_filename)[0]
+
+    def encoding_for(self, bucket_filename, ExtraArgs=None, size=None, force=False):
+        """Content-Encoding to compress an upload with.
+
+        Args:
+            bucket_filename ([string]): [name of the file in bucket]
+            ExtraArgs ([dict], optional): [extra arguments of the upload]. Defaults to None.
+            size ([int], optional): [size of the upload, None when unknown]. Defaults to None.
+            force (bool, optional): [compress whatever the content type and size]. Defaults to False.
+
+        Returns:
+            [string]: [the codec, None when the upload is sent as it is]
+        """
+        if (ExtraArgs or {}).get('ContentEncoding'):
+            return None
+        if force:
+            return self.codec
+        if size is not None and size < self.min_size:
+            return None
+        content_type = self.content_type(bucket_filename, ExtraArgs)
+        if content_type and content_type.startswith(self.content_types):
+            return self.codec
+        return None
+
+    def extra_args(self, bucket_filename, ExtraArgs, encoding):
+        """ExtraArgs of a compressed upload.
+
+        Args:
+            bucket_filename ([string]): [name of the file in bucket]
+            ExtraArgs ([dict]): [extra arguments of the upload, None for none]
+            encoding ([string]): [Content-Encoding]
+
+        Returns:
+            [dict]: [ExtraArgs with the ContentEncoding and the ContentType of the original content]
+        """
+        extra = dict(ExtraArgs or {})
+        extra['ContentEncoding'] = encoding
+        extra['ContentType'] = self.content_type(bucket_filename, ExtraArgs) or 'application/octet-stream'
+        return extra
+
+    def compress(self, fileobj, encoding):
+        """wrap a file object in a reader compressing it on the fly.
+
+        Args:
+            fileobj ([object]): [readable file object]
+            encoding ([string]): [gzip or zstd]
+
+        Returns:
+            [object]: [forward only file object of the compressed data]
+        """
+        return io.BufferedReader(IterReader(compress_chunks(fileobj, encoding, self.level)),
+                                 buffer_size=DEFAULT_READ_CHUNKSIZE)
@@ -1,13 +1,82 @@
 """custom blob."""
 
+import functools
+
+import import_string
+
+# Converters by fully qualified class name of the SDK blob/resource.
+_CONVERTERS = {}
+# Converters resolved by (module, name) of the class, None for classes without
+# one. Not keyed by the class itself: boto3 builds a new class for every
+# resource it creates.
+_CONVERTERS_BY_TYPE = {}
+
+
+def register_converter(class_path, converter):
+    """register the converter filling a CustomBlob from an SDK object.
+
+    Args:
+        class_path ([string]): [fully qualified class name, e.g. 'google.cloud.storage.blob.Blob']
+        converter ([callable]): [converter(custom_blob, blob, options, filename) setting every field]
+    """
+    _CONVERTERS[class_path] = converter
+    _CONVERTERS_BY_TYPE.clear()
+
+
+def get_converter(blob_type):
+    """converter registered for a class.
+
+    Class names are resolved once per name, later lookups are a dict hit.
+
+    Args:
+        blob_type ([type]): [class of the SDK object]
+
+    Returns:
+        [callable]: [the converter, None if there is none]
+    """
+    key = (blob_type.__module__, blob_type.__name__)
+    try:
+        return _CONVERTERS_BY_TYPE[key]
+    except KeyError:
+        converter = _CONVERTERS.get('{}.{}'.format(*key))
+        _CONVERTERS_BY_TYPE[key] = converter
+        return converter
+
+
+@functools.lru_cache(maxsize=None)
+def _import_etl_function(path):
+    """import the `BLOB_ETL_FUNCTION` once.
+
+    Args:
+        path ([string]): [dotted path of the function]
+
+    Returns:
+        [callable]: [the function]
+    """
+    return import_string(path)
+
 
 class CustomBlob(object):
     """CustomBlob to make a generic blob for both s3 & gcp bucket.
 
+    Fields are filled lazily, on first access, by the converter registered
+    for the class of the SDK object (see `register_converter`), or by the
+    `BLOB_ETL_FUNCTION` setting for other classes. The adaptees fetch the
+    SDK object before building the CustomBlob, converting it makes no
+    request. Instances use slots and drop the SDK object once converted. `checksums` holds the base64
+    digests computed by a verified transfer of the object, by algorithm, and `verified` whether one of
+    them was compared with a checksum the bucket advertises (False when it advertises none).
+
     Args:
         object ([type]): [description]
     """
 
+    FIELDS = ('name', 'time_created', 'bucket', 'content_type', 'content_encoding',
+              'content_language', 'size', 'etag', 'generation', 'md5_hash', 'crc32c', 'checksums',
+              'verified')
+
+    __slots__ = FIELDS + ('_source',)
+
     def __init__(self, blob, options, filename=None):
         """__init__ function to call the custom blob/resource function by determining the service type.
 
@@ -16,54 +85,113 @@ class CustomBlob(object):
             options ([dict]): [options dict contains all the configuration settings]
             filename ([string], optional): [filename used in s3 resource as it dont have any property like gcp blob.name and to make a custom & generic resource we need to add it.]. Defaults to None.
         """
-        self.name = None
-        self.time_created = None
-        self.bucket = None
-        self.content_type = None
-        self.content_encoding = None
-        self.content_language = None
-        self.size = None
-        print("TYPE:", type(blob), "is equal", )
-        if str(type(blob)) == "<class 'google.cloud.storage.blob.Blob'>":
-            self._generic_gcp_blob(blob, options)
-        # Quick Hack because amazon uses generic factory functions to create
-        # resource objects.
-        elif str(type(blob)) == "<class 'boto3.resources.factory.s3.Object'>":
-            self._generic_aws_resource(blob, options, filename=filename)
-        # else:
-        #     # custom function call
-        #     func_pointer = options.get('BLOB_ETL_FUNCTION')
-        #     func_pointer = import_string(func_pointer)
-        #     func_pointer(self)
-
-    def _generic_gcp_blob(self, blob, options, filename=None):
-        """_generic_gcp_blob private function for custom gcp blob object.
+        self._source = (blob, options, filename)
 
-        Args:
-            blob ([object]): [blob object]
-            options ([dict]): [options dict contains all the configuration settings]
-            filename ([string], optional): [not used here as we have blob.name option in gcp blob object]. Defaults to None.
+    @classmethod
+    def from_fields(cls, **fields):
+        """build a CustomBlob from already known field values.
+
+        Returns:
+            [CustomBlob]: [blob with the given fields, the others None]
         """
-        self.name = blob.name
-        self.time_created = blob.time_created
-        self.bucket = blob.bucket
-        self.content_encoding = blob.content_encoding
-        self.content_language = blob.content_language
-        self.content_type = blob.content_type
-        self.size = blob.size
+        custom_blob = cls.__new__(cls)
+        custom_blob._source = None
+        for field in cls.FIELDS:
+            setattr(custom_blob, field, fields.get(field))
+        return custom_blob
 
-    def _generic_aws_resource(self, blob, options, filename=None):
-        """generic aws resource private function for custom s3 resource object.
+    def __getattr__(self, name):
+        """convert the SDK object on first access of a field.
 
         Args:
-            blob ([object]): [resource object]
-            options ([dict]): [options dict contains all the configuration settings]
-            filename ([string], optional): [filename to be used in resource.name]. Defaults to None.
+            name ([string]): [attribute name]
+
+        Returns:
+            [object]: [the field value]
+        """
+        if name not in self.FIELDS:
+            raise AttributeError(name)
+        self._materialise()
+        return object.__getattribute__(self, name)
+
+    def __repr__(self):
+        """representation of the blob.
+
+        Returns:
+            [string]: [class name and blob name]
+        """
+        return '<CustomBlob {!r}>'.format(self.name)
+
+    def _materialise(self):
+        """fill all the fields from the SDK object.
+
+        The SDK object is dropped once converted; when the converter fails
+        (e.g. the object does not exist) it is kept and the next access
+        tries again.
         """
-        self.name = filename
-        self.time_created = blob.last_modified
-        self.bucket = options['BUCKET_NAME']
-        self.content_encoding = blob.content_encoding
-        self.content_language = blob.content_language
-        self.content_type = blob.content_type
-        self.size = blob.content_length
+        source = self._source
+        if source is not None:
+            blob, options, filename = source
+            converter = get_converter(type(blob))
+            if converter is None and options and options.get('BLOB_ETL_FUNCTION'):
+                converter = _import_etl_function(options['BLOB_ETL_FUNCTION'])
+            if converter is not None:
+                converter(self, blob, options, filename)
+        self._source = None
+        # converters may fill only some of the fields.
+        for field in self.FIELDS:
+            try:
+                object.__getattribute__(self, field)
+            except AttributeError:
+                setattr(self, field, None)
+
+
+def _generic_gcp_blob(custom_blob, blob, options, filename=None):
+    """converter for gcp blob objects.
+
+    Args:
+        custom_blob ([CustomBlob]): [blob to fill]
+        blob ([object]): [blob object]
+        options ([dict]): [options dict contains all the configuration settings]
+        filename ([string], optional): [not used here as we have blob.name option in gcp blob object]. Defaults to None.
+    """
+    custom_blob.name = blob.name
+    custom_blob.time_created = blob.time_created
+    custom_blob.bucket = blob.bucket
+    custom_blob.content_encoding = blob.content_encoding
+    custom_blob.content_language = blob.content_language
+    custom_blob.content_type = blob.content_type
+    custom_blob.size = blob.size
+    custom_blob.etag = blob.etag
+    custom_blob.generation = blob.generation
+    custom_blob.md5_hash = blob.md5_hash
+    custom_blob.crc32c = blob.crc32c
+
+
+def _generic_aws_resource(custom_blob, blob, options, filename=None):
+    """converter for s3 resource objects.
+
+    Args:
+        custom_blob ([CustomBlob]): [blob to fill]
+        blob ([object]): [resource object]
+        options ([dict]): [options dict contains all the configuration settings]
+        filename ([string], optional): [filename to be used in resource.name]. Defaults to None.
+    """
+    custom_blob.name = filename
+    custom_blob.time_created = blob.last_modified
+    custom_blob.bucket = options['BUCKET_NAME']
+    custom_blob.content_encoding = blob.content_encoding
+    custom_blob.content_language = blob.content_language
+    custom_blob.content_type = blob.content_type
+    custom_blob.size = blob.content_length
+    custom_blob.etag = blob.e_tag
+    custom_blob.generation = None
+    # S3 only has the ETag, a digest for some objects only.
+    custom_blob.md5_hash = None
+    custom_blob.crc32c = None
+
+
+register_converter('google.cloud.storage.blob.Blob', _generic_gcp_blob)
+# amazon uses generic factory functions to create resource objects, every
+# resource gets its own class with this name.
+register_converter('boto3.resources.factory.s3.Object', _generic_aws_resource)
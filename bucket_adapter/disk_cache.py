@@ -0,0 +1,288 @@
+"""local read-through disk cache of downloaded objects."""
+
+import contextlib
+import hashlib
+import io
+import logging
+import mmap
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - windows, no cross process locking
+    fcntl = None
+
+# Number of lock files the fills are spread over.
+LOCK_STRIPES = 256
+# Seconds after which the directory is measured again, to account for the
+# entries other processes added or removed.
+RESCAN_INTERVAL = 300
+
+
+class DiskCache(object):
+    """size bounded LRU cache of objects in a local directory.
+
+    Entries are named after the hash of the object key and its version
+    (generation or ETag), so a changed object is a new entry and stale ones
+    age out. Entries are written to a temporary file and renamed, readers
+    never see a partial file. Fills of the same entry are serialised with
+    file locks, so several processes sharing the directory download an
+    object once. Opening an entry touches it; when the directory grows over
+    `max_bytes` the least recently used entries are removed. The size of
+    the directory is measured once and then tracked as entries are added,
+    it is only scanned again when over `max_bytes` or every
+    `RESCAN_INTERVAL` seconds.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self, directory, max_bytes=10 * 1024 ** 3):
+        """__init__ function.
+
+        Args:
+            directory ([string]): [cache directory, created when missing]
+            max_bytes ([int], optional): [maximum size of the entries]. Defaults to 10 GiB.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # bytes of the entries, None until the directory is scanned.
+        self._size = None
+        self._scanned = 0.0
+        os.makedirs(os.path.join(directory, 'locks'), exist_ok=True)
+
+    @classmethod
+    def from_settings(cls, settings):
+        """build a cache from the `DISK_CACHE` settings dict.
+
+        Args:
+            settings ([dict]): [DIRECTORY and the optional MAX_BYTES]
+
+        Returns:
+            [DiskCache]: [the cache]
+        """
+        return cls(settings['DIRECTORY'], max_bytes=settings.get('MAX_BYTES', 10 * 1024 ** 3))
+
+    def _name(self, key, version):
+        """hashed name of an entry.
+
+        Args:
+            key ([string]): [object key]
+            version ([object]): [generation or ETag of the object]
+
+        Returns:
+            [string]: [hex digest]
+        """
+        return hashlib.sha256('{}\0{}'.format(key, version).encode('utf-8')).hexdigest()
+
+    def _path(self, name):
+        """path of an entry.
+
+        Args:
+            name ([string]): [hashed name]
+
+        Returns:
+            [string]: [path, sharded by the first two characters]
+        """
+        return os.path.join(self.directory, name[:2], name)
+
+    def open(self, key, version):
+        """open an entry.
+
+        The returned file stays readable even if the entry is evicted.
+
+        Args:
+            key ([string]): [object key]
+            version ([object]): [generation or ETag of the object]
+
+        Returns:
+            [file]: [entry opened for binary reading, None on a miss]
+        """
+        path = self._path(self._name(key, version))
+        try:
+            entry = open(path, 'rb')
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            # the modification time orders the entries for eviction.
+            os.utime(entry.fileno())
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    @contextlib.contextmanager
+    def lock(self, key, version):
+        """hold the fill lock of an entry, across processes.
+
+        Args:
+            key ([string]): [object key]
+            version ([object]): [generation or ETag of the object]
+        """
+        name = self._name(key, version)
+        if fcntl is None:
+            yield
+            return
+        stripe = int(name[:4], 16) % LOCK_STRIPES
+        with open(os.path.join(self.directory, 'locks', str(stripe)), 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def fill(self, key, version, download):
+        """add an entry and open it.
+
+        Holds the fill lock of the entry while downloading; when another
+        process filled it in the meantime its entry is opened instead.
+
+        Args:
+            key ([string]): [object key]
+            version ([object]): [generation or ETag of the object]
+            download ([callable]): [download(fileobj) writing the object]
+
+        Returns:
+            [file]: [the new entry opened for binary reading]
+        """
+        path = self._path(self._name(key, version))
+        with self.lock(key, version):
+            try:
+                return open(path, 'rb')
+            except FileNotFoundError:
+                pass
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb+') as fileobj:
+                    download(fileobj)
+                    fileobj.flush()
+                    os.fsync(fileobj.fileno())
+                os.replace(temporary, path)
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.unlink(temporary)
+                raise
+            entry = open(path, 'rb')
+        self._added(os.fstat(entry.fileno()).st_size)
+        return entry
+
+    def _added(self, size):
+        """account for a new entry, evicting when the cache got too big.
+
+        Args:
+            size ([int]): [bytes of the entry]
+        """
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            if self._size is not None:
+                self._size += size
+            scan = (self._size is None or self._size > self.max_bytes
+                    or time.monotonic() - self._scanned > RESCAN_INTERVAL)
+        if scan:
+            self.evict()
+
+    def _scan(self):
+        """list the entries of the directory.
+
+        Returns:
+            [tuple]: [(modification time, size, path) of every entry and their total size]
+        """
+        entries = []
+        total = 0
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir() or shard.name == 'locks':
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.startswith('.tmp-'):
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        return entries, total
+
+    def evict(self):
+        """remove the least recently used entries over max_bytes."""
+        if self.max_bytes is None:
+            return
+        entries, total = self._scan()
+        if total > self.max_bytes:
+            entries.sort()
+            for _, size, path in entries:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(path)
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        with self._lock:
+            self._size = total
+            self._scanned = time.monotonic()
+
+    def copy(self, entry, fileobj):
+        """copy an entry into a file object at its current position.
+
+        Uses os.sendfile into seekable files with a descriptor and writes
+        from an mmap of the entry otherwise (pipes, sockets, in-memory
+        files), the data never goes through a Python buffer.
+
+        Args:
+            entry ([file]): [entry returned by open or fill]
+            fileobj ([object]): [writable destination]
+
+        Returns:
+            [int]: [bytes copied]
+        """
+        size = os.fstat(entry.fileno()).st_size
+        if not size:
+            return 0
+        out_fd = position = None
+        if hasattr(os, 'sendfile'):
+            try:
+                if fileobj.seekable():
+                    out_fd = fileobj.fileno()
+                    fileobj.flush()
+                    position = fileobj.tell()
+                    os.lseek(out_fd, position, os.SEEK_SET)
+            except (AttributeError, OSError, io.UnsupportedOperation):
+                out_fd = None
+        if out_fd is not None:
+            offset = 0
+            try:
+                while offset < size:
+                    sent = os.sendfile(out_fd, entry.fileno(), offset, size - offset)
+                    if not sent:
+                        break
+                    offset += sent
+            except OSError as e:
+                logging.warning("sendfile failed (%s), copying through mmap", e)
+                os.lseek(out_fd, position, os.SEEK_SET)
+            else:
+                fileobj.seek(position + offset)
+                return offset
+        with mmap.mmap(entry.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            fileobj.write(mapped)
+        return size
+
+    def stats(self):
+        """hit/miss statistics of this process.
+
+        Returns:
+            [dict]: [hits, misses and hit_ratio]
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_ratio': self.hits / lookups if lookups else 0.0}
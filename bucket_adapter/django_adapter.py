@@ -2,8 +2,20 @@
 
 from django.conf import settings
 
-from .adapter import Adapter
+from .lazy_adapter import LazyAdapter
 
-settings_file = settings.BUCKET_ADAPTER_SETTING
 
-generic_adapter = Adapter(settings_file)
+def _get_settings():
+    """BUCKET_ADAPTER_SETTING, read on first use of the adapter."""
+    return settings.BUCKET_ADAPTER_SETTING
+
+
+# authenticates on first use, importing this module stays cheap.
+generic_adapter = LazyAdapter(_get_settings)
+
+
+def __getattr__(name):
+    """settings_file, kept for code importing it from here."""
+    if name == 'settings_file':
+        return _get_settings()
+    raise AttributeError(name)
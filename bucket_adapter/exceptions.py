@@ -0,0 +1,49 @@
+"""bucket adapter exceptions."""
+
+
+class ChecksumMismatchError(Exception):
+    """raised when transferred data does not match the object checksum.
+
+    Args:
+        Exception ([type]): [base exception class]
+    """
+
+    def __init__(self, name, algorithm, expected, actual):
+        """__init__ function.
+
+        Args:
+            name ([string]): [name of the object]
+            algorithm ([string]): [checksum algorithm, e.g. md5 or crc32c]
+            expected ([bytes]): [digest of the object]
+            actual ([bytes]): [digest of the transferred data]
+        """
+        super().__init__('{} checksum mismatch for {}: expected {}, got {}'.format(
+            algorithm, name, expected.hex(), actual.hex()))
+        self.name = name
+        self.algorithm = algorithm
+        self.expected = expected
+        self.actual = actual
+
+
+class QuorumError(Exception):
+    """raised when a replicated write did not reach its quorum.
+
+    Args:
+        Exception ([type]): [base exception class]
+    """
+
+    def __init__(self, operation, succeeded, quorum, errors):
+        """__init__ function.
+
+        Args:
+            operation ([string]): [operation name, e.g. upload]
+            succeeded ([int]): [number of replicas the write succeeded on]
+            quorum ([int]): [number of replicas it had to succeed on]
+            errors ([list]): [errors of the failed replicas]
+        """
+        super().__init__('{} succeeded on {} replicas, {} needed: {}'.format(
+            operation, succeeded, quorum, ', '.join(repr(error) for error in errors)))
+        self.operation = operation
+        self.succeeded = succeeded
+        self.quorum = quorum
+        self.errors = errors
@@ -1,15 +1,23 @@
 """GCP class file."""
 
+import base64
 import datetime
+import functools
 import json
 import logging
+import mimetypes
 import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
-from google.cloud import exceptions, storage
-from google.oauth2 import service_account
-from google.oauth2.service_account import Credentials
-
+from bucket_adapter import checksums, instrumentation, listing, transfer
+from bucket_adapter.cache import NOT_MODIFIED
 from bucket_adapter.custom_blob import CustomBlob
+from bucket_adapter.exceptions import ChecksumMismatchError
+from bucket_adapter.streams import DEFAULT_READ_CHUNKSIZE, BlobReader, RangeReader
+from bucket_adapter.transport import PoolMonitor, socket_options, transport_settings
 
 
 class GCP(object):
@@ -24,6 +32,144 @@ class GCP(object):
 
     REQUIRED_FIELDS = ['CREDENTIAL_FILE', 'PROJECT_NAME', 'BUCKET_NAME']
 
+    # GCS compose accepts at most 32 source objects.
+    MAX_COMPOSE_PARTS = 32
+    # Chunk size of the resumable upload of every part, must be a multiple
+    # of 256 KiB.
+    PART_UPLOAD_CHUNKSIZE = 8 * 1024 * 1024
+
+    # Chunk size of streamed uploads of unknown size, must be a multiple of
+    # 256 KiB. At most one chunk is held in memory.
+    DEFAULT_STREAM_CHUNKSIZE = 8 * 1024 * 1024
+
+    # Blob properties set from the S3 style ExtraArgs.
+    EXTRA_ARGS_PROPERTIES = {
+        'CacheControl': 'cache_control',
+        'ContentDisposition': 'content_disposition',
+        'ContentEncoding': 'content_encoding',
+        'ContentLanguage': 'content_language',
+        'ContentType': 'content_type',
+        'Metadata': 'metadata',
+    }
+
+    # Seconds after which the cached bucket is validated again, None to
+    # validate it only once per adapter.
+    DEFAULT_BUCKET_TTL = None
+    # Requests per batch, the JSON API limit.
+    DELETE_BATCH_SIZE = 100
+    # Digests computed by verified transfers, those of the blob metadata.
+    CHECKSUM_ALGORITHMS = ('crc32c', 'md5')
+    # Seconds of the connect or read timeout left unset in `TRANSPORT`, the
+    # default of the storage client.
+    DEFAULT_TIMEOUT = 60
+
+    def __init__(self):
+        """__init__ function to set up the per adapter bucket handle cache."""
+        self._bucket = None
+        self._bucket_validated_at = None
+        self._lock = threading.Lock()
+        # credentials loaded by authenticate, reused for signing urls.
+        self._credentials = None
+        # number of remote calls made, keyed by operation name.
+        self.remote_calls = Counter()
+        # utilisation of the connection pools of the client, see `TRANSPORT`.
+        self.pool_monitor = PoolMonitor()
+
+    def _count(self, operation, calls=1):
+        """count remote calls made by an operation.
+
+        Args:
+            operation ([string]): [name of the operation making the calls]
+            calls (int, optional): [number of remote calls]. Defaults to 1.
+        """
+        with self._lock:
+            self.remote_calls[operation] += calls
+        instrumentation.record(remote_calls=calls)
+
+    def _get_bucket(self, options, client):
+        """get the cached bucket handle, validating it on first use.
+
+        The bucket is fetched with `client.get_bucket` once per adapter (or
+        again after `BUCKET_TTL` seconds) so a missing bucket or bad
+        credentials still fail early, later calls reuse the handle without
+        any remote call. Set `VALIDATE_BUCKET` to False to skip the check and
+        use a lazy `client.bucket` handle straight away.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+
+        Returns:
+            [object]: [bucket object]
+        """
+        ttl = options.get('BUCKET_TTL', self.DEFAULT_BUCKET_TTL)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket
+            if bucket is not None and (
+                    ttl is None or now - self._bucket_validated_at < ttl):
+                return bucket
+        if options.get('VALIDATE_BUCKET', True):
+            bucket = client.get_bucket(options['BUCKET_NAME'])
+            self._count('get_bucket')
+        else:
+            bucket = client.bucket(options['BUCKET_NAME'])
+        with self._lock:
+            self._bucket = bucket
+            self._bucket_validated_at = now
+        return bucket
+
+    def _get_http(self, options, credentials):
+        """authorized HTTP session tuned by the `TRANSPORT` settings.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+            credentials ([object]): [google auth credentials]
+
+        Returns:
+            [object]: [AuthorizedSession, None for the default session of the client]
+        """
+        from google.auth.transport.requests import AuthorizedSession
+        from requests.adapters import HTTPAdapter
+
+        transport = transport_settings(options)
+        if transport is None:
+            return None
+        monitor = self.pool_monitor
+        sockets = socket_options(transport)
+        timeout = None
+        if transport.connect_timeout is not None or transport.read_timeout is not None:
+            timeout = (transport.connect_timeout or self.DEFAULT_TIMEOUT,
+                       transport.read_timeout or self.DEFAULT_TIMEOUT)
+
+        class TunedAdapter(HTTPAdapter):
+            """requests adapter with the socket options and monitor of the transport."""
+
+            def init_poolmanager(self, *args, **kwargs):
+                """build the pool manager, monitoring its pools."""
+                if sockets is not None:
+                    kwargs['socket_options'] = sockets
+                super().init_poolmanager(*args, **kwargs)
+                monitor.install(self.poolmanager)
+
+        class TunedSession(AuthorizedSession):
+            """authorized session applying the transport timeouts."""
+
+            def request(self, *args, **kwargs):
+                """send a request."""
+                # the storage client passes its own 60s timeout to every call.
+                if timeout is not None:
+                    kwargs['timeout'] = timeout
+                return super().request(*args, **kwargs)
+
+        session = TunedSession(credentials)
+        adapter = TunedAdapter(pool_connections=transport.pool_size, pool_maxsize=transport.pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if not transport.keepalive:
+            session.headers['Connection'] = 'close'
+        return session
+
     def authenticate(self, options):
         """[authenticate function to authenticate the service (aws s3/gcp bucket)].
 
@@ -33,17 +179,29 @@ class GCP(object):
         Returns:
             [object]: [a client object when authentication is successful else exception is raised]
         """
+        from google.auth.credentials import AnonymousCredentials
+        from google.cloud import exceptions, storage
+        from google.oauth2 import service_account
+
         try:
             credentials = None
-            if 'CREDENTIAL_JSON' in options and options['CREDENTIAL_JSON']:
+            client_options = None
+            if options.get('API_ENDPOINT'):
+                # e.g. a local stand-in server for tests.
+                client_options = {'api_endpoint': options['API_ENDPOINT']}
+            if options.get('ANONYMOUS'):
+                credentials = AnonymousCredentials()
+            elif 'CREDENTIAL_JSON' in options and options['CREDENTIAL_JSON']:
                 credentials = service_account.Credentials.from_service_account_info(
                     json.loads(options['CREDENTIAL_JSON']))
             else:
                 credentials = service_account.Credentials.from_service_account_file(
                     options['CREDENTIAL_FILE'])
             if credentials:
+                self._credentials = credentials
                 client = storage.Client(
-                    credentials=credentials, project=options['PROJECT_NAME'])
+                    credentials=credentials, project=options['PROJECT_NAME'],
+                    client_options=client_options, _http=self._get_http(options, credentials))
             else:
                 raise exceptions.Forbidden('Authentication Failed')
             if client:
@@ -51,7 +209,7 @@ class GCP(object):
             else:
                 raise exceptions.GoogleCloudError('Authentication Failed')
         except Exception as E:
-            logging.exception("Exception {err}".format())
+            logging.exception("Exception {err}".format(err=str(E)))
             raise Exception('Authentication Failed')
 
     def upload(self, filename, options, client, bucket_filename=None, ExtraArgs=None):
@@ -67,28 +225,273 @@ class GCP(object):
         try:
             if bucket_filename is None:
                 bucket_filename = filename
-            bucket = client.get_bucket(options['BUCKET_NAME'])
-            blob = bucket.blob(bucket_filename)
-            blob.upload_from_filename(filename)
+            bucket = self._get_bucket(options, client)
+            threshold, _, _ = transfer.multipart_settings(options)
+            if threshold is not None and os.path.getsize(filename) >= threshold:
+                blob = self._upload_composite(
+                    filename, options, bucket, bucket_filename, ExtraArgs)
+            else:
+                blob = bucket.blob(bucket_filename)
+                self._set_extra_args(blob, ExtraArgs)
+                blob.upload_from_filename(filename, content_type=blob.content_type)
+                self._count('upload')
+                instrumentation.record(bytes=os.path.getsize(filename))
+            return True, blob.public_url
+        except Exception as E:
+            logging.error("Exception {err}".format(err=str(E)))
+            instrumentation.record(error=E)
+
+    def _set_extra_args(self, blob, ExtraArgs):
+        """set blob properties from S3 style ExtraArgs.
+
+        Args:
+            blob ([object]): [blob object]
+            ExtraArgs ([dict]): [e.g. {'ContentType': 'text/csv'}, see EXTRA_ARGS_PROPERTIES]
+        """
+        for key, value in (ExtraArgs or {}).items():
+            if key in self.EXTRA_ARGS_PROPERTIES:
+                setattr(blob, self.EXTRA_ARGS_PROPERTIES[key], value)
+
+    def upload_fileobj(self, fileobj, bucket_filename, options, client, ExtraArgs=None, size=None):
+        """stream a file object to the gcp bucket.
+
+        Objects of unknown size (or larger than 8 MiB) go through a
+        resumable upload sending `STREAM_CHUNKSIZE` bytes per request, so
+        only one chunk is held in memory.
+
+        Args:
+            fileobj ([object]): [readable file object]
+            bucket_filename ([string]): [blob name]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+            ExtraArgs ([dict], optional): [S3 style extra arguments, see `_set_extra_args`]. Defaults to None.
+            size ([int], optional): [number of bytes to upload]. Defaults to reading until the end.
+
+        Returns:
+            [tuple]: [bool success and uploaded file bucket url]
+        """
+        try:
+            bucket = self._get_bucket(options, client)
+            blob = bucket.blob(bucket_filename, chunk_size=options.get(
+                'STREAM_CHUNKSIZE', self.DEFAULT_STREAM_CHUNKSIZE))
+            self._set_extra_args(blob, ExtraArgs)
+            start = transfer.position(fileobj)
+            blob.upload_from_file(fileobj, size=size, content_type=blob.content_type)
+            self._count('upload_fileobj')
+            end = transfer.position(fileobj)
+            if start is not None and end is not None:
+                instrumentation.record(bytes=end - start)
             return True, blob.public_url
         except Exception as E:
             logging.error("Exception {err}".format(err=str(E)))
+            instrumentation.record(error=E)
+
+    def _upload_composite(self, filename, options, bucket, bucket_filename, ExtraArgs=None):
+        """upload a large file as a GCS parallel composite upload.
+
+        The file is split in at most 32 parts of at least
+        `MULTIPART_CHUNKSIZE` bytes, uploaded by `MULTIPART_CONCURRENCY`
+        threads as temporary objects and composed into the final object.
+        Part names depend on the file size, mtime and part size, so after a
+        failure the next upload of the same file only sends the missing
+        parts. Composite objects have a crc32c but no md5 hash; in verified
+        uploads every thread hashes its part while it is sent and the
+        crc32c of the parts are combined into that of the object. Parts
+        uploaded by an earlier attempt are hashed from disk and sent again
+        when their crc32c differs.
 
-    def download(self, filename, options, client):
+        Args:
+            filename ([string]): [file to upload]
+            options ([dict]): [options dict contains all the configuration settings]
+            bucket ([object]): [bucket object]
+            bucket_filename ([string]): [object name]
+            ExtraArgs ([dict], optional): [S3 style extra arguments, see `_set_extra_args`]. Defaults to None.
+
+        Returns:
+            [object]: [the composed blob]
+        """
+        from google.cloud import exceptions
+
+        started = time.monotonic()
+        stat = os.stat(filename)
+        _, chunksize, concurrency = transfer.multipart_settings(options)
+        chunksize = max(chunksize, -(-stat.st_size // self.MAX_COMPOSE_PARTS))
+        prefix = '{}{}.parts/{}-{}-{}/'.format(
+            options.get('COMPOSITE_PREFIX', ''), bucket_filename, stat.st_size,
+            int(stat.st_mtime), chunksize)
+        hasher = checksums.current_hasher()
+        uploaded = {}
+        if options.get('MULTIPART_RESUME', True):
+            uploaded = {part.name: part for part in bucket.list_blobs(prefix=prefix)}
+            self._count('upload')
+
+        def upload_part(number, start, end):
+            part = bucket.blob('{}{:02d}'.format(prefix, number),
+                               chunk_size=self.PART_UPLOAD_CHUNKSIZE)
+            previous = uploaded.get(part.name)
+            if previous is not None and previous.size == end - start:
+                if hasher is None:
+                    return part
+                part_hasher = checksums.StreamHasher(('crc32c',), start)
+                transfer.hash_part(filename, start, end, (hasher, part_hasher))
+                try:
+                    checksums.verify(part.name, self._get_checksums(previous), part_hasher.digests())
+                    return part
+                except ChecksumMismatchError as e:
+                    logging.warning("%s, sending it again", e)
+            with transfer.PartReader(filename, start, end, (hasher,)) as body:
+                part.upload_from_file(body, size=end - start)
+            self._count('upload')
+            instrumentation.record(bytes=end - start)
+            return part
+
+        ranges = transfer.split_ranges(stat.st_size, chunksize)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            parts = list(executor.map(instrumentation.bind(upload_part),
+                                      range(len(ranges)), *zip(*ranges)))
+        blob = bucket.blob(bucket_filename)
+        blob.content_type = mimetypes.guess_type(filename)[0]
+        self._set_extra_args(blob, ExtraArgs)
+        blob.compose(parts)
+        self._count('upload')
+        try:
+            with bucket.client.batch():
+                for part in parts:
+                    part.delete()
+            self._count('upload')
+        except exceptions.GoogleCloudError as E:
+            # the object is complete, leftover parts only cost storage.
+            logging.error("Exception {err}".format(err=str(E)))
+        transfer.log_throughput('upload', bucket_filename, stat.st_size,
+                                time.monotonic() - started)
+        return blob
+
+    def _get_ranged_blob(self, options, bucket, name):
+        """blob large enough for a ranged download.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+            bucket ([object]): [bucket object]
+            name ([string]): [blob name]
+
+        Returns:
+            [object]: [blob with its metadata, None when ranged downloads are disabled or the blob is small]
+        """
+        threshold, _, _ = transfer.ranged_download_settings(options)
+        if threshold is None:
+            return None
+        blob = bucket.get_blob(name)
+        self._count('download')
+        if blob is None or blob.size < threshold:
+            return None
+        return blob
+
+    def _get_checksums(self, blob):
+        """digests advertised by the blob metadata.
+
+        Args:
+            blob ([object]): [blob with its metadata]
+
+        Returns:
+            [dict]: [digest by algorithm]
+        """
+        expected = {}
+        if blob.crc32c:
+            expected['crc32c'] = base64.b64decode(blob.crc32c)
+        if blob.md5_hash:
+            expected['md5'] = base64.b64decode(blob.md5_hash)
+        return expected
+
+    def get_checksums(self, filename, options, client):
+        """digests of a blob, see `_get_checksums`.
+
+        Args:
+            filename ([string]): [blob name]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+
+        Raises:
+            NotFound: [when the blob does not exist]
+
+        Returns:
+            [dict]: [digest by algorithm]
+        """
+        from google.cloud import exceptions
+
+        blob = self._get_bucket(options, client).get_blob(filename)
+        self._count('get_checksums')
+        if blob is None:
+            raise exceptions.NotFound('{} not found'.format(filename))
+        return self._get_checksums(blob)
+
+    def _fetch_range(self, blob, generation, start, end):
+        """fetch a byte range of a blob.
+
+        Args:
+            blob ([object]): [blob object]
+            generation ([int]): [generation the blob must still have, None to skip the check]
+            start ([int]): [first byte]
+            end ([int]): [end of the range, excluded, None for the end of the blob]
+
+        Returns:
+            [bytes]: [content of the range]
+        """
+        # raw bytes as stored, the client would decompress gzip encoded
+        # blobs, which breaks the ranges and the checksums.
+        data = blob.download_as_bytes(
+            start=start, end=None if end is None else end - 1,
+            if_generation_match=generation, checksum=None, raw_download=True)
+        self._count('read_range')
+        instrumentation.record(bytes=len(data))
+        return data
+
+    def _download_ranges(self, options, blob, fileobj, generation=None):
+        """download a blob as concurrent byte ranges.
+
+        Every range is pinned to the generation of `blob` so a concurrent
+        overwrite fails the download instead of mixing two versions; the
+        result is checked against the blob checksums, hashed by the threads
+        fetching the ranges.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+            blob ([object]): [blob with its metadata]
+            fileobj ([object]): [writable and seekable destination]
+            generation ([int], optional): [generation to pin the ranges to]. Defaults to the blob generation.
+        """
+        _, chunksize, concurrency = transfer.ranged_download_settings(options)
+        fetch = functools.partial(self._fetch_range, blob,
+                                  blob.generation if generation is None else generation)
+        start = fileobj.tell()
+        expected = self._get_checksums(blob)
+        hasher = checksums.current_hasher() or checksums.StreamHasher(expected)
+        transfer.download_ranges(fetch, blob.size, fileobj, chunksize, concurrency, hasher)
+        transfer.verify_download(blob.name, fileobj, start, expected, hasher)
+
+    def download(self, filename, options, client, bucket_filename=None):
         """[download function to download the file in your working directory].
 
         Args:
             filename ([string]): [file to be download]
             options ([dict]): [dict object containing all the configuration settings]
             client ([object]): [client object received after successful authentication]
+            bucket_filename ([string], optional): [name of the file in bucket]. Defaults to filename.
 
         Returns:
             [file]: [file is being downloaded in the working directory]
         """
-        bucket = client.get_bucket(options['BUCKET_NAME'])
-        blob = bucket.get_blob(filename)
-        # FIXME: storage_name not defined?
-        return blob.download_to_filename(storage_name)
+        if bucket_filename is None:
+            bucket_filename = filename
+        bucket = self._get_bucket(options, client)
+        blob = self._get_ranged_blob(options, bucket, bucket_filename)
+        if blob is not None:
+            with open(filename, 'wb+') as fileobj:
+                return self._download_ranges(options, blob, fileobj)
+        blob = bucket.blob(bucket_filename)
+        response = blob.download_to_filename(filename, raw_download=True)
+        self._count('download')
+        instrumentation.record(bytes=os.path.getsize(filename))
+        return response
 
     def generate_signed_url(self, filename, options, client):
         """Generate a v2 signed URL for downloading a blob.
@@ -113,19 +516,21 @@ class GCP(object):
         )
         return url
 
-    def get_blob(self, filename, options, client):
+    def get_blob(self, filename, options, client, if_none_match=None):
         """[get custom blob object].
 
         Args:
             filename ([string]): [filename]
             options ([dict]): [options dict contains all the configuration settings]
             client ([object]): [client object received after successful authentication]
+            if_none_match ([int], optional): [generation of a cached copy, makes the request conditional]. Defaults to None.
 
         Returns:
-            [object]: [a custom blob object]
+            [object]: [a custom blob object, NOT_MODIFIED when the blob still has generation if_none_match]
         """
-        bucket = client.get_bucket(options['BUCKET_NAME'])
-        blob = bucket.get_blob(filename)
+        blob = self._get_metadata(filename, options, client, if_none_match)
+        if blob is NOT_MODIFIED:
+            return blob
         blob = CustomBlob(blob=blob, options=options)
         return blob
 
@@ -149,29 +554,283 @@ class GCP(object):
         )
         return url
 
-    def download_to_file_pointer(self, filename, tempfile_name, client, options):
+    def generate_signed_urls(self, filenames, options, client, expiration=None):
+        """generate signed urls for many blobs at once.
+
+        The bucket handle, the loaded credentials and the absolute expiry are
+        resolved once for the whole batch.
+
+        Args:
+            filenames ([iterable]): [filenames to generate signed urls for]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+            expiration ([int/timedelta/datetime], optional): [expiry of the urls]. Defaults to an hour.
+
+        Returns:
+            [dict]: [signed url by filename]
+        """
+        if expiration is None:
+            expiration = datetime.timedelta(hours=1)
+        if isinstance(expiration, int):
+            expiration = datetime.timedelta(seconds=expiration)
+        if isinstance(expiration, datetime.timedelta):
+            expiration = datetime.datetime.now(datetime.timezone.utc) + expiration
+        bucket = client.bucket(options['BUCKET_NAME'])
+        return {
+            filename: bucket.blob(blob_name=filename).generate_signed_url(
+                expiration=expiration,
+                method="GET",
+                credentials=self._credentials,
+            )
+            for filename in filenames
+        }
+
+    def download_to_file_pointer(self, filename, tempfile_name, client, options, version=None):
         """download to file pointer.
 
         Args:
             filename ([string]): [description]
             client ([object]): [client object of the service used (aws s3/gcp bucket)]
             options ([dict]): [options dict that contains all the configuration settings]
+            version ([int], optional): [generation the blob must have, the download fails otherwise]. Defaults to None.
 
         Returns:
             [type]: [temporary file pointer object]
         """
-        bucket = client.get_bucket(options['BUCKET_NAME'])
-        blob = bucket.get_blob(filename)
-        response = client.download_blob_to_file(blob, tempfile_name)
+        bucket = self._get_bucket(options, client)
+        # ranges are written at their offset, streams are downloaded in order.
+        blob = None
+        if transfer.seekable(tempfile_name):
+            blob = self._get_ranged_blob(options, bucket, filename)
+        if blob is not None:
+            return self._download_ranges(options, blob, tempfile_name, generation=version)
+        blob = bucket.blob(filename)
+        start = transfer.position(tempfile_name)
+        response = client.download_blob_to_file(blob, checksums.hashing_writer(tempfile_name),
+                                                if_generation_match=version, raw_download=True)
+        self._count('download_to_file_pointer')
+        end = transfer.position(tempfile_name)
+        if start is not None and end is not None:
+            instrumentation.record(bytes=end - start)
         return response
 
-    def get_head_object(self, Key, options, client):
+    def open_read(self, filename, options, client, chunk_size=DEFAULT_READ_CHUNKSIZE):
+        """open a blob for streamed reading.
+
+        Args:
+            filename ([string]): [blob name]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+            chunk_size ([int], optional): [readahead and iteration chunk size]. Defaults to 1 MiB.
+
+        Returns:
+            [BlobReader]: [seekable file object iterating in chunks]
+        """
+        from google.cloud import exceptions
+
+        blob = self._get_bucket(options, client).get_blob(filename)
+        self._count('open_read')
+        if blob is None:
+            raise exceptions.NotFound('{} not found'.format(filename))
+        fetch = functools.partial(self._fetch_range, blob, blob.generation)
+        return BlobReader(RangeReader(fetch, blob.size), chunk_size)
+
+    def read_range(self, filename, start, end, options, client):
+        """read a byte range of a blob with a single request.
+
+        Args:
+            filename ([string]): [blob name]
+            start ([int]): [first byte]
+            end ([int]): [end of the range, excluded, None for the end of the blob]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+
+        Returns:
+            [bytes]: [content of the range]
+        """
+        if end is not None and end <= start:
+            return b''
+        blob = self._get_bucket(options, client).blob(filename)
+        return self._fetch_range(blob, None, start, end)
+
+    def _get_metadata(self, filename, options, client, if_none_match=None):
+        """fetch the metadata of a blob.
+
+        Args:
+            filename ([string]): [blob name]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+            if_none_match ([int], optional): [generation of a cached copy, makes the request conditional]. Defaults to None.
+
+        Returns:
+            [object]: [blob with its metadata (None if missing), or NOT_MODIFIED]
+        """
+        from google.cloud import exceptions
+
+        bucket = self._get_bucket(options, client)
+        self._count('get_metadata')
+        if if_none_match is None:
+            return bucket.get_blob(filename)
+        try:
+            return bucket.get_blob(filename, if_generation_not_match=if_none_match)
+        except exceptions.NotModified:
+            return NOT_MODIFIED
+
+    def get_head_object(self, filename, options, client, if_none_match=None):
         """get head_object of GCP cloud storage object.
 
+        The metadata is returned with the keys of an S3 head_object response
+        so callers work with both backends.
+
         Args:
-            Key ([string]): [file name]
-            options ([dict]): [description]
-            client ([dict]): [description]
+            filename ([string]): [file name]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+            if_none_match ([int], optional): [generation of a cached copy, makes the request conditional]. Defaults to None.
+
+        Returns:
+            [tuple]: [bool success and the meta data dict (NOT_MODIFIED when unchanged)]
         """
-        # FIXME
-        raise NotImplementedError('Not Implemented on GCP')
+        from google.cloud import exceptions
+
+        try:
+            blob = self._get_metadata(filename, options, client, if_none_match)
+        except exceptions.GoogleCloudError as E:
+            logging.error("Exception {err}".format(err=str(E)))
+            instrumentation.record(error=E)
+            return False, None
+        if blob is NOT_MODIFIED:
+            return True, blob
+        if blob is None:
+            return False, None
+        return True, {
+            'ContentLength': blob.size,
+            'ContentType': blob.content_type,
+            'ContentEncoding': blob.content_encoding,
+            'ContentLanguage': blob.content_language,
+            'CacheControl': blob.cache_control,
+            'ETag': blob.etag,
+            'Generation': blob.generation,
+            'LastModified': blob.updated,
+            'Metadata': blob.metadata or {},
+        }
+
+    def list_blob_pages(self, options, client, prefix=None, delimiter=None, page_size=None,
+                        start_after=None, page_token=None):
+        """list the blobs page by page.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+            prefix ([string], optional): [only list names starting with it]. Defaults to None.
+            delimiter ([string], optional): [group names up to it in common prefixes, e.g. '/']. Defaults to None.
+            page_size ([int], optional): [blobs per request]. Defaults to 1000.
+            start_after ([string], optional): [only list names after it]. Defaults to None.
+            page_token ([string], optional): [page token to resume from]. Defaults to None.
+
+        Yields:
+            [tuple]: [token of the page, its CustomBlob objects, its common prefixes and the token of the next page]
+        """
+        iterator = client.list_blobs(options['BUCKET_NAME'], prefix=prefix, delimiter=delimiter,
+                                     page_size=page_size or listing.DEFAULT_PAGE_SIZE,
+                                     start_offset=start_after, page_token=page_token)
+        for page in iterator.pages:
+            self._count('list_blobs')
+            # start_offset is inclusive, start_after is not.
+            blobs = [CustomBlob(blob=blob, options=options) for blob in page
+                     if blob.name != start_after]
+            yield page_token, blobs, sorted(page.prefixes), iterator.next_page_token
+            page_token = iterator.next_page_token
+
+    def copy(self, source, destination, options, client):
+        """copy a blob server side with rewrite requests.
+
+        Large or cross location copies take several rewrite calls, each
+        resuming from the token of the previous one.
+
+        Args:
+            source ([string]): [name of the blob to copy]
+            destination ([string]): [name of the copy]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+
+        Returns:
+            [bool]: [True when copied, False otherwise]
+        """
+        from google.cloud import exceptions
+
+        try:
+            bucket = self._get_bucket(options, client)
+            target = bucket.blob(destination)
+            token = None
+            while True:
+                token, _, _ = target.rewrite(bucket.blob(source), token=token)
+                self._count('copy')
+                if token is None:
+                    return True
+        except exceptions.GoogleCloudError as E:
+            logging.error("Exception {err}".format(err=str(E)))
+            instrumentation.record(error=E)
+            return False
+
+    def delete(self, filename, options, client):
+        """delete a blob, deleting a missing blob succeeds.
+
+        Args:
+            filename ([string]): [blob name]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+
+        Returns:
+            [bool]: [True when deleted, False otherwise]
+        """
+        from google.cloud import exceptions
+
+        try:
+            self._get_bucket(options, client).delete_blob(filename)
+            self._count('delete')
+            return True
+        except exceptions.NotFound:
+            self._count('delete')
+            return True
+        except exceptions.GoogleCloudError as E:
+            logging.error("Exception {err}".format(err=str(E)))
+            instrumentation.record(error=E)
+            return False
+
+    def delete_batch(self, filenames, options, client):
+        """delete up to DELETE_BATCH_SIZE blobs with one batch request.
+
+        A batch reports only one of its failures, so when it fails (e.g. a
+        blob is already gone) its blobs are deleted one by one to get the
+        outcome of every blob.
+
+        Args:
+            filenames ([list]): [blob names]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [client object received after successful authentication]
+
+        Returns:
+            [dict]: [exception by name of the blobs not deleted]
+        """
+        from google.cloud import exceptions
+
+        bucket = self._get_bucket(options, client)
+        try:
+            with client.batch():
+                for filename in filenames:
+                    bucket.delete_blob(filename)
+            self._count('delete_many')
+            return {}
+        except exceptions.GoogleCloudError:
+            self._count('delete_many')
+        errors = {}
+        for filename in filenames:
+            try:
+                bucket.delete_blob(filename)
+            except exceptions.NotFound:
+                pass
+            except exceptions.GoogleCloudError as E:
+                errors[filename] = E
+            self._count('delete_many')
+        return errors
@@ -0,0 +1,466 @@
+"""per operation instrumentation.
+
+Every Adapter operation can be reported to listeners, callables taking an
+`OperationEvent`. The adaptees add bytes, remote calls, retries and
+swallowed errors to the event of the running operation with `record`,
+which does nothing when no operation is being instrumented. Hedged
+requests report to events of their own (see `isolated`), only the
+response kept is added to the operation.
+"""
+
+import bisect
+import collections
+import contextvars
+import logging
+import threading
+import time
+
+# Event of the operation running in the current context.
+_current_event = contextvars.ContextVar('bucket_adapter_event', default=None)
+# Exceptions swallowed by the adaptee call running in the current context,
+# collected by the retry layer (see `capture_errors`).
+_swallowed = contextvars.ContextVar('bucket_adapter_swallowed', default=None)
+
+
+class OperationEvent(object):
+    """what one Adapter operation did.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    __slots__ = ('operation', 'backend', 'started', 'elapsed', 'bytes', 'remote_calls',
+                 'retries', 'hedges', 'pool_wait', 'error', '_lock')
+
+    def __init__(self, operation, backend):
+        """__init__ function.
+
+        Args:
+            operation ([string]): [Adapter method name, e.g. 'upload']
+            backend ([string]): [adaptee name, e.g. 'aws']
+        """
+        self.operation = operation
+        self.backend = backend
+        self.started = time.time()
+        self.elapsed = None
+        self.bytes = 0
+        self.remote_calls = 0
+        self.retries = 0
+        # duplicate requests sent by hedging, see retry.Hedger.
+        self.hedges = 0
+        # seconds spent waiting for pooled connections, see transport.PoolMonitor.
+        self.pool_wait = 0.0
+        # class name of the exception raised or swallowed by the operation.
+        self.error = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        """representation of the event.
+
+        Returns:
+            [string]: [operation, backend and measures]
+        """
+        return ('<OperationEvent {}.{} elapsed={} bytes={} remote_calls={} retries={} hedges={} '
+                'pool_wait={} error={}>').format(self.backend, self.operation, self.elapsed, self.bytes,
+                                                 self.remote_calls, self.retries, self.hedges,
+                                                 self.pool_wait, self.error)
+
+
+def current_event():
+    """event of the operation running in the current context.
+
+    Returns:
+        [OperationEvent]: [the event, None when nothing is instrumented]
+    """
+    return _current_event.get()
+
+
+def record(bytes=0, remote_calls=0, retries=0, error=None, pool_wait=0.0, hedges=0):
+    """add to the event of the running operation, if any.
+
+    Safe to call from the worker threads of an operation as long as they
+    run in a copy of its context (see `bind`).
+
+    Args:
+        bytes (int, optional): [bytes transferred]. Defaults to 0.
+        remote_calls (int, optional): [requests sent]. Defaults to 0.
+        retries (int, optional): [requests retried]. Defaults to 0.
+        error ([Exception], optional): [exception swallowed by the operation]. Defaults to None.
+        pool_wait (float, optional): [seconds spent waiting for a pooled connection]. Defaults to 0.0.
+        hedges (int, optional): [duplicate requests sent by hedging]. Defaults to 0.
+    """
+    if error is not None:
+        swallowed = _swallowed.get()
+        if swallowed is not None:
+            swallowed.append(error)
+    event = _current_event.get()
+    if event is None:
+        return
+    with event._lock:
+        event.bytes += bytes
+        event.remote_calls += remote_calls
+        event.retries += retries
+        event.hedges += hedges
+        event.pool_wait += pool_wait
+        if error is not None:
+            event.error = type(error).__name__
+
+
+def isolated(func, *args, **kwargs):
+    """call func reporting to an event of its own instead of the running one.
+
+    For the requests that hedging may send twice: both run isolated and
+    only the measures of the response kept are added with `merge`.
+
+    Args:
+        func ([callable]): [function to call]
+
+    Returns:
+        [tuple]: [what func returned and its event, None when nothing is instrumented]
+    """
+    outer = _current_event.get()
+    if outer is None:
+        return func(*args, **kwargs), None
+    event = OperationEvent(outer.operation, outer.backend)
+    token = _current_event.set(event)
+    try:
+        return func(*args, **kwargs), event
+    finally:
+        _current_event.reset(token)
+
+
+def merge(event):
+    """add the measures of an isolated event to the running operation.
+
+    Args:
+        event ([OperationEvent]): [event returned by `isolated`, None for none]
+    """
+    if event is not None:
+        record(bytes=event.bytes, remote_calls=event.remote_calls, retries=event.retries,
+               pool_wait=event.pool_wait)
+
+
+def clear_error():
+    """forget the errors of the failed attempts of an operation that succeeded."""
+    event = _current_event.get()
+    if event is not None:
+        with event._lock:
+            event.error = None
+
+
+def capture_errors(func, *args, **kwargs):
+    """call func, collecting the exceptions the adaptees swallow.
+
+    Args:
+        func ([callable]): [function to call]
+
+    Returns:
+        [tuple]: [what func returned and the list of exceptions passed to `record`]
+    """
+    swallowed = []
+    token = _swallowed.set(swallowed)
+    try:
+        return func(*args, **kwargs), swallowed
+    finally:
+        _swallowed.reset(token)
+
+
+def progress_callback():
+    """callback adding transferred bytes to the event of the running operation.
+
+    For SDK progress callbacks, which run on the SDK's own threads.
+
+    Returns:
+        [callable]: [callback(bytes), None when nothing is instrumented]
+    """
+    event = _current_event.get()
+    if event is None:
+        return None
+
+    def add(bytes):
+        with event._lock:
+            event.bytes += bytes
+    return add
+
+
+def bind(func):
+    """run func in a copy of the current context.
+
+    Used for the calls submitted to thread pools so the adaptee workers
+    report to the event of the operation that started them.
+
+    Args:
+        func ([callable]): [function to call]
+
+    Returns:
+        [callable]: [function calling func in the copied context]
+    """
+    if _current_event.get() is None:
+        return func
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return run
+
+
+def instrumented(listeners, operation, backend, func, *args, **kwargs):
+    """call func as an instrumented operation.
+
+    Args:
+        listeners ([list]): [callables receiving the OperationEvent]
+        operation ([string]): [operation name]
+        backend ([string]): [backend name]
+        func ([callable]): [function doing the operation]
+
+    Returns:
+        [object]: [whatever func returns]
+    """
+    event = OperationEvent(operation, backend)
+    token = _current_event.set(event)
+    started = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    except BaseException as e:
+        event.error = type(e).__name__
+        raise
+    finally:
+        event.elapsed = time.perf_counter() - started
+        _current_event.reset(token)
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception:
+                logging.exception("instrumentation listener %r failed", listener)
+
+
+class Histogram(object):
+    """fixed memory histogram with logarithmic buckets.
+
+    Values are counted in buckets growing by `factor`, so quantiles are
+    accurate to that ratio whatever the number of values.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self, minimum=1e-4, maximum=3600.0, factor=1.1):
+        """__init__ function.
+
+        Args:
+            minimum (float, optional): [upper bound of the first bucket]. Defaults to 1e-4 (0.1 ms).
+            maximum (float, optional): [values above fall in the last bucket]. Defaults to 3600.0.
+            factor (float, optional): [ratio between bucket bounds]. Defaults to 1.1.
+        """
+        bounds = [minimum]
+        while bounds[-1] < maximum:
+            bounds.append(bounds[-1] * factor)
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, value):
+        """count a value.
+
+        Args:
+            value ([float]): [value, e.g. seconds]
+        """
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q):
+        """estimate a quantile.
+
+        Args:
+            q ([float]): [quantile between 0 and 1, e.g. 0.95]
+
+        Returns:
+            [float]: [upper bound of the bucket holding the quantile, None when empty]
+        """
+        with self._lock:
+            if not self.count:
+                return None
+            rank = q * self.count
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank and count:
+                    return self.bounds[min(index, len(self.bounds) - 1)]
+            return self.bounds[-1]
+
+
+class MetricsRecorder(object):
+    """in process listener aggregating the events per operation and backend.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self, histogram_factory=Histogram):
+        """__init__ function.
+
+        Args:
+            histogram_factory ([callable], optional): [builds the latency histograms]. Defaults to Histogram.
+        """
+        self._histogram_factory = histogram_factory
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        """record an event.
+
+        Args:
+            event ([OperationEvent]): [the event]
+        """
+        key = (event.operation, event.backend)
+        stats = self._stats.get(key)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(key, {
+                    'latency': self._histogram_factory(), 'bytes': 0, 'remote_calls': 0,
+                    'retries': 0, 'hedges': 0, 'pool_wait': 0.0, 'errors': collections.Counter()})
+        stats['latency'].add(event.elapsed)
+        with self._lock:
+            stats['bytes'] += event.bytes
+            stats['remote_calls'] += event.remote_calls
+            stats['retries'] += event.retries
+            stats['hedges'] += event.hedges
+            stats['pool_wait'] += event.pool_wait
+            if event.error is not None:
+                stats['errors'][event.error] += 1
+
+    def latency(self, operation, backend):
+        """latency histogram of an operation.
+
+        Args:
+            operation ([string]): [operation name]
+            backend ([string]): [backend name]
+
+        Returns:
+            [Histogram]: [the histogram, None before the first event]
+        """
+        stats = self._stats.get((operation, backend))
+        return stats['latency'] if stats is not None else None
+
+    def snapshot(self):
+        """aggregated measures.
+
+        Returns:
+            [dict]: [count, total/p50/p95/p99 seconds, bytes, remote_calls, retries, hedges, pool_wait seconds and errors by (operation, backend)]
+        """
+        with self._lock:
+            items = list(self._stats.items())
+        snapshot = {}
+        for key, stats in items:
+            latency = stats['latency']
+            snapshot[key] = {
+                'count': latency.count,
+                'total': latency.sum,
+                'p50': latency.quantile(0.5),
+                'p95': latency.quantile(0.95),
+                'p99': latency.quantile(0.99),
+                'bytes': stats['bytes'],
+                'remote_calls': stats['remote_calls'],
+                'retries': stats['retries'],
+                'hedges': stats['hedges'],
+                'pool_wait': stats['pool_wait'],
+                'errors': dict(stats['errors']),
+            }
+        return snapshot
+
+
+class StatsdExporter(object):
+    """listener sending the events to a StatsD client.
+
+    Works with any client having `timing(name, milliseconds)` and
+    `incr(name, count)` methods, like the `statsd` package.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self, client, prefix='bucket_adapter'):
+        """__init__ function.
+
+        Args:
+            client ([object]): [StatsD client]
+            prefix (str, optional): [metric name prefix]. Defaults to 'bucket_adapter'.
+        """
+        self.client = client
+        self.prefix = prefix
+
+    def __call__(self, event):
+        """send an event.
+
+        Args:
+            event ([OperationEvent]): [the event]
+        """
+        name = '{}.{}.{}'.format(self.prefix, event.backend, event.operation)
+        self.client.timing(name + '.time', event.elapsed * 1000)
+        if event.bytes:
+            self.client.incr(name + '.bytes', event.bytes)
+        if event.remote_calls:
+            self.client.incr(name + '.remote_calls', event.remote_calls)
+        if event.retries:
+            self.client.incr(name + '.retries', event.retries)
+        if event.hedges:
+            self.client.incr(name + '.hedges', event.hedges)
+        if event.pool_wait:
+            self.client.timing(name + '.pool_wait', event.pool_wait * 1000)
+        if event.error is not None:
+            self.client.incr('{}.errors.{}'.format(name, event.error))
+
+
+class PrometheusExporter(object):
+    """listener feeding Prometheus metrics.
+
+    Takes metrics shaped like the `prometheus_client` ones, built by the
+    caller: a latency Histogram/Summary and optional Counters, all labelled
+    `operation` and `backend` (the errors Counter also `error`), e.g.
+    `Histogram('bucket_adapter_seconds', '...', ['operation', 'backend'])`.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self, latency, bytes=None, remote_calls=None, retries=None, errors=None,
+                 pool_wait=None, hedges=None):
+        """__init__ function.
+
+        Args:
+            latency ([object]): [metric observed with the seconds of every operation]
+            bytes ([object], optional): [counter of bytes transferred]. Defaults to None.
+            remote_calls ([object], optional): [counter of requests]. Defaults to None.
+            retries ([object], optional): [counter of retries]. Defaults to None.
+            errors ([object], optional): [counter of errors]. Defaults to None.
+            pool_wait ([object], optional): [counter of seconds spent waiting for pooled connections]. Defaults to None.
+            hedges ([object], optional): [counter of hedged requests]. Defaults to None.
+        """
+        self.latency = latency
+        self.bytes = bytes
+        self.remote_calls = remote_calls
+        self.retries = retries
+        self.errors = errors
+        self.pool_wait = pool_wait
+        self.hedges = hedges
+
+    def __call__(self, event):
+        """export an event.
+
+        Args:
+            event ([OperationEvent]): [the event]
+        """
+        labels = {'operation': event.operation, 'backend': event.backend}
+        self.latency.labels(**labels).observe(event.elapsed)
+        for counter, value in ((self.bytes, event.bytes), (self.remote_calls, event.remote_calls),
+                               (self.retries, event.retries), (self.hedges, event.hedges),
+                               (self.pool_wait, event.pool_wait)):
+            if counter is not None and value:
+                counter.labels(**labels).inc(value)
+        if self.errors is not None and event.error is not None:
+            self.errors.labels(error=event.error, **labels).inc()
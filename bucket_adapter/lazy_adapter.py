@@ -0,0 +1,112 @@
+"""lazy adapter class."""
+
+import os
+import threading
+import weakref
+
+from .adapter import Adapter
+
+# Lazy adapters to reset in forked children.
+_instances = weakref.WeakSet()
+
+
+def _after_fork():
+    """reset every lazy adapter in a forked child process."""
+    for instance in list(_instances):
+        instance._reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+class LazyAdapter(object):
+    """LazyAdapter proxy building the Adapter on first use.
+
+    Nothing is imported or authenticated until an attribute is accessed.
+    The adapter is built again in a process forked after it was created
+    (gunicorn, celery workers), detected by PID, so SDK clients and their
+    connection pools are never shared across processes. With `per_thread`
+    every thread gets its own adapter, for clients that are not thread safe.
+
+    Args:
+        object ([object]): [proxy to the Adapter functions]
+    """
+
+    def __init__(self, settings_file, per_thread=None, adapter_class=Adapter):
+        """__init__ function.
+
+        Args:
+            settings_file ([dict/callable]): [configuration settings, or a function returning them on first use]
+            per_thread ([bool], optional): [one adapter per thread]. Defaults to the `PER_THREAD_CLIENTS` setting or False.
+            adapter_class ([type], optional): [class built]. Defaults to Adapter.
+        """
+        self._settings_file = settings_file
+        self._per_thread = per_thread
+        self._adapter_class = adapter_class
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # (pid, adapter) of the shared adapter, swapped as one value so a
+        # reader never sees the pid of one adapter with another.
+        self._current = None
+        _instances.add(self)
+
+    def _get_settings(self):
+        """configuration settings.
+
+        Returns:
+            [dict]: [settings dict]
+        """
+        if callable(self._settings_file):
+            return self._settings_file()
+        return self._settings_file
+
+    def _reset_after_fork(self):
+        """drop the adapters of the parent process."""
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._current = None
+
+    def reset(self):
+        """drop the adapter, the next use builds a new one."""
+        with self._lock:
+            self._current = None
+        self._local = threading.local()
+
+    def _get_adapter(self):
+        """adapter of the current process (and thread).
+
+        Returns:
+            [Adapter]: [the adapter]
+        """
+        pid = os.getpid()
+        local = self._local
+        current = getattr(local, 'current', None) or self._current
+        if current is not None and current[0] == pid:
+            return current[1]
+        with self._lock:
+            current = self._current
+            if current is not None and current[0] == pid:
+                return current[1]
+            settings_file = self._get_settings()
+            if self._per_thread is None:
+                self._per_thread = bool(settings_file.get('PER_THREAD_CLIENTS', False))
+            adapter = self._adapter_class(settings_file)
+            if self._per_thread:
+                local.current = (pid, adapter)
+            else:
+                self._current = (pid, adapter)
+            return adapter
+
+    def __getattr__(self, name):
+        """forward to the adapter, building it on first use.
+
+        Args:
+            name ([string]): [attribute name]
+
+        Returns:
+            [object]: [the adapter attribute]
+        """
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._get_adapter(), name)
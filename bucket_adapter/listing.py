@@ -0,0 +1,135 @@
+"""streaming bucket listings."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+# Number of objects asked per list request, the S3 maximum.
+DEFAULT_PAGE_SIZE = 1000
+
+
+class BlobListing(object):
+    """iterator over the blobs of a listing, one page in memory at a time.
+
+    Pages come from an adaptee `list_blob_pages` generator. While a page is
+    consumed the next one is fetched on a background thread, so the list
+    requests overlap with the caller's work and at most two pages are held
+    in memory.
+
+    `page_token` is the continuation token of the page being consumed, pass
+    it as `page_token` to `Adapter.list_blobs` to resume a listing; at most
+    that one page is listed again. `prefixes` collects the common prefixes
+    ("directories") returned when listing with a delimiter.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self, pages, prefetch=True):
+        """__init__ function.
+
+        Args:
+            pages ([iterable]): [(page_token, blobs, prefixes, next_page_token) tuples]
+            prefetch (bool, optional): [fetch the next page in the background]. Defaults to True.
+        """
+        self._pages = iter(pages)
+        self._executor = None
+        if prefetch:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='bucket-adapter-listing')
+        self._future = None
+        self._blobs = iter(())
+        self._done = False
+        self.page_token = None
+        self.next_page_token = None
+        self.prefixes = []
+
+    def __enter__(self):
+        """enter the context manager.
+
+        Returns:
+            [BlobListing]: [self]
+        """
+        return self
+
+    def __exit__(self, *exc_info):
+        """exit the context manager, stopping the listing."""
+        self.close()
+
+    def __iter__(self):
+        """iterate over the blobs.
+
+        Returns:
+            [BlobListing]: [self]
+        """
+        return self
+
+    def __next__(self):
+        """next blob, fetching the next page when needed.
+
+        Returns:
+            [CustomBlob]: [the blob]
+        """
+        while True:
+            for blob in self._blobs:
+                return blob
+            page = self.next_page()
+            if page is None:
+                raise StopIteration
+            self._blobs = iter(page)
+
+    def _fetch(self):
+        """fetch the next page from the adaptee.
+
+        Returns:
+            [tuple]: [the page, None at the end]
+        """
+        return next(self._pages, None)
+
+    def next_page(self):
+        """fetch the next page, skipping what is left of the current one.
+
+        Returns:
+            [list]: [blobs of the page, None at the end of the listing]
+        """
+        if self._done:
+            return None
+        if self._executor is None:
+            page = self._fetch()
+        else:
+            future = self._future or self._executor.submit(self._fetch)
+            self._future = None
+            page = future.result()
+            if page is not None:
+                self._future = self._executor.submit(self._fetch)
+        if page is None:
+            self.close()
+            return None
+        self.page_token, blobs, prefixes, self.next_page_token = page
+        self.prefixes.extend(prefixes)
+        self._blobs = iter(())
+        return blobs
+
+    def pages(self):
+        """iterate over the pages instead of the blobs.
+
+        Yields:
+            [list]: [blobs of every page]
+        """
+        while True:
+            page = self.next_page()
+            if page is None:
+                return
+            yield page
+
+    def close(self):
+        """stop the listing, no further page is fetched."""
+        self._done = True
+        self._blobs = iter(())
+        if self._executor is not None:
+            if self._future is not None:
+                self._future.cancel()
+            # waits for a page being fetched before closing the generator.
+            self._executor.shutdown(wait=True)
+            self._future = None
+        close = getattr(self._pages, 'close', None)
+        if close is not None:
+            close()
@@ -0,0 +1,778 @@
+"""in-process adaptees, for tests and benchmarks without a cloud account.
+
+`Memory` keeps the objects in a dict shared by the adapters of the same
+bucket name, `LocalFS` stores them as files under `LOCAL_ROOT`. Both can
+inject a per request `LATENCY` and a `BANDWIDTH` limit so measures look
+like a remote backend.
+"""
+
+import base64
+import bisect
+import collections
+import hashlib
+import hmac
+import itertools
+import logging
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote, urlencode
+
+from bucket_adapter import checksums, instrumentation, listing
+from bucket_adapter.cache import NOT_MODIFIED
+from bucket_adapter.custom_blob import CustomBlob
+from bucket_adapter.streams import DEFAULT_READ_CHUNKSIZE, BlobReader, RangeReader
+
+ObjectMeta = collections.namedtuple('ObjectMeta', [
+    'name', 'size', 'generation', 'etag', 'md5_hash', 'content_type', 'content_encoding',
+    'content_language', 'time_created'])
+ObjectMeta.__doc__ = """metadata of a stored object.
+
+Args:
+    name ([string]): [object name]
+    size ([int]): [size in bytes]
+    generation ([int]): [version, changes with every write]
+    etag ([string]): [quoted entity tag]
+    md5_hash ([string]): [base64 md5 of the content, None when not computed]
+    content_type ([string]): [content type]
+    content_encoding ([string]): [content encoding]
+    content_language ([string]): [content language]
+    time_created ([datetime]): [time of the write]
+"""
+
+# Memory stores by bucket name, shared by the adapters of a process.
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+class MemoryStore(object):
+    """objects of a bucket kept in memory.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self):
+        """__init__ function."""
+        self._objects = {}
+        # sorted names, for listings.
+        self._names = []
+        self._generations = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def write(self, name, data, content_type=None, content_encoding=None, content_language=None):
+        """store an object.
+
+        Args:
+            name ([string]): [object name]
+            data ([bytes]): [content]
+            content_type ([string], optional): [content type]. Defaults to a guess from the name.
+            content_encoding ([string], optional): [content encoding]. Defaults to None.
+            content_language ([string], optional): [content language]. Defaults to None.
+
+        Returns:
+            [ObjectMeta]: [metadata of the new object]
+        """
+        digest = hashlib.md5(data).digest()
+        with self._lock:
+            meta = ObjectMeta(
+                name, len(data), next(self._generations), '"{}"'.format(digest.hex()),
+                base64.b64encode(digest).decode('ascii'),
+                content_type or mimetypes.guess_type(name)[0] or 'application/octet-stream',
+                content_encoding, content_language, datetime.now(timezone.utc))
+            if name not in self._objects:
+                bisect.insort(self._names, name)
+            self._objects[name] = (meta, bytes(data))
+        return meta
+
+    def head(self, name):
+        """metadata of an object.
+
+        Args:
+            name ([string]): [object name]
+
+        Returns:
+            [ObjectMeta]: [metadata, None when missing]
+        """
+        stored = self._objects.get(name)
+        return stored[0] if stored is not None else None
+
+    def read(self, name, start=0, end=None, generation=None):
+        """read an object.
+
+        Args:
+            name ([string]): [object name]
+            start (int, optional): [first byte]. Defaults to 0.
+            end ([int], optional): [end of the range, excluded]. Defaults to the end of the object.
+            generation ([int], optional): [generation the object must have]. Defaults to None.
+
+        Raises:
+            FileNotFoundError: [when the object, or that generation of it, does not exist]
+
+        Returns:
+            [bytes]: [content of the range]
+        """
+        stored = self._objects.get(name)
+        if stored is None or (generation is not None and stored[0].generation != generation):
+            raise FileNotFoundError(name)
+        return stored[1][start:end]
+
+    def delete(self, name):
+        """delete an object, deleting a missing object succeeds.
+
+        Args:
+            name ([string]): [object name]
+        """
+        with self._lock:
+            if self._objects.pop(name, None) is not None:
+                del self._names[bisect.bisect_left(self._names, name)]
+
+    def names(self, prefix=None, start_after=None):
+        """iterate the object names in order.
+
+        Args:
+            prefix ([string], optional): [only names starting with it]. Defaults to None.
+            start_after ([string], optional): [only names after it]. Defaults to None.
+
+        Yields:
+            [string]: [object names]
+        """
+        with self._lock:
+            names = list(self._names)
+        if start_after is not None and (prefix is None or start_after >= prefix):
+            index = bisect.bisect_right(names, start_after)
+        else:
+            index = bisect.bisect_left(names, prefix or '')
+        for name in itertools.islice(names, index, None):
+            if prefix and not name.startswith(prefix):
+                return
+            yield name
+
+
+class LocalFSStore(object):
+    """objects of a bucket kept as files of a directory.
+
+    The generation is the modification time in nanoseconds, the content
+    type is guessed from the name.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self, root):
+        """__init__ function.
+
+        Args:
+            root ([string]): [directory of the bucket, created when missing]
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, name):
+        """path of an object.
+
+        Args:
+            name ([string]): [object name]
+
+        Returns:
+            [string]: [path under the root]
+        """
+        path = os.path.normpath(os.path.join(self.root, *name.split('/')))
+        if not path.startswith(os.path.join(os.path.normpath(self.root), '')):
+            raise ValueError('invalid object name {!r}'.format(name))
+        return path
+
+    def write(self, name, data, content_type=None, content_encoding=None, content_language=None):
+        """store an object, atomically.
+
+        Args:
+            name ([string]): [object name]
+            data ([bytes]): [content]
+            content_type ([string], optional): [ignored, guessed from the name]. Defaults to None.
+            content_encoding ([string], optional): [ignored]. Defaults to None.
+            content_language ([string], optional): [ignored]. Defaults to None.
+
+        Returns:
+            [ObjectMeta]: [metadata of the new object]
+        """
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as fileobj:
+                fileobj.write(data)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        return self.head(name)
+
+    def head(self, name):
+        """metadata of an object.
+
+        Args:
+            name ([string]): [object name]
+
+        Returns:
+            [ObjectMeta]: [metadata, None when missing]
+        """
+        try:
+            stat = os.stat(self._path(name))
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            return None
+        return ObjectMeta(
+            name, stat.st_size, stat.st_mtime_ns,
+            '"{:x}-{:x}"'.format(stat.st_mtime_ns, stat.st_size), None,
+            mimetypes.guess_type(name)[0] or 'application/octet-stream', None, None,
+            datetime.fromtimestamp(stat.st_mtime, timezone.utc))
+
+    def read(self, name, start=0, end=None, generation=None):
+        """read an object.
+
+        Args:
+            name ([string]): [object name]
+            start (int, optional): [first byte]. Defaults to 0.
+            end ([int], optional): [end of the range, excluded]. Defaults to the end of the object.
+            generation ([int], optional): [generation the object must have]. Defaults to None.
+
+        Raises:
+            FileNotFoundError: [when the object, or that generation of it, does not exist]
+
+        Returns:
+            [bytes]: [content of the range]
+        """
+        with open(self._path(name), 'rb') as fileobj:
+            if generation is not None and os.fstat(fileobj.fileno()).st_mtime_ns != generation:
+                raise FileNotFoundError(name)
+            fileobj.seek(start)
+            return fileobj.read() if end is None else fileobj.read(max(0, end - start))
+
+    def delete(self, name):
+        """delete an object, deleting a missing object succeeds.
+
+        Args:
+            name ([string]): [object name]
+        """
+        try:
+            os.unlink(self._path(name))
+        except FileNotFoundError:
+            pass
+
+    def names(self, prefix=None, start_after=None):
+        """iterate the object names in order.
+
+        Args:
+            prefix ([string], optional): [only names starting with it]. Defaults to None.
+            start_after ([string], optional): [only names after it]. Defaults to None.
+
+        Yields:
+            [string]: [object names]
+        """
+        names = []
+        for root, _, files in os.walk(self.root):
+            for filename in files:
+                if filename.startswith('.tmp-'):
+                    continue
+                name = os.path.relpath(os.path.join(root, filename), self.root).replace(os.sep, '/')
+                if (not prefix or name.startswith(prefix)) and (start_after is None or name > start_after):
+                    names.append(name)
+        yield from sorted(names)
+
+
+class Memory(object):
+    """in-process adaptee keeping the objects in memory.
+
+    Settings: `BUCKET_NAME`, the optional `LATENCY` in seconds added to
+    every request, `BANDWIDTH` in bytes per second limiting the transfers
+    and `SIGNING_KEY` of the signed urls.
+
+    Args:
+        object ([type]): [adaptee function to be called]
+    """
+
+    # Requests per delete_batch call.
+    DELETE_BATCH_SIZE = 1000
+    # Digests computed by verified transfers, the md5 the store keeps.
+    CHECKSUM_ALGORITHMS = ('md5',)
+
+    def authenticate(self, options):
+        """get the store of the bucket, shared by the adapters of the process.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+
+        Returns:
+            [MemoryStore]: [the store, used as client]
+        """
+        with _STORES_LOCK:
+            return _STORES.setdefault(options['BUCKET_NAME'], MemoryStore())
+
+    def _request(self, options, size=0):
+        """account for a request, sleeping the injected latency and transfer time.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+            size (int, optional): [bytes transferred]. Defaults to 0.
+        """
+        delay = options.get('LATENCY', 0)
+        if size and options.get('BANDWIDTH'):
+            delay += size / options['BANDWIDTH']
+        if delay:
+            time.sleep(delay)
+        instrumentation.record(bytes=size, remote_calls=1)
+
+    def _write(self, options, client, name, data, ExtraArgs=None):
+        """store an object.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [store]
+            name ([string]): [object name]
+            data ([bytes]): [content]
+            ExtraArgs ([dict], optional): [ContentType, ContentEncoding and ContentLanguage]. Defaults to None.
+
+        Returns:
+            [tuple]: [True and the url of the object]
+        """
+        extra = ExtraArgs or {}
+        self._request(options, len(data))
+        client.write(name, data, extra.get('ContentType'), extra.get('ContentEncoding'),
+                     extra.get('ContentLanguage'))
+        return True, self._url(options, name)
+
+    def _url(self, options, name):
+        """url of an object.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+            name ([string]): [object name]
+
+        Returns:
+            [string]: [unsigned url]
+        """
+        return 'memory://{}/{}'.format(options['BUCKET_NAME'], quote(name))
+
+    def upload(self, filename, options, client, bucket_filename=None, ExtraArgs=None):
+        """upload a local file.
+
+        Args:
+            filename ([string]): [file to upload]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [store]
+            bucket_filename ([string], optional): [name of the object]. Defaults to filename.
+            ExtraArgs ([dict], optional): [ContentType, ContentEncoding and ContentLanguage]. Defaults to None.
+
+        Returns:
+            [tuple]: [bool success and the url of the object]
+        """
+        with open(filename, 'rb') as fileobj:
+            data = fileobj.read()
+        return self._write(options, client, bucket_filename or filename, data, ExtraArgs)
+
+    def upload_fileobj(self, fileobj, bucket_filename, options, client, ExtraArgs=None, size=None):
+        """upload a file object.
+
+        Args:
+            fileobj ([object]): [readable file object]
+            bucket_filename ([string]): [name of the object]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [store]
+            ExtraArgs ([dict], optional): [ContentType, ContentEncoding and ContentLanguage]. Defaults to None.
+            size ([int], optional): [not needed]. Defaults to None.
+
+        Returns:
+            [tuple]: [bool success and the url of the object]
+        """
+        return self._write(options, client, bucket_filename, fileobj.read(), ExtraArgs)
+
+    def _read(self, options, client, name, start=0, end=None, generation=None):
+        """read an object.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [store]
+            name ([string]): [object name]
+            start (int, optional): [first byte]. Defaults to 0.
+            end ([int], optional): [end of the range, excluded]. Defaults to the end of the object.
+            generation ([int], optional): [generation the object must have]. Defaults to None.
+
+        Returns:
+            [bytes]: [content of the range]
+        """
+        data = client.read(name, start, end, generation)
+        self._request(options, len(data))
+        return data
+
+    def download(self, filename, options, client, bucket_filename=None):
+        """download an object to a local file.
+
+        Args:
+            filename ([string]): [local file]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [store]
+            bucket_filename ([string], optional): [name of the object]. Defaults to filename.
+
+        Returns:
+            [bool]: [True when downloaded, None when the object does not exist]
+        """
+        try:
+            data = self._read(options, client, bucket_filename or filename)
+        except FileNotFoundError as e:
+            logging.error("Exception {err}".format(err=str(e)))
+            instrumentation.record(error=e)
+            return None
+        with open(filename, 'wb') as fileobj:
+            fileobj.write(data)
+        return True
+
+    def download_to_file_pointer(self, filename, tempfile_name, client, options, version=None):
+        """download an object into a file object.
+
+        Args:
+            filename ([string]): [name of the object]
+            tempfile_name ([object]): [writable file object]
+            client ([object]): [store]
+            options ([dict]): [options dict contains all the configuration settings]
+            version ([int], optional): [generation the object must have]. Defaults to None.
+
+        Raises:
+            FileNotFoundError: [when the object, or that generation of it, does not exist]
+        """
+        checksums.hashing_writer(tempfile_name).write(
+            self._read(options, client, filename, generation=version))
+
+    def open_read(self, filename, options, client, chunk_size=DEFAULT_READ_CHUNKSIZE):
+        """open an object for streamed reading, pinned to its generation.
+
+        Args:
+            filename ([string]): [name of the object]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [store]
+            chunk_size ([int], optional): [readahead and iteration chunk size]. Defaults to 1 MiB.
+
+        Returns:
+            [BlobReader]: [seekable file object iterating in chunks]
+        """
+        self._request(options)
+        meta = client.head(filename)
+        if meta is None:
+            raise FileNotFoundError(filename)
+
+        def fetch(start, end):
+            return self._read(options, client, filename, start, end, meta.generation)
+        return BlobReader(RangeReader(fetch, meta.size), chunk_size)
+
+    def read_range(self, filename, start, end, options, client):
+        """read a byte range of an object.
+
+        Args:
+            filename ([string]): [name of the object]
+            start ([int]): [first byte]
+            end ([int]): [end of the range, excluded, None for the end of the object]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [store]
+
+        Returns:
+            [bytes]: [content of the range]
+        """
+        if end is not None and end <= start:
+            return b''
+        return self._read(options, client, filename, start, end)
+
+    def _custom_blob(self, options, meta):
+        """CustomBlob of an object.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+            meta ([ObjectMeta]): [metadata of the object, None when missing]
+
+        Returns:
+            [CustomBlob]: [blob, with every field None when missing]
+        """
+        if meta is None:
+            return CustomBlob.from_fields()
+        return CustomBlob.from_fields(
+            name=meta.name, time_created=meta.time_created, bucket=options['BUCKET_NAME'],
+            content_type=meta.content_type, content_encoding=meta.content_encoding,
+            content_language=meta.content_language, size=meta.size, etag=meta.etag,
+            generation=meta.generation, md5_hash=meta.md5_hash)
+
+    def get_blob(self, filename, options, client, if_none_match=None):
+        """get a custom blob object.
+
+        Args:
+            filename ([string]): [name of the object]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [store]
+            if_none_match ([int], optional): [generation of a cached copy]. Defaults to None.
+
+        Returns:
+            [object]: [a custom blob object, NOT_MODIFIED when the object still has generation if_none_match]
+        """
+        self._request(options)
+        meta = client.head(filename)
+        if meta is not None and if_none_match is not None and meta.generation == if_none_match:
+            return NOT_MODIFIED
+        return self._custom_blob(options, meta)
+
+    def get_checksums(self, filename, options, client):
+        """digests of an object.
+
+        Args:
+            filename ([string]): [name of the object]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [store]
+
+        Raises:
+            FileNotFoundError: [when the object does not exist]
+
+        Returns:
+            [dict]: [the md5 by algorithm, empty for the files of LocalFS]
+        """
+        self._request(options)
+        meta = client.head(filename)
+        if meta is None:
+            raise FileNotFoundError(filename)
+        return {'md5': base64.b64decode(meta.md5_hash)} if meta.md5_hash else {}
+
+    def get_head_object(self, filename, options, client, if_none_match=None):
+        """get the metadata of an object with the keys of an S3 head_object response.
+
+        Args:
+            filename ([string]): [name of the object]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [store]
+            if_none_match ([int], optional): [generation of a cached copy]. Defaults to None.
+
+        Returns:
+            [tuple]: [bool success and the meta data dict (NOT_MODIFIED when unchanged)]
+        """
+        self._request(options)
+        meta = client.head(filename)
+        if meta is None:
+            return False, None
+        if if_none_match is not None and meta.generation == if_none_match:
+            return True, NOT_MODIFIED
+        return True, {
+            'ContentLength': meta.size,
+            'ContentType': meta.content_type,
+            'ContentEncoding': meta.content_encoding,
+            'ContentLanguage': meta.content_language,
+            'ETag': meta.etag,
+            'Generation': meta.generation,
+            'LastModified': meta.time_created,
+            'Metadata': {},
+        }
+
+    def _sign(self, options, filename, expires_in):
+        """sign an url with the `SIGNING_KEY` setting.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+            filename ([string]): [name of the object]
+            expires_in ([int]): [seconds the url stays valid]
+
+        Returns:
+            [string]: [signed url]
+        """
+        expires = int(time.time()) + expires_in
+        key = options.get('SIGNING_KEY', 'bucket-adapter').encode('utf-8')
+        signature = hmac.new(key, '{}\n{}'.format(filename, expires).encode('utf-8'),
+                             hashlib.sha256).hexdigest()
+        return '{}?{}'.format(self._url(options, filename),
+                              urlencode({'Expires': expires, 'Signature': signature}))
+
+    def _expires_in(self, expiration):
+        """convert an expiration to the number of seconds a url stays valid.
+
+        Args:
+            expiration ([int/timedelta/datetime]): [seconds, a duration or an aware expiry datetime]
+
+        Returns:
+            [int]: [number of seconds, defaults to an hour when expiration is None]
+        """
+        if expiration is None:
+            return 3600
+        if isinstance(expiration, datetime):
+            expiration = expiration - datetime.now(timezone.utc)
+        if isinstance(expiration, timedelta):
+            return int(expiration.total_seconds())
+        return int(expiration)
+
+    def generate_signed_url(self, filename, options, client, expiration=3600):
+        """signed url, computed locally like the S3 and GCS ones.
+
+        Args:
+            filename ([string]): [name of the object]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [store]
+            expiration (int, optional): [seconds the url stays valid]. Defaults to 3600.
+
+        Returns:
+            [string]: [signed url]
+        """
+        return self._sign(options, filename, self._expires_in(expiration))
+
+    def generate_signed_urls(self, filenames, options, client, expiration=3600):
+        """signed urls of many objects.
+
+        Args:
+            filenames ([list]): [names of the objects]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [store]
+            expiration (int, optional): [seconds the urls stay valid]. Defaults to 3600.
+
+        Returns:
+            [dict]: [signed url by filename]
+        """
+        expires_in = self._expires_in(expiration)
+        return {filename: self._sign(options, filename, expires_in) for filename in filenames}
+
+    def generate_signed_url_with_custom_expiry(self, filename, client, expiration, options):
+        """signed url with custom expiry.
+
+        Args:
+            filename ([string]): [name of the object]
+            client ([object]): [store]
+            expiration ([datetime]): [expiry of the url]
+            options ([dict]): [options dict contains all the configuration settings]
+
+        Returns:
+            [string]: [signed url]
+        """
+        return self._sign(options, filename, self._expires_in(expiration))
+
+    def list_blob_pages(self, options, client, prefix=None, delimiter=None, page_size=None,
+                        start_after=None, page_token=None):
+        """list the objects page by page.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [store]
+            prefix ([string], optional): [only list names starting with it]. Defaults to None.
+            delimiter ([string], optional): [group names up to it in common prefixes, e.g. '/']. Defaults to None.
+            page_size ([int], optional): [names per page]. Defaults to 1000.
+            start_after ([string], optional): [only list names after it]. Defaults to None.
+            page_token ([string], optional): [token to resume from, the last name of the previous page]. Defaults to None.
+
+        Yields:
+            [tuple]: [token of the page, its CustomBlob objects, its common prefixes and the token of the next page]
+        """
+        page_size = page_size or listing.DEFAULT_PAGE_SIZE
+        names = client.names(prefix, page_token or start_after)
+        common = None
+        while True:
+            blobs, prefixes, last = [], [], None
+            for name in names:
+                if delimiter:
+                    index = name.find(delimiter, len(prefix or ''))
+                    if index != -1:
+                        if name.startswith(common or '\0'):
+                            continue
+                        common = name[:index + len(delimiter)]
+                        prefixes.append(common)
+                        # resume after every name under the common prefix.
+                        last = common + '\U0010ffff'
+                        if len(blobs) + len(prefixes) >= page_size:
+                            break
+                        continue
+                last = name
+                blobs.append(self._custom_blob(options, client.head(name)))
+                if len(blobs) + len(prefixes) >= page_size:
+                    break
+            self._request(options)
+            next_token = last if len(blobs) + len(prefixes) >= page_size else None
+            yield page_token, blobs, prefixes, next_token
+            if next_token is None:
+                return
+            page_token = next_token
+
+    def copy(self, source, destination, options, client):
+        """copy an object without transferring it.
+
+        Args:
+            source ([string]): [name of the object to copy]
+            destination ([string]): [name of the copy]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [store]
+
+        Returns:
+            [bool]: [True when copied, False when the source does not exist]
+        """
+        self._request(options)
+        meta = client.head(source)
+        if meta is None:
+            instrumentation.record(error=FileNotFoundError(source))
+            return False
+        client.write(destination, client.read(source), meta.content_type, meta.content_encoding,
+                     meta.content_language)
+        return True
+
+    def delete(self, filename, options, client):
+        """delete an object, deleting a missing object succeeds.
+
+        Args:
+            filename ([string]): [name of the object]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [store]
+
+        Returns:
+            [bool]: [True]
+        """
+        self._request(options)
+        client.delete(filename)
+        return True
+
+    def delete_batch(self, filenames, options, client):
+        """delete up to DELETE_BATCH_SIZE objects with one request.
+
+        Args:
+            filenames ([list]): [names of the objects]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([object]): [store]
+
+        Returns:
+            [dict]: [exception by name of the objects not deleted, always empty]
+        """
+        self._request(options)
+        for filename in filenames:
+            client.delete(filename)
+        return {}
+
+
+class LocalFS(Memory):
+    """in-process adaptee storing the objects as files.
+
+    The objects of a bucket are the files under `LOCAL_ROOT`/`BUCKET_NAME`.
+    Takes the `LATENCY`, `BANDWIDTH` and `SIGNING_KEY` settings of Memory.
+
+    Args:
+        object ([type]): [adaptee function to be called]
+    """
+
+    def authenticate(self, options):
+        """get the store of the bucket directory.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+
+        Returns:
+            [LocalFSStore]: [the store, used as client]
+        """
+        return LocalFSStore(os.path.join(options['LOCAL_ROOT'], options['BUCKET_NAME']))
+
+    def _url(self, options, name):
+        """url of an object.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+            name ([string]): [object name]
+
+        Returns:
+            [string]: [file url]
+        """
+        path = os.path.join(os.path.abspath(options['LOCAL_ROOT']), options['BUCKET_NAME'], name)
+        return 'file://' + quote(path.replace(os.sep, '/'))
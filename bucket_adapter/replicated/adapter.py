@@ -0,0 +1,665 @@
+"""replicated adaptee, one bucket copied on several backends."""
+
+import collections
+import copy
+import functools
+import itertools
+import logging
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from bucket_adapter import instrumentation
+from bucket_adapter.adapter import Adapter
+from bucket_adapter.cache import NOT_MODIFIED
+from bucket_adapter.exceptions import QuorumError
+
+# Streams up to this size are fanned out from memory, larger ones are
+# spooled to a temporary file the replicas upload from.
+SPOOL_LIMIT = 8 * 1024 * 1024
+
+# Generation (or ETag) of a file on one replica, the Generation of the heads
+# and blobs read through Replicated, so versioned and conditional requests go
+# back to the replica that issued it.
+ReplicaVersion = collections.namedtuple('ReplicaVersion', ['index', 'version'])
+
+
+class ReplicaSet(object):
+    """the adapters of the replicas and their observed latencies.
+
+    Latencies are exponentially weighted moving averages kept per replica
+    and operation. A failed call adds `error_penalty` seconds to the
+    average of its replica, so it is tried last until it gets faster
+    again; `probe_ratio` of the reads go to another replica than the
+    fastest, so the averages of the others keep up to date.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self, adapters, quorum=None, alpha=0.2, probe_ratio=0.05, error_penalty=1.0,
+                 max_workers=None):
+        """__init__ function.
+
+        Args:
+            adapters ([list]): [Adapter of every replica]
+            quorum ([int], optional): [replicas a write must succeed on]. Defaults to all of them.
+            alpha (float, optional): [weight of the last sample in the averages]. Defaults to 0.2.
+            probe_ratio (float, optional): [share of the reads sent to another replica than the fastest]. Defaults to 0.05.
+            error_penalty (float, optional): [seconds added to the average of a failed replica]. Defaults to 1.0.
+            max_workers ([int], optional): [threads fanning the writes out]. Defaults to 8 per replica.
+        """
+        if quorum is None:
+            quorum = len(adapters)
+        if not 1 <= quorum <= len(adapters):
+            raise ValueError('quorum must be between 1 and {}'.format(len(adapters)))
+        self.adapters = adapters
+        self.quorum = quorum
+        self.alpha = alpha
+        self.probe_ratio = probe_ratio
+        self.error_penalty = error_penalty
+        self._latencies = {}
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or 8 * len(adapters))
+
+    def ordered(self, operation):
+        """replicas to try for a read, the fastest first.
+
+        Replicas not measured yet come first, so every replica gets
+        measured.
+
+        Args:
+            operation ([string]): [operation name]
+
+        Returns:
+            [list]: [replica indexes]
+        """
+        with self._lock:
+            order = sorted(range(len(self.adapters)),
+                           key=lambda index: self._latencies.get((index, operation), 0.0))
+        if len(order) > 1 and random.random() < self.probe_ratio:
+            order.insert(0, order.pop(random.randrange(1, len(order))))
+        return order
+
+    def observe(self, index, operation, seconds):
+        """add a latency sample.
+
+        Args:
+            index ([int]): [replica index]
+            operation ([string]): [operation name]
+            seconds ([float]): [latency of the call]
+        """
+        key = (index, operation)
+        with self._lock:
+            average = self._latencies.get(key)
+            self._latencies[key] = seconds if average is None else (
+                self.alpha * seconds + (1 - self.alpha) * average)
+
+    def penalize(self, index, operation):
+        """push a replica back after a failure.
+
+        Args:
+            index ([int]): [replica index]
+            operation ([string]): [operation name]
+        """
+        key = (index, operation)
+        with self._lock:
+            self._latencies[key] = self._latencies.get(key, 0.0) + self.error_penalty
+
+    def latencies(self):
+        """current averages.
+
+        Returns:
+            [dict]: [seconds by (replica index, operation)]
+        """
+        with self._lock:
+            return dict(self._latencies)
+
+
+def _attempt(call, adapter):
+    """call a replica, collecting what it raised or swallowed.
+
+    Args:
+        call ([callable]): [call(adapter) doing the operation]
+        adapter ([Adapter]): [adapter of the replica]
+
+    Returns:
+        [tuple]: [result, the error (None on success) and whether it was raised]
+    """
+    try:
+        result, swallowed = instrumentation.capture_errors(call, adapter)
+    except Exception as e:
+        return None, e, True
+    return result, swallowed[-1] if swallowed else None, False
+
+
+def _pinned(client, adapter, version):
+    """version of a file on a replica.
+
+    Args:
+        client ([ReplicaSet]): [the replicas]
+        adapter ([Adapter]): [adapter of the replica]
+        version ([object]): [generation or ETag of the file on it]
+
+    Returns:
+        [ReplicaVersion]: [the version, None when version is]
+    """
+    return None if version is None else ReplicaVersion(client.adapters.index(adapter), version)
+
+
+def _private_copy(filename):
+    """hard link a file, or copy it, for the replicas finishing after the write returned.
+
+    Args:
+        filename ([string]): [file to upload]
+
+    Returns:
+        [string]: [path of the link in a temporary directory, under the same name]
+    """
+    directory = tempfile.mkdtemp(prefix='bucket-adapter-')
+    path = os.path.join(directory, os.path.basename(filename))
+    try:
+        try:
+            os.link(filename, path)
+        except OSError:
+            shutil.copyfile(filename, path)
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    return path
+
+
+def _page_token(index, token):
+    """page token naming the replica the listing runs on.
+
+    Args:
+        index ([int]): [replica index]
+        token ([string]): [page token of the replica]
+
+    Returns:
+        [string]: [token, None when token is]
+    """
+    return None if token is None else '{}:{}'.format(index, token)
+
+
+class Replicated(object):
+    """composite adaptee writing to several backends and reading from the fastest.
+
+    `REPLICAS` is the list of the settings dicts of the backends (each
+    with its `NAME`, credentials and optional caches/retries). Writes are
+    sent to every replica concurrently and succeed once `WRITE_QUORUM`
+    replicas have them, the others finish in the background, from a hard
+    link (or a copy) of the uploaded file so the caller may remove it. Reads
+    go to the replica with the lowest average latency and fail over to the
+    next one on errors or missing objects. The generation of heads and
+    blobs is a ReplicaVersion, downloads pinned to it are only served by
+    that replica.
+
+    Args:
+        object ([type]): [adaptee function to be called]
+    """
+
+    # Keys per delete_batch call, each replica batches them again.
+    DELETE_BATCH_SIZE = 1000
+    # Digests computed by verified transfers, any the backends may keep.
+    CHECKSUM_ALGORITHMS = ('md5', 'crc32', 'crc32c')
+
+    def authenticate(self, options):
+        """build the adapters of the replicas.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+
+        Returns:
+            [ReplicaSet]: [the replicas, used as client]
+        """
+        adapters = [Adapter(settings) for settings in options['REPLICAS']]
+        return ReplicaSet(adapters, quorum=options.get('WRITE_QUORUM'),
+                          alpha=options.get('EWMA_ALPHA', 0.2),
+                          probe_ratio=options.get('PROBE_RATIO', 0.05),
+                          error_penalty=options.get('ERROR_PENALTY', 1.0),
+                          max_workers=options.get('REPLICA_WORKERS'))
+
+    def _read(self, client, operation, call, missing=None, reset=None, first=None, only=False):
+        """run a read on the fastest replica, failing over to the others.
+
+        Args:
+            client ([ReplicaSet]): [the replicas]
+            operation ([string]): [operation name]
+            call ([callable]): [call(adapter) doing the read]
+            missing ([callable], optional): [missing(result) true when the replica lacks the object]. Defaults to None.
+            reset ([callable], optional): [undoes a failed attempt, e.g. rewinds the destination]. Defaults to None.
+            first ([int], optional): [index of the replica to try first]. Defaults to the fastest.
+            only (bool, optional): [do not fail over from the first replica]. Defaults to False.
+
+        Returns:
+            [object]: [result of the first replica that succeeded, else of the last one]
+        """
+        order = client.ordered(operation)
+        if first is not None:
+            order.remove(first)
+            order = [first] if only else [first] + order
+        result = error = None
+        raised = False
+        for attempt, index in enumerate(order):
+            if attempt and reset is not None:
+                reset()
+            started = time.perf_counter()
+            result, error, raised = _attempt(call, client.adapters[index])
+            if error is not None:
+                logging.warning("replica %d failed %s with %s", index, operation, type(error).__name__)
+                client.penalize(index, operation)
+                continue
+            if missing is not None and missing(result):
+                continue
+            client.observe(index, operation, time.perf_counter() - started)
+            return result
+        if error is None:
+            return result
+        if raised:
+            raise error
+        instrumentation.record(error=error)
+        return result
+
+    def _write(self, client, operation, call, cleanup=None):
+        """run a write on every replica, returning once the quorum has it.
+
+        Args:
+            client ([ReplicaSet]): [the replicas]
+            operation ([string]): [operation name]
+            call ([callable]): [call(adapter) doing the write]
+            cleanup ([callable], optional): [called once every replica is done]. Defaults to None.
+
+        Returns:
+            [object]: [result of the first replica that succeeded, False when the quorum failed]
+        """
+        futures = {client.executor.submit(instrumentation.bind(functools.partial(_attempt, call, adapter))): index
+                   for index, adapter in enumerate(client.adapters)}
+        remaining = len(futures)
+        lock = threading.Lock()
+
+        def done(future):
+            nonlocal remaining
+            _, error, _ = future.result()
+            if error is not None:
+                logging.error("replica %d failed %s with %s", futures[future], operation, error)
+            with lock:
+                remaining -= 1
+                last = not remaining
+            if last and cleanup is not None:
+                cleanup()
+
+        for future in futures:
+            future.add_done_callback(done)
+        pending, succeeded, failed = set(futures), [], []
+        while pending and len(succeeded) < client.quorum and len(failed) <= len(futures) - client.quorum:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                result, error, _ = future.result()
+                (failed if error is not None else succeeded).append((result, error))
+        if len(succeeded) >= client.quorum:
+            return succeeded[0][0]
+        error = QuorumError(operation, len(succeeded), client.quorum, [error for _, error in failed])
+        logging.error(error)
+        instrumentation.record(error=error)
+        return False
+
+    def upload(self, filename, options, client, bucket_filename=None, ExtraArgs=None):
+        """upload a local file to every replica.
+
+        Args:
+            filename ([string]): [file to upload]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([ReplicaSet]): [the replicas]
+            bucket_filename ([string], optional): [name of the file in bucket]. Defaults to filename.
+            ExtraArgs ([dict], optional): [extra arguments, e.g. ContentType]. Defaults to None.
+
+        Returns:
+            [tuple]: [bool success and the url of the first replica, False when the quorum failed]
+        """
+        if bucket_filename is None:
+            bucket_filename = filename
+        cleanup = None
+        if len(client.adapters) > 1:
+            try:
+                linked = _private_copy(filename)
+            except OSError as e:
+                # e.g. a missing file, every replica reports it.
+                logging.warning("could not link %s (%s), the replicas read it in place", filename, e)
+            else:
+                filename = linked
+                cleanup = functools.partial(shutil.rmtree, os.path.dirname(linked), ignore_errors=True)
+        return self._write(client, 'upload', lambda adapter: adapter.upload(
+            filename, bucket_filename=bucket_filename, ExtraArgs=ExtraArgs), cleanup=cleanup)
+
+    def upload_fileobj(self, fileobj, bucket_filename, options, client, ExtraArgs=None, size=None):
+        """upload a file object to every replica.
+
+        The stream is read once: up to SPOOL_LIMIT bytes are sent from
+        memory, larger streams are spooled to a temporary file removed when
+        the last replica is done.
+
+        Args:
+            fileobj ([object]): [readable file object]
+            bucket_filename ([string]): [name of the file in bucket]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([ReplicaSet]): [the replicas]
+            ExtraArgs ([dict], optional): [extra arguments, e.g. ContentType]. Defaults to None.
+            size ([int], optional): [size of the stream when known]. Defaults to None.
+
+        Returns:
+            [tuple]: [bool success and the url of the first replica, False when the quorum failed]
+        """
+        head = fileobj.read(SPOOL_LIMIT)
+        if len(head) < SPOOL_LIMIT:
+            data = memoryview(head)
+            return self._write(client, 'upload_fileobj', lambda adapter: adapter.upload_stream(
+                data, bucket_filename, ExtraArgs=ExtraArgs))
+        fd, spooled = tempfile.mkstemp(prefix='bucket-adapter-')
+        try:
+            with os.fdopen(fd, 'wb') as spool:
+                spool.write(head)
+                del head
+                shutil.copyfileobj(fileobj, spool)
+        except BaseException:
+            os.unlink(spooled)
+            raise
+        return self._write(client, 'upload_fileobj', lambda adapter: adapter.upload(
+            spooled, bucket_filename=bucket_filename, ExtraArgs=ExtraArgs),
+            cleanup=functools.partial(os.unlink, spooled))
+
+    def copy(self, source, destination, options, client):
+        """copy a file server side on every replica.
+
+        Args:
+            source ([string]): [name of the file in bucket]
+            destination ([string]): [name of the copy]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([ReplicaSet]): [the replicas]
+
+        Returns:
+            [bool]: [True when the quorum copied it, False otherwise]
+        """
+        return self._write(client, 'copy', lambda adapter: adapter.copy(source, destination))
+
+    def delete(self, filename, options, client):
+        """delete a file on every replica.
+
+        Args:
+            filename ([string]): [name of the file in bucket]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([ReplicaSet]): [the replicas]
+
+        Returns:
+            [bool]: [True when the quorum deleted it, False otherwise]
+        """
+        return self._write(client, 'delete', lambda adapter: adapter.delete(filename))
+
+    def delete_batch(self, filenames, options, client):
+        """delete files on every replica.
+
+        Args:
+            filenames ([list]): [names of the files in bucket]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([ReplicaSet]): [the replicas]
+
+        Returns:
+            [dict]: [exception by name of the files fewer than the quorum deleted]
+        """
+        def delete_many(adapter):
+            return {result.item: result.error for result in adapter.delete_many(filenames)
+                    if result.error is not None}
+        outcomes = [future.result() for future in [
+            client.executor.submit(instrumentation.bind(functools.partial(_attempt, delete_many, adapter)))
+            for adapter in client.adapters]]
+        errors = {}
+        for filename in filenames:
+            failed = [error if error is not None else result.get(filename)
+                      for result, error, _ in outcomes
+                      if error is not None or filename in result]
+            if len(outcomes) - len(failed) < client.quorum:
+                errors[filename] = QuorumError('delete_many', len(outcomes) - len(failed),
+                                               client.quorum, failed)
+        return errors
+
+    def download(self, filename, options, client, bucket_filename=None):
+        """download from the fastest replica.
+
+        Args:
+            filename ([string]): [local file]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([ReplicaSet]): [the replicas]
+            bucket_filename ([string], optional): [name of the file in bucket]. Defaults to filename.
+
+        Returns:
+            [object]: [what the replica returned]
+        """
+        return self._read(client, 'download', lambda adapter: adapter.download(
+            filename, bucket_filename=bucket_filename))
+
+    def download_to_file_pointer(self, filename, tempfile_name, client, options, version=None):
+        """download into a file object from the fastest replica.
+
+        The destination is rewound and truncated before failing over. A
+        download pinned to a version only goes to the replica of the version,
+        the others cannot tell whether they hold it.
+
+        Args:
+            filename ([string]): [name of the file in bucket]
+            tempfile_name ([object]): [writable and seekable file object]
+            client ([ReplicaSet]): [the replicas]
+            options ([dict]): [options dict contains all the configuration settings]
+            version ([ReplicaVersion], optional): [version the file must have]. Defaults to None.
+
+        Returns:
+            [object]: [what the replica returned]
+        """
+        start = tempfile_name.tell()
+
+        def reset():
+            tempfile_name.seek(start)
+            tempfile_name.truncate()
+
+        if version is None:
+            return self._read(client, 'download_to_file_pointer',
+                              lambda adapter: adapter.download_to_file_pointer(filename, tempfile_name),
+                              reset=reset)
+        return self._read(client, 'download_to_file_pointer',
+                          lambda adapter: adapter.download_to_file_pointer(
+                              filename, tempfile_name, version=version.version),
+                          reset=reset, first=version.index, only=True)
+
+    def open_read(self, filename, options, client, **kwargs):
+        """open a file for streamed reading on the fastest replica.
+
+        Args:
+            filename ([string]): [name of the file in bucket]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([ReplicaSet]): [the replicas]
+
+        Returns:
+            [BlobReader]: [seekable file object iterating in chunks]
+        """
+        return self._read(client, 'open_read', lambda adapter: adapter.open_read(filename, **kwargs))
+
+    def read_range(self, filename, start, end, options, client):
+        """read a byte range from the fastest replica.
+
+        Args:
+            filename ([string]): [name of the file in bucket]
+            start ([int]): [first byte]
+            end ([int]): [end of the range, excluded, None for the end of the file]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([ReplicaSet]): [the replicas]
+
+        Returns:
+            [bytes]: [content of the range]
+        """
+        return self._read(client, 'read_range', lambda adapter: adapter.read_range(filename, start, end))
+
+    def get_blob(self, filename, options, client, if_none_match=None):
+        """get a custom blob object from the fastest replica having the file.
+
+        A conditional request goes to the replica of the cached version first.
+
+        Args:
+            filename ([string]): [name of the file in bucket]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([ReplicaSet]): [the replicas]
+            if_none_match ([ReplicaVersion], optional): [generation of a cached copy]. Defaults to None.
+
+        Returns:
+            [object]: [a custom blob object with a ReplicaVersion generation, NOT_MODIFIED when unchanged]
+        """
+        def get_blob(adapter):
+            if if_none_match is not None and adapter is client.adapters[if_none_match.index]:
+                blob = adapter.get_blob(filename, if_none_match=if_none_match.version)
+            else:
+                blob = adapter.get_blob(filename)
+            if blob is NOT_MODIFIED or blob.name is None:
+                return blob
+            # a copy, the blob may be a record of the metadata cache of the replica.
+            blob = copy.copy(blob)
+            blob.generation = _pinned(client, adapter, blob.generation if blob.generation is not None else blob.etag)
+            return blob
+        return self._read(client, 'get_blob', get_blob,
+                          missing=lambda blob: blob is not NOT_MODIFIED and blob.name is None,
+                          first=None if if_none_match is None else if_none_match.index)
+
+    def get_checksums(self, filename, options, client):
+        """digests of a file from the fastest replica having it.
+
+        Args:
+            filename ([string]): [name of the file in bucket]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([ReplicaSet]): [the replicas]
+
+        Returns:
+            [dict]: [digest by algorithm]
+        """
+        return self._read(client, 'get_checksums', lambda adapter: adapter.get_checksums(filename))
+
+    def get_head_object(self, filename, options, client, if_none_match=None):
+        """get the head object from the fastest replica having the file.
+
+        A conditional request goes to the replica of the cached version first.
+
+        Args:
+            filename ([string]): [name of the file in bucket]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([ReplicaSet]): [the replicas]
+            if_none_match ([ReplicaVersion], optional): [generation of a cached copy]. Defaults to None.
+
+        Returns:
+            [tuple]: [bool success and the meta data dict with a ReplicaVersion Generation (NOT_MODIFIED when unchanged)]
+        """
+        def get_head_object(adapter):
+            if if_none_match is not None and adapter is client.adapters[if_none_match.index]:
+                success, head = adapter.get_head_object(filename, if_none_match=if_none_match.version)
+            else:
+                success, head = adapter.get_head_object(filename)
+            if not success or not head or head is NOT_MODIFIED:
+                return success, head
+            return success, dict(head, Generation=_pinned(
+                client, adapter, head.get('Generation') or head.get('ETag')))
+        return self._read(client, 'get_head_object', get_head_object,
+                          missing=lambda head: not head[0],
+                          first=None if if_none_match is None else if_none_match.index)
+
+    def generate_signed_url(self, filename, options, client, **kwargs):
+        """signed url of the fastest replica.
+
+        Args:
+            filename ([string]): [name of the file in bucket]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([ReplicaSet]): [the replicas]
+
+        Returns:
+            [string]: [signed url]
+        """
+        return self._read(client, 'generate_signed_url',
+                          lambda adapter: adapter.generate_signed_url(filename, **kwargs),
+                          missing=lambda url: url is None)
+
+    def generate_signed_urls(self, filenames, options, client, **kwargs):
+        """signed urls of the fastest replica.
+
+        Args:
+            filenames ([list]): [names of the files in bucket]
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([ReplicaSet]): [the replicas]
+
+        Returns:
+            [dict]: [signed url by filename]
+        """
+        return self._read(client, 'generate_signed_urls',
+                          lambda adapter: adapter.generate_signed_urls(filenames, **kwargs),
+                          missing=lambda urls: urls is None)
+
+    def generate_signed_url_with_custom_expiry(self, filename, client, expiration, options):
+        """signed url with custom expiry of the fastest replica.
+
+        Args:
+            filename ([string]): [name of the file in bucket]
+            client ([ReplicaSet]): [the replicas]
+            expiration ([datetime]): [expiry of the url]
+            options ([dict]): [options dict contains all the configuration settings]
+
+        Returns:
+            [string]: [signed url]
+        """
+        return self._read(client, 'generate_signed_url_with_custom_expiry',
+                          lambda adapter: adapter.generate_signed_url_with_custom_expiry(
+                              filename, expiration=expiration),
+                          missing=lambda url: url is None)
+
+    def list_blob_pages(self, options, client, prefix=None, delimiter=None, page_size=None,
+                        start_after=None, page_token=None):
+        """list the files of the fastest replica page by page.
+
+        A listing stays on one replica, its page tokens start with the
+        index of the replica so a resumed listing goes back to it.
+
+        Args:
+            options ([dict]): [options dict contains all the configuration settings]
+            client ([ReplicaSet]): [the replicas]
+            prefix ([string], optional): [only list names starting with it]. Defaults to None.
+            delimiter ([string], optional): [group names up to it in common prefixes, e.g. '/']. Defaults to None.
+            page_size ([int], optional): [names per request]. Defaults to 1000.
+            start_after ([string], optional): [only list names after it]. Defaults to None.
+            page_token ([string], optional): [page token to resume from]. Defaults to None.
+
+        Yields:
+            [tuple]: [token of the page, its CustomBlob objects, its common prefixes and the token of the next page]
+        """
+        if page_token:
+            index, _, page_token = page_token.partition(':')
+            order = [int(index)]
+        else:
+            order = client.ordered('list_blobs')
+        error = None
+        for index in order:
+            adapter = client.adapters[index]
+            pages = adapter.adaptee_obj.list_blob_pages(
+                options=adapter.settings, client=adapter.authenticate, prefix=prefix,
+                delimiter=delimiter, page_size=page_size, start_after=start_after,
+                page_token=page_token)
+            started = time.perf_counter()
+            try:
+                first = next(pages)
+            except StopIteration:
+                return
+            except Exception as e:
+                logging.warning("replica %d failed list_blobs with %s", index, type(e).__name__)
+                client.penalize(index, 'list_blobs')
+                error = e
+                continue
+            client.observe(index, 'list_blobs', time.perf_counter() - started)
+            for token, blobs, prefixes, next_token in itertools.chain([first], pages):
+                yield _page_token(index, token), blobs, prefixes, _page_token(index, next_token)
+            return
+        raise error
@@ -0,0 +1,454 @@
+"""retries with jittered backoff and hedged requests."""
+
+import concurrent.futures
+import contextvars
+import functools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import instrumentation
+from .instrumentation import Histogram
+
+# HTTP statuses worth retrying.
+TRANSIENT_STATUS_CODES = frozenset([408, 429, 500, 502, 503, 504])
+# S3 error codes worth retrying.
+TRANSIENT_ERROR_CODES = frozenset([
+    'RequestTimeout', 'RequestTimeoutException', 'Throttling', 'ThrottlingException',
+    'SlowDown', 'InternalError', 'ServiceUnavailable', 'RequestLimitExceeded',
+    'BandwidthLimitExceeded', 'PriorRequestNotComplete'])
+# Exceptions worth retrying, by class name (or the name of a base class) so
+# no SDK has to be imported: network errors of botocore, urllib3, requests
+# and google-auth, and corrupted downloads.
+TRANSIENT_EXCEPTIONS = frozenset([
+    'ConnectionError', 'TimeoutError', 'ReadTimeoutError', 'ConnectTimeoutError',
+    'EndpointConnectionError', 'ConnectionClosedError', 'IncompleteReadError',
+    'ResponseStreamingError', 'ProtocolError', 'ChunkedEncodingError', 'Timeout',
+    'TransportError', 'ChecksumMismatchError'])
+
+# Operations whose byte ranges are hedged, see `Hedger.wrap`.
+RANGED_OPERATIONS = frozenset(['download', 'download_to_file_pointer'])
+DEFAULT_HEDGED_OPERATIONS = ('get_blob', 'get_head_object', 'read_range') + tuple(RANGED_OPERATIONS)
+
+# Hedger of the running ranged download.
+_current_hedger = contextvars.ContextVar('bucket_adapter_hedger', default=None)
+
+
+def is_transient(error):
+    """whether an error is worth retrying.
+
+    Args:
+        error ([Exception]): [the error]
+
+    Returns:
+        [bool]: [True for throttling, server side and network errors]
+    """
+    for klass in type(error).__mro__:
+        if klass.__name__ in TRANSIENT_EXCEPTIONS:
+            return True
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict):
+        # botocore ClientError
+        if response.get('Error', {}).get('Code') in TRANSIENT_ERROR_CODES:
+            return True
+        return response.get('ResponseMetadata', {}).get('HTTPStatusCode') in TRANSIENT_STATUS_CODES
+    # google.api_core GoogleAPICallError
+    code = getattr(error, 'code', None)
+    return isinstance(code, int) and code in TRANSIENT_STATUS_CODES
+
+
+def _rewind_fileobj(index, name, truncate=False):
+    """rule retrying an operation on a file object it can rewind.
+
+    Args:
+        index ([int]): [position of the file object in the arguments]
+        name ([string]): [name of the file object keyword argument]
+        truncate (bool, optional): [also drop what a failed attempt wrote]. Defaults to False.
+
+    Returns:
+        [callable]: [prepare(args, kwargs) returning a rewind function, None when the file object is not seekable]
+    """
+    def prepare(args, kwargs):
+        fileobj = args[index] if len(args) > index else kwargs.get(name)
+        try:
+            if not fileobj.seekable():
+                return None
+            position = fileobj.tell()
+        except (AttributeError, OSError, ValueError):
+            return None
+
+        def rewind():
+            fileobj.seek(position)
+            if truncate:
+                fileobj.truncate()
+        return rewind
+    return prepare
+
+
+# How the Adapter operations are retried: True when they can be repeated as
+# they are (reads, and uploads writing the same content to the same key),
+# or a function returning how to rewind the file object they stream.
+# Operations missing here are never retried.
+OPERATION_RULES = {
+    'upload': True,
+    'upload_fileobj': _rewind_fileobj(0, 'fileobj'),
+    'download': True,
+    'download_to_file_pointer': _rewind_fileobj(1, 'tempfile_name', truncate=True),
+    'get_blob': True,
+    'get_head_object': True,
+    'get_checksums': True,
+    'open_read': True,
+    'list_blobs': True,
+    'read_range': True,
+    'copy': True,
+    # deleting a missing file succeeds, deletes can be sent again.
+    'delete': True,
+    'delete_many': True,
+}
+
+
+class RetryBudget(object):
+    """token bucket limiting retries to a share of the calls.
+
+    Every call deposits `ratio` tokens and every retry takes one, so when
+    the backend is down retries stop once the initial tokens are spent
+    instead of multiplying the load.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self, ratio=0.1, initial=10, maximum=100):
+        """__init__ function.
+
+        Args:
+            ratio (float, optional): [retries allowed per call]. Defaults to 0.1.
+            initial (int, optional): [tokens available at start]. Defaults to 10.
+            maximum (int, optional): [maximum tokens saved up]. Defaults to 100.
+        """
+        self.ratio = ratio
+        self.maximum = maximum
+        self._tokens = float(initial)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        """add the tokens earned by a call."""
+        with self._lock:
+            self._tokens = min(self.maximum, self._tokens + self.ratio)
+
+    def withdraw(self):
+        """take a token for a retry.
+
+        Returns:
+            [bool]: [whether the retry is allowed]
+        """
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryPolicy(object):
+    """retries of failed operations with exponential backoff and full jitter.
+
+    An attempt failed when it raised, or when the adaptee swallowed an
+    exception and returned its failure value (see
+    `instrumentation.record`). Only transient errors of retryable
+    operations are retried, within the retry budget; the last result (or
+    exception) is returned as is.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self, max_attempts=3, base_delay=0.1, max_delay=5.0, budget=None, rules=None,
+                 sleep=time.sleep):
+        """__init__ function.
+
+        Args:
+            max_attempts (int, optional): [attempts per call, the first included]. Defaults to 3.
+            base_delay (float, optional): [backoff of the first retry in seconds]. Defaults to 0.1.
+            max_delay (float, optional): [maximum backoff in seconds]. Defaults to 5.0.
+            budget ([RetryBudget], optional): [retry budget]. Defaults to RetryBudget().
+            rules ([dict], optional): [retry rule by operation]. Defaults to OPERATION_RULES.
+            sleep ([callable], optional): [sleep function]. Defaults to time.sleep.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget if budget is not None else RetryBudget()
+        self.rules = rules if rules is not None else OPERATION_RULES
+        self.sleep = sleep
+
+    @classmethod
+    def from_settings(cls, settings):
+        """build a policy from the `RETRY` settings dict.
+
+        Args:
+            settings ([dict]): [MAX_ATTEMPTS, BASE_DELAY, MAX_DELAY, BUDGET_RATIO and BUDGET_INITIAL, all optional]
+
+        Returns:
+            [RetryPolicy]: [the policy]
+        """
+        return cls(max_attempts=settings.get('MAX_ATTEMPTS', 3),
+                   base_delay=settings.get('BASE_DELAY', 0.1),
+                   max_delay=settings.get('MAX_DELAY', 5.0),
+                   budget=RetryBudget(ratio=settings.get('BUDGET_RATIO', 0.1),
+                                      initial=settings.get('BUDGET_INITIAL', 10)))
+
+    def backoff(self, retry):
+        """seconds to wait before a retry.
+
+        Args:
+            retry ([int]): [number of the retry, from 1]
+
+        Returns:
+            [float]: [random delay up to base_delay * 2 ** (retry - 1)]
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+
+    def call(self, operation, func, *args, **kwargs):
+        """call func, retrying it following the rule of the operation.
+
+        Args:
+            operation ([string]): [Adapter operation name]
+            func ([callable]): [function doing the operation]
+
+        Returns:
+            [object]: [what the last attempt returned]
+        """
+        rule = self.rules.get(operation)
+        rewind = None
+        if callable(rule):
+            rewind = rule(args, kwargs)
+            if rewind is None:
+                return func(*args, **kwargs)
+        elif not rule:
+            return func(*args, **kwargs)
+        self.budget.deposit()
+        retry = 0
+        while True:
+            raised = False
+            try:
+                result, swallowed = instrumentation.capture_errors(func, *args, **kwargs)
+                error = swallowed[-1] if swallowed else None
+            except Exception as e:
+                result, error, raised = None, e, True
+            if error is None:
+                if retry:
+                    instrumentation.clear_error()
+                return result
+            retry += 1
+            if retry >= self.max_attempts or not is_transient(error) or not self.budget.withdraw():
+                if raised:
+                    raise error
+                # let an enclosing capture_errors see the error too.
+                instrumentation.record(error=error)
+                return result
+            delay = self.backoff(retry)
+            logging.warning("%s failed with %s, retry %d in %.2fs", operation,
+                            type(error).__name__, retry, delay)
+            instrumentation.record(retries=1)
+            self.sleep(delay)
+            if rewind is not None:
+                rewind()
+
+
+class Hedger(object):
+    """hedged requests for reads.
+
+    A read still running after the `quantile` latency of its operation is
+    sent a second time and the first successful response is kept; the
+    other one finishes in the background and is dropped. Only the bytes
+    and requests of the kept response are reported, the duplicates are
+    counted in the `hedges` of the operation event. Latencies are
+    learnt per operation, nothing is hedged before `min_samples` calls.
+    Ranged downloads hedge every byte range.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self, operations=DEFAULT_HEDGED_OPERATIONS, quantile=0.95, min_samples=20,
+                 min_delay=0.0, max_workers=32):
+        """__init__ function.
+
+        Args:
+            operations ([iterable], optional): [operations to hedge]. Defaults to DEFAULT_HEDGED_OPERATIONS.
+            quantile (float, optional): [latency quantile after which a request is hedged]. Defaults to 0.95.
+            min_samples (int, optional): [calls measured before hedging]. Defaults to 20.
+            min_delay (float, optional): [minimum seconds before hedging]. Defaults to 0.0.
+            max_workers (int, optional): [threads running the hedged requests]. Defaults to 32.
+        """
+        self.operations = frozenset(operations)
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='bucket-adapter-hedge')
+
+    @classmethod
+    def from_settings(cls, settings):
+        """build a hedger from the `HEDGE` settings dict.
+
+        Args:
+            settings ([dict]): [OPERATIONS, QUANTILE, MIN_SAMPLES, MIN_DELAY and MAX_WORKERS, all optional]
+
+        Returns:
+            [Hedger]: [the hedger]
+        """
+        return cls(operations=settings.get('OPERATIONS', DEFAULT_HEDGED_OPERATIONS),
+                   quantile=settings.get('QUANTILE', 0.95),
+                   min_samples=settings.get('MIN_SAMPLES', 20),
+                   min_delay=settings.get('MIN_DELAY', 0.0),
+                   max_workers=settings.get('MAX_WORKERS', 32))
+
+    def _histogram(self, name):
+        """latency histogram of a request kind.
+
+        Args:
+            name ([string]): [operation name, or 'range']
+
+        Returns:
+            [Histogram]: [the histogram]
+        """
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram())
+        return histogram
+
+    def delay(self, name):
+        """seconds after which a request is hedged.
+
+        Args:
+            name ([string]): [operation name, or 'range']
+
+        Returns:
+            [float]: [the delay, None while there are not enough samples]
+        """
+        histogram = self._histogram(name)
+        if histogram.count < self.min_samples:
+            return None
+        return max(self.min_delay, histogram.quantile(self.quantile))
+
+    def wrap(self, operation, func):
+        """hedge the requests of an adaptee method.
+
+        Args:
+            operation ([string]): [Adapter operation name]
+            func ([callable]): [adaptee method]
+
+        Returns:
+            [callable]: [func, hedged when the operation is]
+        """
+        if operation not in self.operations:
+            return func
+        if operation in RANGED_OPERATIONS:
+            return functools.partial(self._with_ranges, func)
+        return functools.partial(self.call, operation, func)
+
+    def _with_ranges(self, func, *args, **kwargs):
+        """call a download, hedging its byte ranges.
+
+        Args:
+            func ([callable]): [adaptee download method]
+
+        Returns:
+            [object]: [what func returns]
+        """
+        token = _current_hedger.set(self)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current_hedger.reset(token)
+
+    def _submit(self, name, func, args, kwargs):
+        """start a request on the hedging threads.
+
+        Args:
+            name ([string]): [operation name, or 'range']
+            func ([callable]): [function making the request]
+            args ([tuple]): [positional arguments]
+            kwargs ([dict]): [keyword arguments]
+
+        Returns:
+            [Future]: [future of (result, swallowed exceptions, isolated event)]
+        """
+        context = contextvars.copy_context()
+        histogram = self._histogram(name)
+        started = time.perf_counter()
+
+        def run():
+            (result, swallowed), event = context.run(
+                instrumentation.isolated, instrumentation.capture_errors, func, *args, **kwargs)
+            if not swallowed:
+                histogram.add(time.perf_counter() - started)
+            return result, swallowed, event
+        return self._executor.submit(run)
+
+    def call(self, name, func, *args, **kwargs):
+        """make a request, hedging it when it is slow.
+
+        Args:
+            name ([string]): [operation name, or 'range']
+            func ([callable]): [function making the request]
+
+        Returns:
+            [object]: [the first successful response]
+        """
+        delay = self.delay(name)
+        if delay is None:
+            started = time.perf_counter()
+            result, swallowed = instrumentation.capture_errors(func, *args, **kwargs)
+            for error in swallowed:
+                instrumentation.record(error=error)
+            if not swallowed:
+                self._histogram(name).add(time.perf_counter() - started)
+            return result
+        primary = self._submit(name, func, args, kwargs)
+        futures = [primary]
+        try:
+            outcome = primary.result(timeout=delay)
+        except concurrent.futures.TimeoutError:
+            with self._lock:
+                self.hedged += 1
+            instrumentation.record(hedges=1)
+            futures.append(self._submit(name, func, args, kwargs))
+            outcome = None
+            for future in concurrent.futures.as_completed(futures):
+                if future.exception() is None and not future.result()[1]:
+                    if future is not primary:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    outcome = future.result()
+                    instrumentation.clear_error()
+                    break
+            if outcome is None:
+                # both failed, report the first request.
+                outcome = primary.result()
+        result, swallowed, event = outcome
+        instrumentation.merge(event)
+        for error in swallowed:
+            instrumentation.record(error=error)
+        return result
+
+    def close(self):
+        """shut the hedging threads down, waiting for running requests."""
+        self._executor.shutdown(wait=True)
+
+
+def current_hedger():
+    """hedger of the running ranged download.
+
+    Returns:
+        [Hedger]: [the hedger, None when ranges are not hedged]
+    """
+    return _current_hedger.get()
@@ -0,0 +1,290 @@
+"""file object wrappers used to stream data to and from the buckets."""
+
+import io
+
+# Default chunk (and readahead buffer) size of streamed reads.
+DEFAULT_READ_CHUNKSIZE = 1024 * 1024
+
+
+class BufferReader(io.RawIOBase):
+    """seekable read only file object over a bytes-like object.
+
+    Reads copy straight from the caller's buffer into the SDK buffer, the
+    payload itself is never copied (io.BytesIO copies anything but bytes).
+
+    Args:
+        io ([type]): [raw io base class]
+    """
+
+    def __init__(self, data):
+        """__init__ function.
+
+        Args:
+            data ([bytes/bytearray/memoryview]): [payload]
+        """
+        super().__init__()
+        self._view = memoryview(data).cast('B')
+        self._position = 0
+
+    def __len__(self):
+        """size of the payload.
+
+        Returns:
+            [int]: [number of bytes]
+        """
+        return len(self._view)
+
+    def readable(self):
+        """buffer readers are readable."""
+        return True
+
+    def seekable(self):
+        """buffer readers are seekable."""
+        return True
+
+    def tell(self):
+        """position in the payload.
+
+        Returns:
+            [int]: [offset]
+        """
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """move in the payload.
+
+        Args:
+            offset ([int]): [offset]
+            whence ([int], optional): [io.SEEK_SET, io.SEEK_CUR or io.SEEK_END]. Defaults to io.SEEK_SET.
+
+        Returns:
+            [int]: [new position]
+        """
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = min(max(offset, 0), len(self._view))
+        return self._position
+
+    def readinto(self, buffer):
+        """copy the next bytes of the payload into a buffer.
+
+        Args:
+            buffer ([object]): [writable buffer]
+
+        Returns:
+            [int]: [number of bytes copied, 0 at the end]
+        """
+        with memoryview(buffer).cast('B') as target:
+            chunk = self._view[self._position:self._position + len(target)]
+            target[:len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+
+class IterReader(io.RawIOBase):
+    """forward only file object over an iterable of bytes-like chunks.
+
+    Only the chunk being read is held in memory.
+
+    Args:
+        io ([type]): [raw io base class]
+    """
+
+    def __init__(self, chunks):
+        """__init__ function.
+
+        Args:
+            chunks ([iterable]): [bytes-like chunks, e.g. a generator]
+        """
+        super().__init__()
+        self._chunks = iter(chunks)
+        self._chunk = memoryview(b'')
+        self._position = 0
+
+    def readable(self):
+        """iterator readers are readable."""
+        return True
+
+    def tell(self):
+        """number of bytes read so far.
+
+        Returns:
+            [int]: [offset]
+        """
+        return self._position
+
+    def readinto(self, buffer):
+        """copy the next bytes of the stream into a buffer.
+
+        Args:
+            buffer ([object]): [writable buffer]
+
+        Returns:
+            [int]: [number of bytes copied, 0 at the end]
+        """
+        while not self._chunk:
+            try:
+                self._chunk = memoryview(next(self._chunks)).cast('B')
+            except StopIteration:
+                return 0
+        with memoryview(buffer).cast('B') as target:
+            size = min(len(target), len(self._chunk))
+            target[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        self._position += size
+        return size
+
+
+class RangeReader(io.RawIOBase):
+    """seekable read only file object over a remote object.
+
+    Every read is a byte range request made through `fetch`, wrap it in a
+    BlobReader to read ahead in chunks.
+
+    Args:
+        io ([type]): [raw io base class]
+    """
+
+    def __init__(self, fetch, size):
+        """__init__ function.
+
+        Args:
+            fetch ([callable]): [fetch(start, end) returning the bytes of a range, end excluded]
+            size ([int]): [object size]
+        """
+        super().__init__()
+        self._fetch = fetch
+        self._size = size
+        self._position = 0
+
+    def __len__(self):
+        """size of the object.
+
+        Returns:
+            [int]: [number of bytes]
+        """
+        return self._size
+
+    def readable(self):
+        """range readers are readable."""
+        return True
+
+    def seekable(self):
+        """range readers are seekable."""
+        return True
+
+    def tell(self):
+        """position in the object.
+
+        Returns:
+            [int]: [offset]
+        """
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """move in the object, no request is made.
+
+        Args:
+            offset ([int]): [offset]
+            whence ([int], optional): [io.SEEK_SET, io.SEEK_CUR or io.SEEK_END]. Defaults to io.SEEK_SET.
+
+        Returns:
+            [int]: [new position]
+        """
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = min(max(offset, 0), self._size)
+        return self._position
+
+    def readinto(self, buffer):
+        """fetch the next bytes of the object into a buffer.
+
+        Args:
+            buffer ([object]): [writable buffer]
+
+        Returns:
+            [int]: [number of bytes read, 0 at the end]
+        """
+        with memoryview(buffer).cast('B') as target:
+            end = min(self._position + len(target), self._size)
+            if end <= self._position:
+                return 0
+            data = self._fetch(self._position, end)
+            target[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def readall(self):
+        """fetch the rest of the object with a single request.
+
+        Returns:
+            [bytes]: [remaining content]
+        """
+        if self._position >= self._size:
+            return b''
+        data = self._fetch(self._position, self._size)
+        self._position += len(data)
+        return data
+
+
+class BlobReader(io.BufferedReader):
+    """buffered reader over a remote object, iterating in chunks.
+
+    Reads smaller than `chunk_size` are served from a readahead buffer
+    filled by one range request, iterating yields `chunk_size` blocks
+    instead of lines, which fits Django's StreamingHttpResponse.
+
+    Args:
+        io ([type]): [buffered reader class]
+    """
+
+    def __init__(self, raw, chunk_size=DEFAULT_READ_CHUNKSIZE):
+        """__init__ function.
+
+        Args:
+            raw ([RangeReader]): [unbuffered reader]
+            chunk_size ([int], optional): [readahead and iteration chunk size]. Defaults to DEFAULT_READ_CHUNKSIZE.
+        """
+        super().__init__(raw, buffer_size=chunk_size)
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        """iterate over the remaining chunks.
+
+        Returns:
+            [BlobReader]: [self]
+        """
+        return self
+
+    def __next__(self):
+        """read the next chunk.
+
+        Returns:
+            [bytes]: [up to chunk_size bytes]
+        """
+        chunk = self.read(self.chunk_size)
+        if not chunk:
+            raise StopIteration
+        return chunk
+
+
+def as_fileobj(data):
+    """wrap a payload in a file object the SDKs can stream from.
+
+    Args:
+        data ([object]): [file object, bytes-like object or iterable of bytes-like chunks]
+
+    Returns:
+        [tuple]: [file object and its size in bytes (None when unknown)]
+    """
+    if hasattr(data, 'read'):
+        size = getattr(data, 'size', None)
+        return data, size if isinstance(size, int) else None
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        reader = BufferReader(data)
+        return reader, len(reader)
+    return io.BufferedReader(IterReader(data)), None
@@ -0,0 +1,181 @@
+"""incremental directory synchronisation helpers."""
+
+import base64
+import collections
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from . import checksums
+
+SyncResult = collections.namedtuple('SyncResult', ['transferred', 'skipped'])
+SyncResult.__doc__ = """outcome of a directory sync.
+
+Args:
+    transferred ([list]): [a BulkResult per file uploaded or downloaded]
+    skipped ([list]): [names of the files already up to date]
+"""
+
+LocalFile = collections.namedtuple('LocalFile', ['path', 'size', 'mtime'])
+LocalFile.__doc__ = """file of a local tree.
+
+Args:
+    path ([string]): [path of the file]
+    size ([int]): [size in bytes]
+    mtime ([float]): [modification time, seconds since the epoch]
+"""
+
+
+def join_key(prefix, name):
+    """object name of a file of a synced tree.
+
+    Args:
+        prefix ([string]): [prefix of the tree in the bucket, '' for the root]
+        name ([string]): [path relative to the tree, '/' separated]
+
+    Returns:
+        [string]: [object name]
+    """
+    if prefix and not prefix.endswith('/'):
+        prefix += '/'
+    return (prefix or '') + name
+
+
+def walk_local(local_dir):
+    """list the files of a local tree.
+
+    Args:
+        local_dir ([string]): [root of the tree]
+
+    Returns:
+        [dict]: [LocalFile by path relative to the root, '/' separated]
+    """
+    files = {}
+    for root, _, names in os.walk(local_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            relative = os.path.relpath(path, local_dir).replace(os.sep, '/')
+            files[relative] = LocalFile(path, stat.st_size, stat.st_mtime)
+    return files
+
+
+def remote_digest(blob):
+    """content digest advertised by an object.
+
+    The GCS md5_hash, else its crc32c (composite objects have no md5),
+    else the S3 ETag of a single part upload. Multipart ETags and the
+    ETags of objects encrypted with KMS keys are not digests of the
+    content, those objects compare by size and time only (a KMS ETag
+    just never matches, the file is transferred again).
+
+    Args:
+        blob ([CustomBlob]): [listed object]
+
+    Returns:
+        [tuple]: [algorithm and digest, None when the object advertises none]
+    """
+    if blob.md5_hash:
+        return 'md5', base64.b64decode(blob.md5_hash)
+    if blob.crc32c and checksums.google_crc32c is not None:
+        return 'crc32c', base64.b64decode(blob.crc32c)
+    etag = (blob.etag or '').strip('"')
+    if blob.generation is None and len(etag) == 32:
+        try:
+            return 'md5', bytes.fromhex(etag)
+        except ValueError:
+            return None
+    return None
+
+
+def _hash_file(path, algorithm):
+    """digest of a file, run in the hashing processes.
+
+    Args:
+        path ([string]): [path of the file]
+        algorithm ([string]): [algorithm name]
+
+    Returns:
+        [bytes]: [digest]
+    """
+    with open(path, 'rb') as fileobj:
+        return checksums.digest_file(fileobj, [algorithm])[algorithm]
+
+
+def hash_files(jobs, max_workers=None):
+    """hash local files in parallel processes.
+
+    Args:
+        jobs ([list]): [(path, algorithm) pairs]
+        max_workers ([int], optional): [number of processes]. Defaults to the number of CPUs.
+
+    Returns:
+        [list]: [digest of every job, in order]
+    """
+    if not jobs:
+        return []
+    paths, algorithms = zip(*jobs)
+    if len(jobs) == 1 or max_workers == 1:
+        return list(map(_hash_file, paths, algorithms))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        chunksize = max(1, len(jobs) // ((max_workers or os.cpu_count() or 1) * 4))
+        return list(executor.map(_hash_file, paths, algorithms, chunksize=chunksize))
+
+
+def _timestamp(value):
+    """seconds since the epoch of a listed time.
+
+    Args:
+        value ([object]): [datetime or None]
+
+    Returns:
+        [float]: [timestamp, None when unknown]
+    """
+    return value.timestamp() if value is not None else None
+
+
+def plan(local_files, remote_blobs, upload, checksum=True, hash_workers=None):
+    """find the files that differ between a local tree and a prefix.
+
+    A file missing on the destination side or with another size is
+    transferred. Otherwise files are compared by digest when the object
+    advertises one and `checksum` is set, else the source must be newer
+    than the destination.
+
+    Args:
+        local_files ([dict]): [LocalFile by relative name, see `walk_local`]
+        remote_blobs ([dict]): [CustomBlob by relative name]
+        upload ([bool]): [True when the local tree is the source]
+        checksum (bool, optional): [compare digests when available]. Defaults to True.
+        hash_workers ([int], optional): [number of hashing processes]. Defaults to the number of CPUs.
+
+    Returns:
+        [tuple]: [relative names to transfer and names already up to date]
+    """
+    sources = local_files if upload else remote_blobs
+    changed, skipped, to_hash = [], [], []
+    for name in sorted(sources):
+        local, blob = local_files.get(name), remote_blobs.get(name)
+        if local is None or blob is None or local.size != blob.size:
+            changed.append(name)
+            continue
+        digest = remote_digest(blob) if checksum else None
+        if digest is not None:
+            to_hash.append((name, digest))
+            continue
+        remote_time = _timestamp(blob.time_created)
+        if remote_time is None:
+            changed.append(name)
+        elif upload and local.mtime > remote_time:
+            changed.append(name)
+        elif not upload and remote_time > local.mtime:
+            changed.append(name)
+        else:
+            skipped.append(name)
+    digests = hash_files([(local_files[name].path, algorithm) for name, (algorithm, _) in to_hash],
+                         max_workers=hash_workers)
+    for (name, (_, expected)), actual in zip(to_hash, digests):
+        (skipped if actual == expected else changed).append(name)
+    return changed, skipped
@@ -0,0 +1,333 @@
+"""large object transfer helpers shared by the adaptees."""
+
+import functools
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import checksums, instrumentation, retry
+
+# Size of the parts of a multipart/composite upload.
+DEFAULT_MULTIPART_CHUNKSIZE = 64 * 1024 * 1024
+# Number of parts transferred at the same time.
+DEFAULT_MULTIPART_CONCURRENCY = 8
+# Size of the byte ranges of a ranged download.
+DEFAULT_RANGED_DOWNLOAD_CHUNKSIZE = 16 * 1024 * 1024
+
+
+def multipart_settings(options):
+    """large object upload settings.
+
+    Args:
+        options ([dict]): [options dict contains all the configuration settings]
+
+    Returns:
+        [tuple]: [threshold in bytes (None when disabled), part size and concurrency]
+    """
+    return (options.get('MULTIPART_THRESHOLD'),
+            options.get('MULTIPART_CHUNKSIZE', DEFAULT_MULTIPART_CHUNKSIZE),
+            options.get('MULTIPART_CONCURRENCY', DEFAULT_MULTIPART_CONCURRENCY))
+
+
+def ranged_download_settings(options):
+    """ranged download settings.
+
+    Args:
+        options ([dict]): [options dict contains all the configuration settings]
+
+    Returns:
+        [tuple]: [threshold in bytes (None when disabled), range size and maximum ranges in flight]
+    """
+    return (options.get('RANGED_DOWNLOAD_THRESHOLD'),
+            options.get('RANGED_DOWNLOAD_CHUNKSIZE', DEFAULT_RANGED_DOWNLOAD_CHUNKSIZE),
+            options.get('RANGED_DOWNLOAD_CONCURRENCY', DEFAULT_MULTIPART_CONCURRENCY))
+
+
+def split_ranges(size, chunksize):
+    """split an object in byte ranges.
+
+    Args:
+        size ([int]): [object size in bytes]
+        chunksize ([int]): [size of every range but the last one]
+
+    Returns:
+        [list]: [(start, end) tuples, end excluded]
+    """
+    return [(start, min(start + chunksize, size))
+            for start in range(0, size, chunksize)]
+
+
+def log_throughput(operation, name, size, elapsed):
+    """log the throughput of a transfer.
+
+    Args:
+        operation ([string]): [name of the operation]
+        name ([string]): [name of the object transferred]
+        size ([int]): [bytes transferred]
+        elapsed ([float]): [seconds it took]
+    """
+    logging.info("%s %s: %d bytes in %.2fs (%.2f MiB/s)", operation, name, size,
+                 elapsed, size / max(elapsed, 1e-9) / (1024 * 1024))
+
+
+def _fileno(fileobj):
+    """file descriptor usable with os.pwrite.
+
+    Args:
+        fileobj ([object]): [file object]
+
+    Returns:
+        [int]: [file descriptor, None when the file has none or pwrite is missing]
+    """
+    if not hasattr(os, 'pwrite'):
+        return None
+    try:
+        return fileobj.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+def position(fileobj):
+    """current position of a file object.
+
+    Args:
+        fileobj ([object]): [file object]
+
+    Returns:
+        [int]: [position, None when the file object cannot tell]
+    """
+    try:
+        return fileobj.tell()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+def seekable(fileobj):
+    """whether data can be written at any offset of a file object.
+
+    Args:
+        fileobj ([object]): [file object]
+
+    Returns:
+        [bool]: [False for pipes, sockets and streams without seekable()]
+    """
+    try:
+        return fileobj.seekable()
+    except (AttributeError, OSError, ValueError):
+        return False
+
+
+def download_ranges(fetch, size, fileobj, chunksize, concurrency, hasher=None):
+    """download an object as concurrent byte ranges into a file object.
+
+    The destination is preallocated, then `concurrency` threads fetch
+    `chunksize` ranges and write them at their offset (with os.pwrite when
+    the file has a descriptor), so at most `concurrency` ranges are held
+    in memory. Data is written from the current position of fileobj, which
+    is left at the end of the object. Ranges are hedged when the download
+    runs under a `retry.Hedger`, and hashed by the thread fetching them
+    when a hasher is given.
+
+    Args:
+        fetch ([callable]): [fetch(start, end) returning the bytes of a range, end excluded]
+        size ([int]): [object size]
+        fileobj ([object]): [writable and seekable destination]
+        chunksize ([int]): [range size]
+        concurrency ([int]): [maximum ranges in flight]
+        hasher ([StreamHasher], optional): [hasher of the object data]. Defaults to None.
+    """
+    hedger = retry.current_hedger()
+    if hedger is not None:
+        fetch = functools.partial(hedger.call, 'range', fetch)
+    base = fileobj.tell()
+    fileobj.truncate(base + size)
+    fileobj.flush()
+    fd = _fileno(fileobj)
+    lock = threading.Lock()
+
+    def download_range(start, end):
+        data = fetch(start, end)
+        if hasher is not None:
+            hasher.update(start, data)
+        data = memoryview(data)
+        if fd is None:
+            with lock:
+                fileobj.seek(base + start)
+                fileobj.write(data)
+            return
+        offset = base + start
+        while data:
+            written = os.pwrite(fd, data, offset)
+            data = data[written:]
+            offset += written
+
+    ranges = split_ranges(size, chunksize)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in executor.map(instrumentation.bind(download_range), *zip(*ranges)):
+            pass
+    fileobj.seek(base + size)
+
+
+def verify_download(name, fileobj, start, expected, hasher=None):
+    """check downloaded data against the object checksums.
+
+    The digests streamed by `hasher` are used when they cover one of the
+    expected algorithms and match. Otherwise (or to confirm a mismatch)
+    the data is read back from `start`; files opened write only are
+    opened again by name, verification is skipped for anything else.
+
+    Args:
+        name ([string]): [object name]
+        fileobj ([object]): [file object the data was written to]
+        start ([int]): [position the data starts at, None when unknown]
+        expected ([dict]): [digests of the object by algorithm]
+        hasher ([StreamHasher], optional): [hasher fed with the data while it was written]. Defaults to None.
+
+    Raises:
+        ChecksumMismatchError: [when the data does not match]
+
+    Returns:
+        [dict]: [digests of the data by algorithm, empty when not verified]
+    """
+    streamed = hasher.digests() if hasher is not None else {}
+    if not expected:
+        return streamed
+    compared = [algorithm for algorithm in expected if algorithm in streamed]
+    if compared and all(streamed[algorithm] == expected[algorithm] for algorithm in compared):
+        return streamed
+    fileobj.flush()
+    if start is None:
+        reader = None
+    elif fileobj.readable():
+        reader, close = fileobj, False
+    elif isinstance(getattr(fileobj, 'name', None), str):
+        reader, close = open(fileobj.name, 'rb'), True
+    else:
+        reader = None
+    if reader is None:
+        logging.warning("cannot read back %s, checksum not verified", name)
+        return {}
+    try:
+        position = reader.tell() if not close else None
+        reader.seek(start)
+        actual = checksums.digest_file(reader, expected)
+        if position is not None:
+            reader.seek(position)
+    finally:
+        if close:
+            reader.close()
+    checksums.verify(name, expected, actual)
+    return actual
+
+
+class PartReader(io.RawIOBase):
+    """read only file object over a byte range of a local file.
+
+    Lets the SDKs stream one part of a large file (and seek back to retry it)
+    without loading the part in memory. The data read is hashed at its
+    offset in the file by the given hashers.
+
+    Args:
+        io ([type]): [raw io base class]
+    """
+
+    def __init__(self, filename, start, end, hashers=()):
+        """__init__ function.
+
+        Args:
+            filename ([string]): [local file]
+            start ([int]): [first byte of the part]
+            end ([int]): [end of the part, excluded]
+            hashers ([tuple], optional): [StreamHashers fed with the data read]. Defaults to ().
+        """
+        super().__init__()
+        self._file = open(filename, 'rb')
+        self._start = start
+        self._size = end - start
+        self._position = 0
+        self._hashers = tuple(hasher for hasher in hashers if hasher is not None)
+
+    def __len__(self):
+        """size of the part.
+
+        Returns:
+            [int]: [number of bytes]
+        """
+        return self._size
+
+    def readable(self):
+        """part readers are readable."""
+        return True
+
+    def seekable(self):
+        """part readers are seekable."""
+        return True
+
+    def tell(self):
+        """position in the part.
+
+        Returns:
+            [int]: [offset from the start of the part]
+        """
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """move in the part.
+
+        Args:
+            offset ([int]): [offset]
+            whence ([int], optional): [io.SEEK_SET, io.SEEK_CUR or io.SEEK_END]. Defaults to io.SEEK_SET.
+
+        Returns:
+            [int]: [new position]
+        """
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = min(max(offset, 0), self._size)
+        return self._position
+
+    def readinto(self, buffer):
+        """read the part into a buffer.
+
+        Args:
+            buffer ([object]): [writable buffer]
+
+        Returns:
+            [int]: [number of bytes read, 0 at the end of the part]
+        """
+        size = min(len(buffer), self._size - self._position)
+        if size <= 0:
+            return 0
+        with memoryview(buffer) as view:
+            self._file.seek(self._start + self._position)
+            read = self._file.readinto(view[:size])
+            if self._hashers and read:
+                data = view[:read].tobytes()
+                for hasher in self._hashers:
+                    hasher.update(self._start + self._position, data)
+        self._position += read
+        return read
+
+    def close(self):
+        """close the underlying file."""
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+def hash_part(filename, start, end, hashers):
+    """hash a part of a local file, e.g. one an earlier attempt uploaded.
+
+    Args:
+        filename ([string]): [local file]
+        start ([int]): [first byte of the part]
+        end ([int]): [end of the part, excluded]
+        hashers ([tuple]): [StreamHashers fed with the part]
+    """
+    with PartReader(filename, start, end, hashers) as part:
+        while part.read(checksums.HASH_BLOCKSIZE):
+            pass
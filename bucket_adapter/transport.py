@@ -0,0 +1,207 @@
+"""HTTP transport settings and connection pool monitoring."""
+
+import collections
+import socket
+import threading
+import time
+
+from .bulk import DEFAULT_MAX_WORKERS
+from .instrumentation import Histogram, record
+from .transfer import DEFAULT_MULTIPART_CONCURRENCY
+
+# Connections per pool of both SDKs.
+DEFAULT_POOL_SIZE = 10
+
+TransportSettings = collections.namedtuple(
+    'TransportSettings', ['pool_size', 'connect_timeout', 'read_timeout', 'keepalive', 'tcp_keepalive'])
+TransportSettings.__doc__ = """HTTP transport of a backend.
+
+Args:
+    pool_size ([int]): [connections kept per host]
+    connect_timeout ([float]): [seconds to open a connection, None for the SDK default]
+    read_timeout ([float]): [seconds to wait for data, None for the SDK default]
+    keepalive ([bool]): [reuse connections across requests]
+    tcp_keepalive ([bool]): [enable TCP keepalive probes on the sockets]
+"""
+
+
+def transport_settings(options):
+    """transport settings from the `TRANSPORT` settings dict.
+
+    The pool size defaults to the largest number of threads the adapter
+    is configured to run, so they do not queue for connections.
+
+    Args:
+        options ([dict]): [options dict contains all the configuration settings]
+
+    Returns:
+        [TransportSettings]: [the settings, None when `TRANSPORT` is not set]
+    """
+    transport = options.get('TRANSPORT')
+    if transport is None:
+        return None
+    pool_size = transport.get('POOL_SIZE')
+    if pool_size is None:
+        pool_size = max(DEFAULT_POOL_SIZE,
+                        options.get('MAX_WORKERS', DEFAULT_MAX_WORKERS),
+                        options.get('MAX_CONCURRENCY', DEFAULT_POOL_SIZE),
+                        options.get('MULTIPART_CONCURRENCY', DEFAULT_MULTIPART_CONCURRENCY),
+                        options.get('RANGED_DOWNLOAD_CONCURRENCY', DEFAULT_MULTIPART_CONCURRENCY))
+    return TransportSettings(pool_size, transport.get('CONNECT_TIMEOUT'), transport.get('READ_TIMEOUT'),
+                             transport.get('KEEPALIVE', True), transport.get('TCP_KEEPALIVE', False))
+
+
+def socket_options(settings):
+    """urllib3 socket options of a transport.
+
+    Args:
+        settings ([TransportSettings]): [transport settings]
+
+    Returns:
+        [list]: [socket options, None for the urllib3 defaults]
+    """
+    if not settings.tcp_keepalive:
+        return None
+    from urllib3.connection import HTTPConnection
+
+    return HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+
+
+class _MonitoredPool(object):
+    """urllib3 connection pool reporting to a PoolMonitor.
+
+    Mixed in the pool classes of a PoolManager by `PoolMonitor.install`.
+    Connections are taken with `_get_conn` and given back with `_put_conn`
+    by every urllib3 release, including streamed responses.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    monitor = None
+
+    def __init__(self, *args, **kwargs):
+        """__init__ function."""
+        super().__init__(*args, **kwargs)
+        self.monitor._opened(self.pool.maxsize)
+
+    def _new_conn(self):
+        """create a connection, counted."""
+        self.monitor._created()
+        return super()._new_conn()
+
+    def _get_conn(self, timeout=None):
+        """take a connection, timing the wait."""
+        started = time.perf_counter()
+        conn = super()._get_conn(timeout)
+        self.monitor._checked_out(time.perf_counter() - started)
+        return conn
+
+    def _put_conn(self, conn):
+        """give a connection back, counting those a full pool drops."""
+        pool = self.pool
+        self.monitor._checked_in(conn is not None and (pool is None or pool.full()))
+        return super()._put_conn(conn)
+
+    def close(self):
+        """close the pool."""
+        if self.pool is not None:
+            self.monitor._closed(self.pool.maxsize)
+        super().close()
+
+
+class PoolMonitor(object):
+    """utilisation and wait time of the HTTP connection pools of a backend.
+
+    `in_use` close to `size`, or connections being `discarded` because
+    they came back to a full pool, mean more threads than connections:
+    raise `POOL_SIZE` or lower the worker counts. The time spent taking a
+    connection is also added to the `pool_wait` of the running operation.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self):
+        """__init__ function."""
+        self.size = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.checkouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.wait = Histogram(minimum=1e-6)
+        self._lock = threading.Lock()
+        self._classes = {}
+
+    def _pool_class(self, pool_class):
+        """monitored subclass of a pool class.
+
+        Args:
+            pool_class ([type]): [urllib3 connection pool class]
+
+        Returns:
+            [type]: [subclass reporting to this monitor]
+        """
+        with self._lock:
+            monitored = self._classes.get(pool_class)
+            if monitored is None:
+                monitored = self._classes[pool_class] = type(
+                    'Monitored' + pool_class.__name__, (_MonitoredPool, pool_class), {'monitor': self})
+            return monitored
+
+    def install(self, manager):
+        """monitor the pools a urllib3 PoolManager creates from now on.
+
+        Args:
+            manager ([object]): [urllib3 PoolManager]
+        """
+        manager.pool_classes_by_scheme = {
+            scheme: self._pool_class(pool_class)
+            for scheme, pool_class in manager.pool_classes_by_scheme.items()}
+
+    def _opened(self, maxsize):
+        """count the connections of a new pool."""
+        with self._lock:
+            self.size += maxsize
+
+    def _closed(self, maxsize):
+        """forget the connections of a closed pool."""
+        with self._lock:
+            self.size -= maxsize
+
+    def _created(self):
+        """count a new connection."""
+        with self._lock:
+            self.created += 1
+
+    def _checked_out(self, waited):
+        """count a connection taken after waiting `waited` seconds."""
+        self.wait.add(waited)
+        record(pool_wait=waited)
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def _checked_in(self, discarded):
+        """count a connection given back, `discarded` when the pool was full."""
+        with self._lock:
+            self.in_use -= 1
+            if discarded:
+                self.discarded += 1
+
+    def stats(self):
+        """pool statistics.
+
+        Returns:
+            [dict]: [size, in_use, peak_in_use, utilisation, checkouts, created, discarded and p50/p99 wait seconds]
+        """
+        with self._lock:
+            stats = {'size': self.size, 'in_use': self.in_use, 'peak_in_use': self.peak_in_use,
+                     'utilisation': self.in_use / self.size if self.size else 0.0,
+                     'checkouts': self.checkouts, 'created': self.created,
+                     'discarded': self.discarded}
+        stats['wait_p50'] = self.wait.quantile(0.5)
+        stats['wait_p99'] = self.wait.quantile(0.99)
+        return stats
@@ -0,0 +1,44 @@
+"""shared fixtures, the tests run offline against the in-process adaptees."""
+
+import uuid
+
+import pytest
+
+from bucket_adapter.adapter import Adapter
+
+MEMORY = 'bucket_adapter.local.adapter.Memory'
+
+
+@pytest.fixture
+def settings():
+    """settings of a Memory bucket of its own.
+
+    Returns:
+        [dict]: [settings, to complete before building the adapter]
+    """
+    return {'NAME': MEMORY, 'BUCKET_NAME': 'test-{}'.format(uuid.uuid4().hex)}
+
+
+@pytest.fixture
+def adapter(settings):
+    """adapter of a fresh Memory bucket.
+
+    Returns:
+        [Adapter]: [the adapter]
+    """
+    return Adapter(settings)
+
+
+@pytest.fixture
+def local_file(tmp_path):
+    """factory of local files.
+
+    Returns:
+        [callable]: [func(name, data) writing a file and returning its path]
+    """
+    def write(name, data):
+        path = tmp_path / name
+        path.write_bytes(data)
+        return str(path)
+
+    return write
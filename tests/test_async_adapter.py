@@ -0,0 +1,147 @@
+"""AsyncAdapter: lazy authentication, bounded map and non blocking shutdown."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from bucket_adapter.adapter import Adapter
+from bucket_adapter.async_adapter import AsyncAdapter
+
+
+def test_adapter_is_built_on_a_worker_thread(settings, monkeypatch):
+    """creating the AsyncAdapter does not authenticate, the first call does it off the loop."""
+    threads = []
+    original = Adapter.__init__
+
+    def init(self, *args, **kwargs):
+        threads.append(threading.current_thread())
+        original(self, *args, **kwargs)
+
+    async def main():
+        async with AsyncAdapter(settings) as async_adapter:
+            assert not threads
+            await async_adapter.upload_stream(b'data', 'key')
+            assert await async_adapter.read_range('key', 0, 4) == b'data'
+
+    monkeypatch.setattr(Adapter, '__init__', init)
+    asyncio.run(main())
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_map_is_bounded_and_ordered(adapter):
+    """map keeps results in input order and pulls items only as calls end."""
+    finished = []
+    ahead = []
+
+    def call(value):
+        time.sleep(0.001 * (value % 3))
+        finished.append(value)
+        if value == 7:
+            raise ValueError(value)
+        return value * 2
+
+    adapter.echo = call
+
+    def items():
+        for index in range(50):
+            ahead.append(index - len(finished))
+            yield index
+
+    async def main():
+        async with AsyncAdapter(None, max_concurrency=2, adapter=adapter) as async_adapter:
+            return await async_adapter.map('echo', items(), max_pending=4)
+
+    results = asyncio.run(main())
+    assert results[:7] == [0, 2, 4, 6, 8, 10, 12]
+    assert isinstance(results[7], ValueError)
+    assert results[8:] == [value * 2 for value in range(8, 50)]
+    assert max(ahead) <= 4
+
+
+def test_map_raises_without_return_exceptions(adapter):
+    """the first exception is raised and the calls not started are dropped."""
+    def call(value):
+        if value == 0:
+            raise ValueError(value)
+        time.sleep(0.01)
+        return value
+
+    adapter.echo = call
+
+    async def main():
+        async with AsyncAdapter(None, max_concurrency=1, adapter=adapter) as async_adapter:
+            await async_adapter.map('echo', range(20), return_exceptions=False)
+
+    with pytest.raises(ValueError):
+        asyncio.run(main())
+
+
+def test_close_does_not_block_the_loop(adapter):
+    """the event loop keeps running while the shutdown waits for a call."""
+    adapter.slow = lambda: time.sleep(0.3)
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(1)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        async_adapter = AsyncAdapter(None, adapter=adapter)
+        call = asyncio.ensure_future(async_adapter._run('slow'))
+        await asyncio.sleep(0.05)
+        task = asyncio.ensure_future(ticker())
+        await async_adapter.aclose()
+        task.cancel()
+        await call
+
+    asyncio.run(main())
+    assert len(ticks) > 5
+
+
+def test_list_and_delete_many(adapter):
+    """async listing and batch deletes go through the worker threads."""
+    for name in ('a', 'b', 'c'):
+        adapter.upload_stream(b'x', name)
+
+    async def main():
+        async with AsyncAdapter(None, adapter=adapter) as async_adapter:
+            names = [blob.name async for blob in async_adapter.list_blobs()]
+            deleted = [result.item async for result in async_adapter.delete_many(names)]
+            left = [blob.name async for blob in async_adapter.list_blobs()]
+        return names, deleted, left
+
+    assert asyncio.run(main()) == (['a', 'b', 'c'], ['a', 'b', 'c'], [])
+
+
+def test_delete_many_keeps_to_max_concurrency(adapter, monkeypatch):
+    """the batches of a bulk delete are sent by at most max_concurrency threads."""
+    names = ['file-{}'.format(index) for index in range(12)]
+    for name in names:
+        adapter.upload_stream(b'x', name)
+    monkeypatch.setattr(adapter.adaptee_obj, 'DELETE_BATCH_SIZE', 1)
+    delete_batch = adapter.adaptee_obj.delete_batch
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def counted(*args, **kwargs):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        try:
+            return delete_batch(*args, **kwargs)
+        finally:
+            with lock:
+                running[0] -= 1
+
+    monkeypatch.setattr(adapter.adaptee_obj, 'delete_batch', counted)
+
+    async def main():
+        async with AsyncAdapter(None, max_concurrency=2, adapter=adapter) as async_adapter:
+            return [result.item async for result in async_adapter.delete_many(names, max_workers=8)]
+
+    assert asyncio.run(main()) == names
+    assert 1 < peak[0] <= 2
@@ -0,0 +1,51 @@
+"""the SigV4 batch signer of `AWS.generate_signed_urls` against botocore."""
+
+import pytest
+
+from bucket_adapter.adapter import Adapter
+
+moto = pytest.importorskip('moto')
+
+# Keys quoted differently by the various url encodings.
+KEYS = ['plain.txt', 'dir/sub/file.csv', 'with space.txt', 'plus+sign', 'tilde~x',
+        'ünïcödé/日本.txt', 'emoji😀', 'a%20b', 'semi;colon', 'quote\'"', 'hash#frag',
+        'q?mark', 'amp&eq=', '//double//slash', '/leading', 'trailing/', 'star*paren()',
+        'comma,at@', 'dollar$', '[brackets]', 'back\\slash', 'dot/./x', 'dot/../y', 'a:b|c^d`e']
+
+
+@pytest.fixture(params=[None, 'http://127.0.0.1:9000'], ids=['aws', 'endpoint'])
+def s3_adapter(request):
+    """AWS adapter on a moto backend, with and without a custom endpoint.
+
+    Returns:
+        [Adapter]: [the adapter]
+    """
+    credentials = {'region_name': 'eu-west-1', 'aws_access_key_id': 'key',
+                   'aws_secret_access_key': 'secret'}
+    if request.param:
+        credentials['endpoint_url'] = request.param
+    with moto.mock_aws():
+        yield Adapter({'NAME': 'bucket_adapter.aws.adapter.AWS', 'BUCKET_NAME': 'bucket',
+                       'CREDENTIALS': credentials})
+
+
+def botocore_url(adapter, key):
+    """url of a key presigned by botocore.
+
+    Returns:
+        [string]: [the url]
+    """
+    return adapter.authenticate.generate_presigned_url(
+        'get_object', Params={'Bucket': 'bucket', 'Key': key}, ExpiresIn=3600)
+
+
+@pytest.mark.parametrize('first', ['first.txt', 'ünï code/+~ x.txt'])
+def test_batch_urls_match_botocore(s3_adapter, first):
+    """every url of a batch is the one botocore would sign."""
+    for _ in range(3):
+        urls = s3_adapter.generate_signed_urls([first] + KEYS)
+        expected = {key: botocore_url(s3_adapter, key) for key in KEYS}
+        # retried when the second changed between the two signings.
+        if urls[first].split('X-Amz-Date=')[1][:16] == expected[KEYS[-1]].split('X-Amz-Date=')[1][:16]:
+            break
+    assert {key: urls[key] for key in KEYS} == expected
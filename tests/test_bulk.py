@@ -0,0 +1,83 @@
+"""bulk operations: input order, per item errors and bounded memory."""
+
+import threading
+import time
+
+from bucket_adapter.bulk import run_bounded
+
+
+def test_results_keep_input_order():
+    """results come back in input order, whatever order the calls end in."""
+    def call(delay, value):
+        time.sleep(delay)
+        return value
+
+    items = [(0.02 * (5 - index), index) for index in range(6)]
+    results = list(run_bounded(call, items, max_workers=6))
+    assert [result.item for result in results] == items
+    assert [result.result for result in results] == list(range(6))
+
+
+def test_errors_stay_with_their_item():
+    """an exception is reported for its item only, the others succeed."""
+    def call(value):
+        if value == 2:
+            raise ValueError(value)
+        return value * 10
+
+    results = list(run_bounded(call, range(5), max_workers=2))
+    assert [result.result for result in results] == [0, 10, None, 30, 40]
+    assert isinstance(results[2].error, ValueError)
+    assert all(result.error is None for index, result in enumerate(results) if index != 2)
+
+
+def test_items_are_pulled_lazily():
+    """no more than max_pending items are pulled ahead of the results."""
+    pulled = []
+    lock = threading.Lock()
+
+    def items():
+        for index in range(1000):
+            with lock:
+                pulled.append(index)
+            yield index
+
+    for count, result in enumerate(run_bounded(lambda value: value, items(), max_workers=2,
+                                               max_pending=4), 1):
+        assert len(pulled) - count < 4
+        assert result.result == count - 1
+
+
+def test_stopping_early_cancels_the_queued_calls():
+    """closing the generator drops the calls that did not start."""
+    calls = []
+    results = run_bounded(calls.append, range(100), max_workers=1, max_pending=10)
+    next(results)
+    results.close()
+    assert len(calls) <= 10
+
+
+def test_upload_many(adapter, local_file):
+    """every file is uploaded, a missing one fails on its own."""
+    items = [{'filename': local_file('a.txt', b'a'), 'bucket_filename': 'a.txt'},
+             {'filename': '/nonexistent/b.txt', 'bucket_filename': 'b.txt'},
+             {'filename': local_file('c.txt', b'c'), 'bucket_filename': 'c.txt'}]
+    results = list(adapter.upload_many(items, max_workers=3))
+    assert [result.item for result in results] == items
+    assert results[0].error is None and results[2].error is None
+    assert isinstance(results[1].error, FileNotFoundError)
+    assert adapter.read_range('a.txt', 0, 1) == b'a'
+    assert adapter.read_range('c.txt', 0, 1) == b'c'
+
+
+def test_download_many(adapter, tmp_path):
+    """every file is downloaded, a missing one fails on its own."""
+    for name in ('a.txt', 'c.txt'):
+        adapter.upload_stream(name.encode(), name)
+    items = [{'filename': str(tmp_path / name), 'bucket_filename': name}
+             for name in ('a.txt', 'missing.txt', 'c.txt')]
+    results = list(adapter.download_many(items, max_workers=3))
+    assert [result.item for result in results] == items
+    assert (tmp_path / 'a.txt').read_bytes() == b'a.txt'
+    assert (tmp_path / 'c.txt').read_bytes() == b'c.txt'
+    assert not results[1].result
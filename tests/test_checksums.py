@@ -0,0 +1,162 @@
+"""checksums: CRC combination, streamed hashing and verified transfers."""
+
+import base64
+import hashlib
+import io
+import os
+import zlib
+
+import pytest
+
+from bucket_adapter import checksums
+from bucket_adapter.adapter import Adapter
+from bucket_adapter.exceptions import ChecksumMismatchError
+
+DATA = os.urandom(100000)
+
+
+def crc(algorithm, data):
+    """reference CRC of data, skipping the test when crc32c cannot be computed.
+
+    Returns:
+        [int]: [the CRC]
+    """
+    if algorithm == 'crc32':
+        return zlib.crc32(data)
+    return pytest.importorskip('google_crc32c').value(data)
+
+
+@pytest.mark.parametrize('algorithm', ['crc32', 'crc32c'])
+@pytest.mark.parametrize('split', [0, 1, 4095, 4096, 65537, len(DATA)])
+def test_crc_combine_matches_the_crc_of_the_concatenation(algorithm, split):
+    """the CRC of two pieces is combined into that of the whole data."""
+    first, second = DATA[:split], DATA[split:]
+    assert checksums.crc_combine(algorithm, crc(algorithm, first), crc(algorithm, second),
+                                 len(second)) == crc(algorithm, DATA)
+
+
+def test_stream_hasher_combines_pieces_out_of_order():
+    """pieces ahead of the data are combined with their CRCs, md5 is left out."""
+    hasher = checksums.StreamHasher(['md5', 'crc32', 'crc32c'])
+    pieces = [(60000, len(DATA)), (20000, 60000), (20000, 60000), (0, 10000), (10000, 20000)]
+    for start, end in pieces:
+        hasher.update(start, DATA[start:end])
+    expected = {'crc32': crc('crc32', DATA).to_bytes(4, 'big')}
+    if checksums.available('crc32c'):
+        expected['crc32c'] = crc('crc32c', DATA).to_bytes(4, 'big')
+    assert hasher.digests() == expected
+
+
+def test_stream_hasher_in_order_keeps_every_algorithm():
+    """data hashed in order has its md5 too."""
+    hasher = checksums.StreamHasher(['md5', 'crc32'])
+    hasher.update(0, DATA[:5000])
+    hasher.update(0, DATA[:8000])
+    hasher.update(8000, DATA[8000:])
+    assert hasher.digests() == {'md5': hashlib.md5(DATA).digest(),
+                                'crc32': zlib.crc32(DATA).to_bytes(4, 'big')}
+
+
+def test_verify_raises_on_the_first_mismatch():
+    """digests of algorithms both sides have must match."""
+    checksums.verify('key', {'md5': b'a', 'sha256': b'b'}, {'md5': b'a'})
+    with pytest.raises(ChecksumMismatchError) as error:
+        checksums.verify('key', {'md5': b'a'}, {'md5': b'c'})
+    assert (error.value.name, error.value.algorithm) == ('key', 'md5')
+
+
+def test_verified_transfers(adapter, local_file, tmp_path):
+    """verified uploads and downloads return the blob with its checksums, verified."""
+    md5 = base64.b64encode(hashlib.md5(DATA).digest()).decode('ascii')
+    blob = adapter.upload(local_file('data.bin', DATA), bucket_filename='key', verify=True)
+    assert blob.checksums['md5'] == md5 and blob.verified is True
+    blob = adapter.upload_fileobj(io.BytesIO(DATA), 'stream', verify=True)
+    assert blob.checksums['md5'] == md5 and blob.verified is True
+    output = io.BytesIO()
+    blob = adapter.download_to_file_pointer('key', output, verify=True)
+    assert output.getvalue() == DATA
+    assert blob.checksums['md5'] == md5 and blob.verified is True
+
+
+def test_mismatched_upload_raises(adapter, local_file, monkeypatch):
+    """an object that does not match the data sent fails the upload."""
+    monkeypatch.setattr(adapter.adaptee_obj, 'get_checksums',
+                        lambda *args, **kwargs: {'md5': hashlib.md5(b'other').digest()})
+    with pytest.raises(ChecksumMismatchError):
+        adapter.upload(local_file('data.bin', DATA), bucket_filename='key', verify=True)
+
+
+def test_unverifiable_transfers_are_flagged(adapter, local_file, monkeypatch):
+    """when the bucket advertises no checksum the blob says it is not verified."""
+    monkeypatch.setattr(adapter.adaptee_obj, 'get_checksums', lambda *args, **kwargs: {})
+    blob = adapter.upload(local_file('data.bin', DATA), bucket_filename='key', verify=True)
+    assert blob.checksums and blob.verified is False
+    assert adapter.download_to_file_pointer('key', io.BytesIO(), verify=True).verified is False
+
+
+@pytest.fixture
+def s3():
+    """adapter of a moto S3 bucket uploading 5 MiB parts from 5 MiB on.
+
+    Returns:
+        [Adapter]: [the adapter]
+    """
+    moto = pytest.importorskip('moto')
+    with moto.mock_aws():
+        adapter = Adapter({'NAME': 'bucket_adapter.aws.adapter.AWS', 'BUCKET_NAME': 'bucket',
+                           'CREDENTIALS': {'region_name': 'us-east-1', 'aws_access_key_id': 'key',
+                                           'aws_secret_access_key': 'secret'},
+                           'MULTIPART_THRESHOLD': 5 * 1024 ** 2, 'MULTIPART_CHUNKSIZE': 5 * 1024 ** 2,
+                           'MULTIPART_CONCURRENCY': 1})
+        adapter.authenticate.create_bucket(Bucket='bucket')
+        yield adapter
+
+
+def interrupted(adapter, monkeypatch, path, failing):
+    """upload a file with one part failing, leaving the multipart upload open.
+
+    Returns:
+        [list]: [part numbers sent by the next uploads]
+    """
+    from botocore.exceptions import ClientError
+
+    client = adapter.authenticate
+    upload_part = client.upload_part
+    sent, failed = [], []
+
+    def flaky(**kwargs):
+        if kwargs['PartNumber'] == failing and not failed:
+            failed.append(failing)
+            raise ClientError({'Error': {'Code': 'InternalError'}}, 'UploadPart')
+        sent.append(kwargs['PartNumber'])
+        return upload_part(**kwargs)
+
+    monkeypatch.setattr(client, 'upload_part', flaky)
+    assert adapter.upload(path, bucket_filename='big', verify=True) is False
+    del sent[:]
+    return sent
+
+
+def test_resumed_uploads_hash_the_parts_sent_before(s3, local_file, monkeypatch):
+    """the parts of the earlier attempt are hashed from disk into the digests."""
+    data = os.urandom(12 * 1024 ** 2)
+    path = local_file('big.bin', data)
+    sent = interrupted(s3, monkeypatch, path, failing=3)
+    blob = s3.upload(path, bucket_filename='big', verify=True)
+    assert sent == [3]
+    crc32 = zlib.crc32(data).to_bytes(4, 'big')
+    assert blob.checksums['crc32'] == base64.b64encode(crc32).decode('ascii')
+
+
+def test_resumed_uploads_send_changed_parts_again(s3, local_file, monkeypatch):
+    """a part sent before that differs from the file is sent again."""
+    data = os.urandom(12 * 1024 ** 2)
+    path = local_file('big.bin', data)
+    sent = interrupted(s3, monkeypatch, path, failing=3)
+    data = os.urandom(1024) + data[1024:]
+    local_file('big.bin', data)
+    s3.upload(path, bucket_filename='big', verify=True)
+    assert sent == [1, 3]
+    output = io.BytesIO()
+    s3.download_to_file_pointer('big', output)
+    assert output.getvalue() == data
@@ -0,0 +1,108 @@
+"""CustomBlob: converter dispatch, lazy fields and the S3 get_blob request."""
+
+import pytest
+
+from bucket_adapter import custom_blob
+from bucket_adapter.adapter import Adapter
+from bucket_adapter.custom_blob import CustomBlob
+
+
+class Record(object):
+    """SDK stand-in object.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    def __init__(self, name, size):
+        """__init__ function."""
+        self.name = name
+        self.size = size
+
+
+def convert_record(blob, record, options, filename):
+    """converter of Record objects, counting its calls."""
+    convert_record.calls += 1
+    blob.name = record.name
+    blob.size = record.size
+
+
+convert_record.calls = 0
+
+
+@pytest.fixture
+def registered(monkeypatch):
+    """register the Record converter for the test only."""
+    monkeypatch.setattr(custom_blob, '_CONVERTERS', dict(custom_blob._CONVERTERS))
+    monkeypatch.setattr(custom_blob, '_CONVERTERS_BY_TYPE', {})
+    custom_blob.register_converter('{}.Record'.format(__name__), convert_record)
+
+
+def test_fields_are_converted_once_on_first_access(registered):
+    """the converter runs on the first field access only, other fields default to None."""
+    calls = convert_record.calls
+    blob = CustomBlob(Record('key', 4), options={})
+    assert convert_record.calls == calls
+    assert (blob.name, blob.size, blob.etag) == ('key', 4, None)
+    assert blob.content_type is None
+    assert convert_record.calls == calls + 1
+    assert not hasattr(blob, '__dict__')
+
+
+def test_etl_function_fills_unknown_classes():
+    """objects without a converter go through `BLOB_ETL_FUNCTION`."""
+    blob = CustomBlob(Record('key', 4), options={'BLOB_ETL_FUNCTION': '{}.convert_record'.format(__name__)})
+    assert blob.name == 'key'
+    assert CustomBlob(Record('key', 4), options={}).name is None
+
+
+def test_from_fields():
+    """known values build a blob without any source object."""
+    blob = CustomBlob.from_fields(name='key', size=4)
+    assert (blob.name, blob.size, blob.generation) == ('key', 4, None)
+
+
+def test_aws_get_blob_fetches_inside_the_call():
+    """the S3 HEAD belongs to the get_blob operation, a missing key raises from get_blob."""
+    moto = pytest.importorskip('moto')
+    from botocore.exceptions import ClientError
+
+    events = []
+    with moto.mock_aws():
+        adapter = Adapter({'NAME': 'bucket_adapter.aws.adapter.AWS', 'BUCKET_NAME': 'bucket',
+                           'CREDENTIALS': {'region_name': 'us-east-1', 'aws_access_key_id': 'key',
+                                           'aws_secret_access_key': 'secret'},
+                           'INSTRUMENTATION': [events.append]})
+        adapter.authenticate.create_bucket(Bucket='bucket')
+        adapter.authenticate.put_object(Bucket='bucket', Key='key', Body=b'data')
+        blob = adapter.get_blob('key')
+        assert events[-1].operation == 'get_blob' and events[-1].remote_calls == 1
+        requests = []
+        resource = adapter.adaptee_obj._get_resource(adapter.settings)
+        resource.meta.client.meta.events.register('before-send', lambda **kwargs: requests.append(1))
+        assert (blob.name, blob.size) == ('key', 4)
+        assert not requests
+        with pytest.raises(ClientError):
+            adapter.get_blob('missing')
+
+
+def test_converter_cache_does_not_grow_with_boto3_objects():
+    """boto3 builds a class per resource, the converters are cached by class name."""
+    moto = pytest.importorskip('moto')
+
+    with moto.mock_aws():
+        adapter = Adapter({'NAME': 'bucket_adapter.aws.adapter.AWS', 'BUCKET_NAME': 'bucket',
+                           'CREDENTIALS': {'region_name': 'us-east-1', 'aws_access_key_id': 'key',
+                                           'aws_secret_access_key': 'secret'}})
+        adapter.authenticate.create_bucket(Bucket='bucket')
+        adapter.authenticate.put_object(Bucket='bucket', Key='key', Body=b'data')
+        assert adapter.get_blob('key').size == 4
+        cached = len(custom_blob._CONVERTERS_BY_TYPE)
+        resource = adapter.adaptee_obj._get_resource(adapter.settings)
+        objects = [resource.Object('bucket', 'key') for _ in range(100)]
+        assert type(objects[0]) is not type(objects[1])
+        for _ in range(100):
+            assert adapter.get_blob('key').size == 4
+        for resource_object in objects:
+            assert custom_blob.get_converter(type(resource_object)) is not None
+        assert len(custom_blob._CONVERTERS_BY_TYPE) == cached
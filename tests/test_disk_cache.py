@@ -0,0 +1,139 @@
+"""disk cache: hits, eviction and the requests it saves."""
+
+import io
+import os
+
+from bucket_adapter import disk_cache
+from bucket_adapter.adapter import Adapter
+from bucket_adapter.disk_cache import DiskCache
+
+
+def fill(cache, key, data, version=1):
+    """fill an entry and read it back.
+
+    Returns:
+        [bytes]: [the entry data]
+    """
+    with cache.fill(key, version, lambda fileobj: fileobj.write(data)) as entry:
+        return entry.read()
+
+
+def entries(cache):
+    """names of the entries on disk.
+
+    Returns:
+        [list]: [entry names]
+    """
+    return sorted(name for shard in os.listdir(cache.directory) if shard != 'locks'
+                  for name in os.listdir(os.path.join(cache.directory, shard)))
+
+
+def test_hits_and_misses(tmp_path):
+    """an entry is read back for its key and version only."""
+    cache = DiskCache(str(tmp_path))
+    assert cache.open('key', 1) is None
+    assert fill(cache, 'key', b'data') == b'data'
+    with cache.open('key', 1) as entry:
+        assert entry.read() == b'data'
+    assert cache.open('key', 2) is None
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'hit_ratio': 1 / 3}
+
+
+def test_copies_into_pipes(settings, tmp_path):
+    """destinations that cannot seek get the entry written, not sent with sendfile."""
+    settings['DISK_CACHE'] = {'DIRECTORY': str(tmp_path)}
+    adapter = Adapter(settings)
+    adapter.upload_stream(b'data', 'key')
+    for _ in range(2):
+        read_fd, write_fd = os.pipe()
+        with os.fdopen(read_fd, 'rb') as reader:
+            with os.fdopen(write_fd, 'wb') as writer:
+                adapter.download_to_file_pointer('key', writer)
+            assert reader.read() == b'data'
+    assert adapter.disk_cache.stats()['hits'] == 1
+
+
+def test_evicts_the_least_recently_used_entries(tmp_path):
+    """the directory stays under max_bytes, the entries opened last are kept."""
+    cache = DiskCache(str(tmp_path), max_bytes=250)
+    for key in ('a', 'b'):
+        fill(cache, key, b'x' * 100)
+    os.utime(cache._path(cache._name('a', 1)), (1, 1))
+    os.utime(cache._path(cache._name('b', 1)), (2, 2))
+    cache.open('a', 1).close()
+    fill(cache, 'c', b'x' * 100)
+    assert cache.open('b', 1) is None
+    assert cache.open('a', 1) is not None
+    assert len(entries(cache)) == 2
+    assert cache._size == 200
+
+
+def test_fills_under_max_bytes_do_not_scan_the_directory(tmp_path, monkeypatch):
+    """the size is measured once and then tracked, not scanned on every fill."""
+    cache = DiskCache(str(tmp_path), max_bytes=1000)
+    scans = []
+    scan = cache._scan
+    monkeypatch.setattr(cache, '_scan', lambda: scans.append(1) or scan())
+    for key in range(5):
+        fill(cache, str(key), b'x' * 100)
+    assert len(scans) == 1
+    assert cache._size == 500
+    fill(cache, 'over', b'x' * 600)
+    assert len(scans) == 2
+    assert cache._size <= 1000
+
+
+def test_rescans_for_the_entries_of_other_processes(tmp_path, monkeypatch):
+    """the entries of another cache on the directory count after RESCAN_INTERVAL."""
+    now = [1000.0]
+    monkeypatch.setattr(disk_cache.time, 'monotonic', lambda: now[0])
+    cache = DiskCache(str(tmp_path), max_bytes=250)
+    other = DiskCache(str(tmp_path), max_bytes=None)
+    fill(cache, 'a', b'x' * 100)
+    fill(other, 'b', b'x' * 100)
+    fill(other, 'c', b'x' * 100)
+    fill(cache, 'd', b'x' * 10)
+    assert len(entries(cache)) == 4
+    now[0] += disk_cache.RESCAN_INTERVAL + 1
+    fill(cache, 'e', b'x' * 10)
+    assert cache._size == cache._scan()[1] <= 250
+
+
+def counted(adapter, monkeypatch):
+    """count the requests of the adaptee.
+
+    Returns:
+        [list]: [names of the adaptee methods called]
+    """
+    requests = []
+    for method in ('get_head_object', 'download_to_file_pointer'):
+        original = getattr(adapter.adaptee_obj, method)
+
+        def count(*args, _original=original, _method=method, **kwargs):
+            requests.append(_method)
+            return _original(*args, **kwargs)
+
+        monkeypatch.setattr(adapter.adaptee_obj, method, count)
+    return requests
+
+
+def test_metadata_cache_saves_the_head_of_cache_hits(settings, tmp_path, monkeypatch):
+    """a hit still costs a head request, none when METADATA_CACHE serves it."""
+    settings['DISK_CACHE'] = {'DIRECTORY': str(tmp_path / 'cache')}
+    adapter = Adapter(settings)
+    adapter.upload_stream(b'data', 'key')
+    requests = counted(adapter, monkeypatch)
+    for _ in range(2):
+        output = io.BytesIO()
+        adapter.download_to_file_pointer('key', output)
+        assert output.getvalue() == b'data'
+    assert requests == ['get_head_object', 'download_to_file_pointer', 'get_head_object']
+
+    settings['METADATA_CACHE'] = {}
+    adapter = Adapter(settings)
+    requests = counted(adapter, monkeypatch)
+    for _ in range(2):
+        output = io.BytesIO()
+        adapter.download_to_file_pointer('key', output)
+        assert output.getvalue() == b'data'
+    assert requests == ['get_head_object']
@@ -0,0 +1,50 @@
+"""hedged reads: the first response wins and is the only one reported."""
+
+import threading
+import time
+
+from bucket_adapter.adapter import Adapter
+from bucket_adapter.instrumentation import MetricsRecorder
+
+
+def test_hedged_read_reports_the_kept_response_only(settings, monkeypatch):
+    """a slow read is sent again, its bytes and calls are counted once and the hedge apart."""
+    events = []
+    settings['HEDGE'] = {'OPERATIONS': ['read_range'], 'MIN_SAMPLES': 1, 'MIN_DELAY': 0.05}
+    settings['INSTRUMENTATION'] = [events.append]
+    adapter = Adapter(settings)
+    adapter.upload_stream(b'0123456789', 'key')
+    read_range = adapter.adaptee_obj.read_range
+    calls = []
+    release = threading.Event()
+
+    def slow_first(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 2:
+            # the first hedged call is stuck until the hedge answered.
+            release.wait(2)
+        return read_range(*args, **kwargs)
+
+    monkeypatch.setattr(adapter.adaptee_obj, 'read_range', slow_first)
+    assert adapter.read_range('key', 0, 10) == b'0123456789'
+    del events[:]
+    assert adapter.read_range('key', 0, 10) == b'0123456789'
+    release.set()
+    event = events[-1]
+    assert (event.bytes, event.remote_calls, event.hedges) == (10, 1, 1)
+    assert adapter.hedger.hedged == 1 and adapter.hedger.hedge_wins == 1
+    # the dropped response finishes later without adding to the event.
+    time.sleep(0.1)
+    assert len(calls) == 3
+    assert (event.bytes, event.remote_calls) == (10, 1)
+
+
+def test_metrics_count_hedges():
+    """the hedges of the events are aggregated per operation."""
+    class Event(object):
+        operation, backend, elapsed, bytes, remote_calls = 'read_range', 'memory', 0.1, 10, 1
+        retries, hedges, pool_wait, error = 0, 1, 0.0, None
+
+    recorder = MetricsRecorder()
+    recorder(Event())
+    assert recorder.snapshot()[('read_range', 'memory')]['hedges'] == 1
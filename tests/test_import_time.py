@@ -0,0 +1,58 @@
+"""import time of the package, checked with `python -X importtime`.
+
+Every module is imported in a fresh interpreter, its cumulative import
+time must stay under the budget and it must not load a backend SDK: the
+SDKs are only imported by `authenticate` and the backend operations. The
+median of a few runs smooths out the noise of a cold disk cache. The
+budget can be raised with the `IMPORT_TIME_BUDGET_MS` environment variable
+on slow machines.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+import pytest
+
+MODULES = ['bucket_adapter', 'bucket_adapter.adapter',
+           'bucket_adapter.aws.adapter', 'bucket_adapter.gcp.adapter']
+# Modules that must not be loaded by the imports above.
+SDK_MODULES = ['boto3', 'botocore', 'dateutil', 'google.cloud.storage', 'google.oauth2']
+BUDGET_MS = float(os.environ.get('IMPORT_TIME_BUDGET_MS', 150))
+RUNS = 3
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_time(module):
+    """cumulative import time of a module in a fresh interpreter.
+
+    Args:
+        module ([string]): [module name]
+
+    Returns:
+        [tuple]: [import time in milliseconds and the SDK modules it loaded]
+    """
+    code = 'import sys, {0}; print(",".join(m for m in {1!r} if m in sys.modules))'.format(
+        module, SDK_MODULES)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    if result.returncode:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+        pytest.fail('importing {} failed:\n{}'.format(module, '\n'.join(errors)), pytrace=False)
+    for line in result.stderr.splitlines():
+        _, _, cumulative, name = (part.strip() for part in line.replace(':', '|', 1).split('|'))
+        if name == module:
+            return int(cumulative) / 1000, [name for name in result.stdout.strip().split(',') if name]
+    pytest.fail('no import time reported for {}'.format(module), pytrace=False)
+
+
+@pytest.mark.parametrize('module', MODULES)
+def test_import_time(module):
+    """the module imports within the budget, without any backend SDK."""
+    runs = [import_time(module) for _ in range(RUNS)]
+    elapsed = statistics.median(elapsed for elapsed, _ in runs)
+    assert not runs[0][1], '{} loaded {}'.format(module, ', '.join(runs[0][1]))
+    assert elapsed <= BUDGET_MS, '{} took {:.1f} ms, over the {:.0f} ms budget'.format(
+        module, elapsed, BUDGET_MS)
@@ -0,0 +1,77 @@
+"""LazyAdapter: build on first use, per process and per thread adapters, resets."""
+
+import threading
+
+from bucket_adapter import lazy_adapter
+from bucket_adapter.lazy_adapter import LazyAdapter
+
+
+class Built(object):
+    """adapter stand-in recording its builds.
+
+    Args:
+        object ([type]): [description]
+    """
+
+    builds = []
+
+    def __init__(self, settings_file):
+        """__init__ function."""
+        self.settings = settings_file
+        Built.builds.append(self)
+
+
+def test_built_on_first_use():
+    """nothing is built until an attribute is used, then once."""
+    del Built.builds[:]
+    proxy = LazyAdapter(lambda: {'NAME': 'x'}, adapter_class=Built)
+    assert not Built.builds
+    assert proxy.settings == {'NAME': 'x'}
+    assert proxy.settings is Built.builds[0].settings
+    assert len(Built.builds) == 1
+
+
+def test_rebuilt_in_another_process(monkeypatch):
+    """a new PID gets its own adapter."""
+    proxy = LazyAdapter({}, adapter_class=Built)
+    first = proxy._get_adapter()
+    monkeypatch.setattr(lazy_adapter.os, 'getpid', lambda: -1)
+    assert proxy._get_adapter() is not first
+
+
+def test_per_thread_adapters():
+    """with per_thread every thread gets its own adapter."""
+    proxy = LazyAdapter({}, per_thread=True, adapter_class=Built)
+    adapters = []
+    threads = [threading.Thread(target=lambda: adapters.append(proxy._get_adapter())) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(map(id, adapters))) == 3
+    assert proxy._get_adapter() is proxy._get_adapter()
+
+
+def test_reset_while_in_use():
+    """readers racing a reset always get an adapter, never None."""
+    proxy = LazyAdapter({}, adapter_class=Built)
+    errors = []
+    stop = threading.Event()
+
+    def read():
+        while not stop.is_set():
+            try:
+                assert proxy.settings == {}
+            except Exception as e:
+                errors.append(e)
+                return
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for _ in range(2000):
+        proxy.reset()
+    stop.set()
+    for reader in readers:
+        reader.join()
+    assert not errors
@@ -0,0 +1,64 @@
+"""listings: one instrumented and retried operation per page."""
+
+import pytest
+
+from bucket_adapter.adapter import Adapter
+
+NAMES = ['a', 'b', 'c', 'd', 'e']
+
+
+@pytest.fixture
+def listed(settings):
+    """adapter with five files, retries and an event recorder.
+
+    Returns:
+        [tuple]: [the adapter and the list of events]
+    """
+    events = []
+    settings['RETRY'] = {'BASE_DELAY': 0, 'MAX_DELAY': 0}
+    settings['INSTRUMENTATION'] = [events.append]
+    adapter = Adapter(settings)
+    for name in NAMES:
+        adapter.upload_stream(b'x', name)
+    del events[:]
+    return adapter, events
+
+
+def test_every_page_is_an_operation(listed):
+    """every page fetched is reported as a list_blobs event."""
+    adapter, events = listed
+    with adapter.list_blobs(page_size=2, prefetch=False) as listing:
+        assert [blob.name for blob in listing] == NAMES
+    assert [event.operation for event in events] == ['list_blobs'] * 3
+    assert all(event.remote_calls == 1 for event in events)
+
+
+def test_failed_pages_are_listed_again(listed, monkeypatch):
+    """a page failing with a transient error is retried from its token, no name is lost or repeated."""
+    adapter, events = listed
+    list_blob_pages = adapter.adaptee_obj.list_blob_pages
+    failures = []
+
+    def flaky(**kwargs):
+        for page in list_blob_pages(**kwargs):
+            yield page
+            if page[3] == 'b' and not failures:
+                failures.append(page[3])
+                raise ConnectionError('reset')
+
+    monkeypatch.setattr(adapter.adaptee_obj, 'list_blob_pages', flaky)
+    with adapter.list_blobs(page_size=2) as listing:
+        assert [blob.name for blob in listing] == NAMES
+    assert failures == ['b']
+    assert sum(event.retries for event in events) == 1
+
+
+def test_resume_from_a_page_token(listed):
+    """a listing resumed from the token of a page starts at that page."""
+    adapter, _ = listed
+    with adapter.list_blobs(page_size=2, prefetch=False) as listing:
+        listing.next_page()
+        listing.next_page()
+        token = listing.page_token
+    with adapter.list_blobs(page_size=2, page_token=token) as listing:
+        assert [blob.name for blob in listing] == ['c', 'd', 'e']
@@ -0,0 +1,80 @@
+"""metadata cache: freshness, conditional revalidation and invalidation."""
+
+import pytest
+
+from bucket_adapter import cache
+from bucket_adapter.adapter import Adapter
+
+
+@pytest.fixture
+def cached_adapter(settings, monkeypatch):
+    """adapter with a 60 seconds metadata cache and a controllable clock.
+
+    Returns:
+        [tuple]: [the adapter, the clock as a one item list and the list of adaptee requests]
+    """
+    now = [1700000000.0]
+    monkeypatch.setattr(cache.time, 'time', lambda: now[0])
+    settings['METADATA_CACHE'] = {'TTL': 60}
+    adapter = Adapter(settings)
+    requests = []
+    for method in ('get_blob', 'get_head_object'):
+        original = getattr(adapter.adaptee_obj, method)
+
+        def counted(*args, _original=original, _method=method, **kwargs):
+            requests.append((_method, kwargs.get('if_none_match')))
+            return _original(*args, **kwargs)
+
+        monkeypatch.setattr(adapter.adaptee_obj, method, counted)
+    return adapter, now, requests
+
+
+def test_fresh_records_are_served_from_the_cache(cached_adapter):
+    """a record younger than the TTL costs no request."""
+    adapter, now, requests = cached_adapter
+    adapter.upload_stream(b'data', 'key')
+    first = adapter.get_blob('key')
+    now[0] += 30
+    assert adapter.get_blob('key') is first
+    assert adapter.get_head_object('key') == adapter.get_head_object('key')
+    assert requests == [('get_blob', None), ('get_head_object', None)]
+
+
+def test_expired_records_are_revalidated(cached_adapter):
+    """an expired record is kept when a conditional request finds it unchanged."""
+    adapter, now, requests = cached_adapter
+    adapter.upload_stream(b'data', 'key')
+    first = adapter.get_blob('key')
+    now[0] += 61
+    assert adapter.get_blob('key') is first
+    assert requests[-1] == ('get_blob', first.generation)
+    # changed behind the adapter's back, seen at the next revalidation.
+    Adapter(adapter.settings).upload_stream(b'other data', 'key')
+    assert adapter.get_blob('key') is first
+    now[0] += 61
+    changed = adapter.get_blob('key')
+    assert changed.size == len(b'other data') and changed.generation != first.generation
+
+
+def test_writes_through_the_adapter_invalidate(cached_adapter):
+    """uploads, copies and deletes drop the records of the files they change."""
+    adapter, _, requests = cached_adapter
+    adapter.upload_stream(b'data', 'key')
+    adapter.upload_stream(b'data', 'copy')
+    adapter.get_blob('key')
+    adapter.get_blob('copy')
+    adapter.upload_stream(b'new data', 'key')
+    assert adapter.get_blob('key').size == len(b'new data')
+    adapter.copy('key', 'copy')
+    assert adapter.get_blob('copy').size == len(b'new data')
+    adapter.delete('key')
+    assert adapter.get_blob('key').name is None
+    assert len(requests) == 5
+
+
+def test_missing_files_are_not_cached(cached_adapter):
+    """a missing file is asked again, so it is seen once uploaded elsewhere."""
+    adapter, _, requests = cached_adapter
+    assert adapter.get_blob('key').name is None
+    Adapter(adapter.settings).upload_stream(b'data', 'key')
+    assert adapter.get_blob('key').size == 4
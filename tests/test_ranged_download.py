@@ -0,0 +1,57 @@
+"""ranged downloads: seekable destinations only."""
+
+import io
+import os
+import threading
+
+import pytest
+
+from bucket_adapter.adapter import Adapter
+
+DATA = os.urandom(300 * 1024)
+
+
+@pytest.fixture
+def s3():
+    """adapter of a moto S3 bucket downloading 64 KiB ranges from 128 KiB on.
+
+    Returns:
+        [tuple]: [the adapter and the list of the Range headers sent]
+    """
+    moto = pytest.importorskip('moto')
+    with moto.mock_aws():
+        adapter = Adapter({'NAME': 'bucket_adapter.aws.adapter.AWS', 'BUCKET_NAME': 'bucket',
+                           'CREDENTIALS': {'region_name': 'us-east-1', 'aws_access_key_id': 'key',
+                                           'aws_secret_access_key': 'secret'},
+                           'RANGED_DOWNLOAD_THRESHOLD': 128 * 1024,
+                           'RANGED_DOWNLOAD_CHUNKSIZE': 64 * 1024})
+        adapter.authenticate.create_bucket(Bucket='bucket')
+        adapter.authenticate.put_object(Bucket='bucket', Key='key', Body=DATA)
+        ranges = []
+        adapter.authenticate.meta.events.register(
+            'provide-client-params.s3.GetObject', lambda params, **kwargs: ranges.append(params.get('Range')))
+        yield adapter, ranges
+
+
+def test_seekable_destinations_get_ranges(s3):
+    """a large object is fetched as concurrent ranges into a file."""
+    adapter, ranges = s3
+    output = io.BytesIO()
+    adapter.download_to_file_pointer('key', output)
+    assert output.getvalue() == DATA
+    assert len(ranges) == 5 and all(ranges)
+
+
+def test_pipes_are_downloaded_in_order(s3):
+    """a destination that cannot seek gets the object streamed."""
+    adapter, ranges = s3
+    read_fd, write_fd = os.pipe()
+    received = []
+    with os.fdopen(read_fd, 'rb') as reader:
+        drain = threading.Thread(target=lambda: received.append(reader.read()))
+        drain.start()
+        with os.fdopen(write_fd, 'wb') as writer:
+            adapter.download_to_file_pointer('key', writer)
+        drain.join()
+    assert received == [DATA]
+    assert not any(ranges)
@@ -0,0 +1,122 @@
+"""replicated adaptee: quorum writes, failover and pinned versions."""
+
+import io
+import os
+import tempfile
+import time
+import uuid
+
+import pytest
+
+from bucket_adapter.adapter import Adapter
+from bucket_adapter.replicated.adapter import ReplicaVersion
+
+
+def replica(**settings):
+    """settings of a Memory replica of its own.
+
+    Returns:
+        [dict]: [replica settings]
+    """
+    return dict(settings, NAME='bucket_adapter.local.adapter.Memory',
+                BUCKET_NAME='replica-{}'.format(uuid.uuid4().hex))
+
+
+@pytest.fixture
+def replicated():
+    """factory of replicated adapters over fresh Memory replicas.
+
+    Returns:
+        [callable]: [func(*replicas, **settings) returning the adapter and its ReplicaSet]
+    """
+    def build(*replicas, **settings):
+        adapter = Adapter(dict(settings, NAME='bucket_adapter.replicated.adapter.Replicated',
+                               BUCKET_NAME='replicated', REPLICAS=list(replicas), PROBE_RATIO=0))
+        return adapter, adapter.authenticate
+
+    return build
+
+
+def content(adapter, filename):
+    """content of a file.
+
+    Returns:
+        [bytes]: [the data]
+    """
+    output = io.BytesIO()
+    adapter.download_to_file_pointer(filename, output)
+    return output.getvalue()
+
+
+def test_lagging_replicas_upload_after_the_file_is_removed(replicated, local_file, monkeypatch):
+    """the write returns at the quorum, the slow replica still gets the whole file."""
+    adapter, replicas = replicated(replica(), replica(), WRITE_QUORUM=1)
+    upload = replicas.adapters[1].adaptee_obj.upload
+
+    def slow(*args, **kwargs):
+        time.sleep(0.3)
+        return upload(*args, **kwargs)
+
+    monkeypatch.setattr(replicas.adapters[1].adaptee_obj, 'upload', slow)
+    path = local_file('report.csv', b'a,b\n' * 1000)
+    spooled = set(os.listdir(tempfile.gettempdir()))
+    assert adapter.upload(path, bucket_filename='report.csv')
+    os.remove(path)
+    replicas.executor.shutdown(wait=True)
+    for replica_adapter in replicas.adapters:
+        assert content(replica_adapter, 'report.csv') == b'a,b\n' * 1000
+        assert replica_adapter.get_head_object('report.csv')[1]['ContentType'] == 'text/csv'
+    assert set(os.listdir(tempfile.gettempdir())) <= spooled
+
+
+def test_failed_quorum_returns_false(replicated, local_file, monkeypatch):
+    """a write fewer replicas than the quorum have fails."""
+    adapter, replicas = replicated(replica(), replica())
+
+    def broken(*args, **kwargs):
+        raise OSError('replica down')
+
+    monkeypatch.setattr(replicas.adapters[1].adaptee_obj, 'upload', broken)
+    events = []
+    adapter.add_listener(events.append)
+    assert adapter.upload(local_file('a.txt', b'data'), bucket_filename='a.txt') is False
+    assert events[-1].error == 'QuorumError'
+
+
+def test_reads_fail_over_to_the_replicas_having_the_file(replicated):
+    """a file missing on the fastest replica is read from another one."""
+    adapter, replicas = replicated(replica(), replica())
+    replicas.adapters[1].upload_stream(b'data', 'only-on-1')
+    replicas.observe(0, 'get_blob', 0.0)
+    replicas.observe(1, 'get_blob', 1.0)
+    assert adapter.get_blob('only-on-1').generation == ReplicaVersion(1, 1)
+    assert content(adapter, 'only-on-1') == b'data'
+
+
+def test_cached_downloads_go_to_the_replica_of_their_version(replicated, tmp_path):
+    """the version of a head is only used on its replica, which is not penalized."""
+    adapter, replicas = replicated(replica(), replica(), DISK_CACHE={'DIRECTORY': str(tmp_path)})
+    replicas.adapters[1].upload_stream(b'other', 'other')
+    adapter.upload_stream(b'data', 'key')
+    replicas.observe(0, 'get_head_object', 0.0)
+    replicas.observe(1, 'get_head_object', 1.0)
+    replicas.observe(0, 'download_to_file_pointer', 1.0)
+    replicas.observe(1, 'download_to_file_pointer', 0.0)
+    assert adapter.get_head_object('key')[1]['Generation'] == ReplicaVersion(0, 1)
+    assert content(adapter, 'key') == b'data'
+    assert content(adapter, 'key') == b'data'
+    latencies = replicas.latencies()
+    assert latencies[(1, 'download_to_file_pointer')] == 0.0
+    assert latencies[(0, 'download_to_file_pointer')] < 1.0
+
+
+def test_conditional_heads_go_to_the_replica_of_their_version(replicated):
+    """a cached head is revalidated on the replica it was read from."""
+    adapter, replicas = replicated(replica(), replica(), METADATA_CACHE={'TTL': 0})
+    replicas.adapters[1].upload_stream(b'other', 'other')
+    adapter.upload_stream(b'data', 'key')
+    replicas.observe(0, 'get_head_object', 1.0)
+    first = adapter.get_head_object('key')
+    assert first[1]['Generation'] == ReplicaVersion(1, 2)
+    replicas.observe(1, 'get_head_object', 10.0)
+    assert adapter.get_head_object('key') is first
@@ -0,0 +1,187 @@
+"""retries: idempotency rules, transient errors, file object rewinds and the budget."""
+
+import io
+
+import pytest
+
+from bucket_adapter.retry import RetryBudget, RetryPolicy, is_transient
+
+
+class Throttled(Exception):
+    """botocore like ClientError of a throttled request.
+
+    Args:
+        Exception ([type]): [description]
+    """
+
+    response = {'Error': {'Code': 'SlowDown'}, 'ResponseMetadata': {'HTTPStatusCode': 503}}
+
+
+class NotFound(Exception):
+    """google.api_core like error of a missing object.
+
+    Args:
+        Exception ([type]): [description]
+    """
+
+    code = 404
+
+
+def failing(errors, result='ok'):
+    """function raising the given errors one per call, then returning result.
+
+    Returns:
+        [callable]: [the function, its calls counted in `calls`]
+    """
+    errors = list(errors)
+
+    def func(*args, **kwargs):
+        func.calls += 1
+        if errors:
+            raise errors.pop(0)
+        return result
+    func.calls = 0
+    return func
+
+
+@pytest.fixture
+def policy():
+    """retry policy without delays.
+
+    Returns:
+        [RetryPolicy]: [the policy]
+    """
+    return RetryPolicy(max_attempts=3, sleep=lambda delay: None)
+
+
+def test_transient_errors():
+    """network, throttling and 5xx errors are transient, 404s are not."""
+    assert is_transient(ConnectionError())
+    assert is_transient(Throttled())
+    assert not is_transient(NotFound())
+    assert not is_transient(ValueError())
+
+
+def test_idempotent_operations_are_retried(policy):
+    """a read failing twice with transient errors succeeds on the third attempt."""
+    func = failing([ConnectionError(), Throttled()])
+    assert policy.call('get_blob', func, 'key') == 'ok'
+    assert func.calls == 3
+
+
+def test_attempts_are_bounded(policy):
+    """the last error is raised once the attempts are spent."""
+    func = failing([ConnectionError()] * 5)
+    with pytest.raises(ConnectionError):
+        policy.call('download', func)
+    assert func.calls == 3
+
+
+def test_permanent_errors_are_not_retried(policy):
+    """an error that is not transient is raised at once."""
+    func = failing([NotFound()])
+    with pytest.raises(NotFound):
+        policy.call('get_blob', func)
+    assert func.calls == 1
+
+
+@pytest.mark.parametrize('operation', ['move', 'generate_signed_url', 'sync_dir', 'unknown'])
+def test_other_operations_are_not_retried(policy, operation):
+    """operations without a rule run once."""
+    func = failing([ConnectionError()])
+    with pytest.raises(ConnectionError):
+        policy.call(operation, func)
+    assert func.calls == 1
+
+
+def test_file_objects_are_rewound(policy):
+    """a streamed upload is sent again from the position it started at."""
+    fileobj = io.BytesIO(b'header-data')
+    fileobj.seek(7)
+    sent = []
+
+    def upload(fileobj, bucket_filename):
+        sent.append(fileobj.read())
+        if len(sent) == 1:
+            raise ConnectionError()
+        return True
+
+    assert policy.call('upload_fileobj', upload, fileobj, 'key')
+    assert sent == [b'data', b'data']
+
+
+def test_unseekable_file_objects_are_not_retried(policy):
+    """a stream that cannot be rewound is sent once."""
+    class Stream(io.RawIOBase):
+        def readable(self):
+            return True
+
+    func = failing([ConnectionError()])
+    with pytest.raises(ConnectionError):
+        policy.call('upload_fileobj', func, Stream(), 'key')
+    assert func.calls == 1
+
+
+def test_download_into_a_file_pointer_drops_the_partial_data(policy):
+    """a failed download into a file pointer is truncated before the retry."""
+    target = io.BytesIO()
+
+    def download(filename, tempfile_name):
+        tempfile_name.write(b'partial' if download.calls == 0 else b'complete')
+        download.calls += 1
+        if download.calls == 1:
+            raise ConnectionError()
+        return True
+    download.calls = 0
+
+    policy.call('download_to_file_pointer', download, 'key', target)
+    assert target.getvalue() == b'complete'
+
+
+def test_budget_stops_retry_storms():
+    """once the budget is spent, failures are not retried."""
+    budget = RetryBudget(ratio=0, initial=1)
+    policy = RetryPolicy(max_attempts=5, budget=budget, sleep=lambda delay: None)
+    func = failing([ConnectionError()] * 10)
+    with pytest.raises(ConnectionError):
+        policy.call('get_blob', func)
+    assert func.calls == 2
+    func = failing([ConnectionError()])
+    with pytest.raises(ConnectionError):
+        policy.call('get_blob', func)
+    assert func.calls == 1
+
+
+def test_adapter_retries_reads(settings, monkeypatch):
+    """an Adapter with `RETRY` retries a flaky read of the adaptee."""
+    from bucket_adapter.adapter import Adapter
+
+    settings['RETRY'] = {'BASE_DELAY': 0, 'MAX_DELAY': 0}
+    adapter = Adapter(settings)
+    adapter.upload_stream(b'data', 'key')
+    read_range = adapter.adaptee_obj.read_range
+    errors = [ConnectionError()]
+
+    def flaky(*args, **kwargs):
+        if errors:
+            raise errors.pop()
+        return read_range(*args, **kwargs)
+
+    monkeypatch.setattr(adapter.adaptee_obj, 'read_range', flaky)
+    assert adapter.read_range('key', 0, 4) == b'data'
+
+
+def test_swallowed_errors_are_retried(policy):
+    """an adaptee returning its failure value after recording a transient error is retried."""
+    from bucket_adapter import instrumentation
+
+    def upload():
+        upload.calls += 1
+        if upload.calls == 1:
+            instrumentation.record(error=Throttled())
+            return None
+        return True
+    upload.calls = 0
+
+    assert policy.call('upload', upload) is True
+    assert upload.calls == 2
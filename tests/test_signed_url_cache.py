@@ -0,0 +1,94 @@
+"""signed url cache: reuse, expiry and the urls signed for absolute expiries."""
+
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from bucket_adapter import cache
+from bucket_adapter.adapter import Adapter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """controllable time of the cache.
+
+    Returns:
+        [list]: [the current unix time, as its single item]
+    """
+    now = [1700000000.0]
+    monkeypatch.setattr(cache.time, 'time', lambda: now[0])
+    return now
+
+
+def expires(url):
+    """expiry of an url signed by the in-process adaptees.
+
+    Returns:
+        [int]: [unix time]
+    """
+    return int(parse_qs(urlsplit(url).query)['Expires'][0])
+
+
+def test_relative_expiry_is_reused_while_enough_is_left(settings, clock):
+    """an url is returned again until less than the ratio of its validity is left."""
+    settings['SIGNED_URL_CACHE'] = {'MIN_REMAINING': 60, 'MIN_REMAINING_RATIO': 0.5}
+    adapter = Adapter(settings)
+    url = adapter.generate_signed_url('key', expiration=3600)
+    clock[0] += 1700
+    assert adapter.generate_signed_url('key', expiration=3600) == url
+    clock[0] += 200
+    assert adapter.generate_signed_url('key', expiration=3600) is not None
+    stats = adapter.signed_url_cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 2)
+
+
+def test_absolute_expiry_never_expires_early(settings):
+    """urls of an absolute expiry are signed for the end of its window, never before it."""
+    settings['SIGNED_URL_CACHE'] = {'GRANULARITY': 300}
+    adapter = Adapter(settings)
+    requested = datetime.now(timezone.utc) + timedelta(hours=2)
+    requested = requested.replace(second=30, microsecond=0)
+    url = adapter.generate_signed_url_with_custom_expiry('key', expiration=requested)
+    assert requested.timestamp() <= expires(url) <= requested.timestamp() + 300
+    # second 30 is never the end of a window, one second later is the same window.
+    later = requested + timedelta(seconds=1)
+    assert adapter.generate_signed_url_with_custom_expiry('key', expiration=later) == url
+    urls = adapter.generate_signed_urls(['a', 'b'], expiration=requested)
+    assert all(expires(value) >= requested.timestamp() for value in urls.values())
+
+
+def test_exact_absolute_expiry(settings):
+    """a GRANULARITY of 0 keys urls on the exact expiry."""
+    settings['SIGNED_URL_CACHE'] = {'GRANULARITY': 0}
+    adapter = Adapter(settings)
+    requested = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(hours=1)
+    url = adapter.generate_signed_url_with_custom_expiry('key', expiration=requested)
+    assert abs(expires(url) - requested.timestamp()) <= 1
+    assert adapter.generate_signed_url_with_custom_expiry('key', expiration=requested) == url
+    adapter.generate_signed_url_with_custom_expiry('key', expiration=requested + timedelta(seconds=1))
+    stats = adapter.signed_url_cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 2)
+
+
+def test_lru_eviction():
+    """the least recently used urls are evicted first."""
+    signed_urls = cache.SignedUrlCache('bucket', max_entries=2)
+    for name in ('a', 'b', 'c'):
+        key, expires_at, _ = signed_urls.lookup(name, 3600)
+        signed_urls.store(key, expires_at, 'url-' + name)
+    assert signed_urls.lookup('a', 3600)[2] is None
+    assert signed_urls.lookup('c', 3600)[2] == 'url-c'
+    assert signed_urls.stats()['evictions'] == 1
+
+
+def test_aws_custom_expiry_over_a_day():
+    """S3 urls of a custom expiry keep the whole days of the duration."""
+    moto = pytest.importorskip('moto')
+    with moto.mock_aws():
+        adapter = Adapter({'NAME': 'bucket_adapter.aws.adapter.AWS', 'BUCKET_NAME': 'bucket',
+                           'CREDENTIALS': {'region_name': 'us-east-1', 'aws_access_key_id': 'key',
+                                           'aws_secret_access_key': 'secret'}})
+        expiration = datetime.now(timezone.utc) + timedelta(days=2, seconds=30)
+        url = adapter.generate_signed_url_with_custom_expiry('key', expiration=expiration)
+    assert int(parse_qs(urlsplit(url).query)['X-Amz-Expires'][0]) in (2 * 86400 + 29, 2 * 86400 + 30)